@@ -0,0 +1,186 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import base
+import cache_disco
+import validacao
+
+# Varredura de anomalias entre edições, para todas as escolas, etapas e componentes
+# de uma vez, com estatísticas robustas (mediana e MAD, pouco sensíveis aos próprios
+# valores discrepantes):
+# - variação da proficiência média em relação à edição anterior da escola;
+# - mudança na distribuição por níveis (metade da soma das diferenças absolutas, em
+#   pontos percentuais) em relação à edição anterior;
+# - coerência entre os níveis e a proficiência média: a proficiência esperada pelos
+#   percentuais de cada nível (regressão por etapa e componente) contra a informada.
+# As variações são comparadas com as das outras escolas na mesma transição de edição
+# (ETAPA, COMPONENTE, EDICAO_ANTERIOR, EDICAO), o que desconta mudanças de todo o estado:
+# uma escola que volta após anos sem resultado só é comparada com as escolas que têm
+# a mesma lacuna (com menos de MIN_ESCOLAS, o z fica vazio).
+
+GRUPO = ['ETAPA', 'COMPONENTE_CURRICULAR', 'ID_ESCOLA']
+
+# |z| robusto a partir do qual o resultado é sinalizado (Iglewicz e Hoaglin)
+LIMITE_Z = 3.5
+
+# Mínimo de escolas num grupo para calcular mediana e MAD
+MIN_ESCOLAS = 10
+
+# Tipos de anomalia: coluna do z robusto -> rótulo exibido
+TIPOS = {
+    'Z_VARIACAO': 'Variação da proficiência',
+    'Z_NIVEIS': 'Mudança dos níveis',
+    'Z_COERENCIA': 'Níveis x proficiência',
+}
+
+# Tabelas já calculadas, por versão dos dados e níveis (últimas versões, ver cache_disco.obter_memoria)
+_cache = {}
+
+
+# z robusto de cada valor em relação ao seu grupo: 0,6745 * (x - mediana) / MAD
+def z_robusto(valores, grupos):
+    valores = pd.Series(valores)
+    agrupados = valores.groupby(grupos)
+    mediana = agrupados.transform('median')
+    desvios = (valores - mediana).abs()
+    mad = desvios.groupby(grupos).transform('median')
+    validos = (mad > 0) & (agrupados.transform('count') >= MIN_ESCOLAS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = 0.6745 * (valores - mediana) / mad
+    return z.where(validos).to_numpy()
+
+
+# Proficiência esperada pelos percentuais dos níveis: mínimos quadrados por grupo, sem
+# intercepto (os percentuais somam 100%), resolvidos de uma vez pelas equações normais
+# montadas com np.bincount. Cada coeficiente funciona como a proficiência típica do nível.
+def proficiencia_esperada(percentuais, proficiencia, grupos):
+    n_grupos = grupos.max() + 1 if len(grupos) else 0
+    validos = np.isfinite(proficiencia) & np.isfinite(percentuais).all(axis=1)
+    g = grupos[validos]
+    x = percentuais[validos]
+    y = proficiencia[validos]
+    k = x.shape[1]
+
+    xtx = np.empty((n_grupos, k, k))
+    xty = np.empty((n_grupos, k))
+    for i in range(k):
+        xty[:, i] = np.bincount(g, x[:, i] * y, n_grupos)
+        for j in range(i, k):
+            xtx[:, i, j] = xtx[:, j, i] = np.bincount(g, x[:, i] * x[:, j], n_grupos)
+    coeficientes = (np.linalg.pinv(xtx) @ xty[:, :, None])[:, :, 0]
+
+    return np.where(validos, (percentuais * coeficientes[grupos]).sum(axis=1), np.nan)
+
+
+# Calcula as anomalias de todos os resultados de uma base
+def calcular_anomalias(df, niveis):
+    df = base.escolas(df)
+    dados = df[['ETAPA', 'COMPONENTE_CURRICULAR', 'INEP_ESC', 'ESCOLA', 'MUNICIPIO', 'EDICAO', 'PROFICIENCIA_MEDIA'] + niveis].copy()
+    dados['ID_ESCOLA'] = base.codigos_escolas(dados)
+    dados = dados.sort_values(GRUPO + ['EDICAO'], kind='mergesort').reset_index(drop=True)
+
+    # Código do grupo de cada linha (linhas de uma mesma escola ficam contíguas, por edição)
+    g = dados.groupby(GRUPO, sort=False, observed=True).ngroup().to_numpy()
+    etapa_componente = dados.groupby(['ETAPA', 'COMPONENTE_CURRICULAR'], sort=False, observed=True).ngroup().to_numpy()
+    edicao = dados['EDICAO'].to_numpy()
+    y = base.decimais(dados['PROFICIENCIA_MEDIA']).to_numpy()
+    percentuais = base.decimais(dados[niveis]).to_numpy()
+
+    # Edição anterior da mesma escola: a linha anterior, se for do mesmo grupo
+    tem_anterior = np.r_[False, g[1:] == g[:-1]]
+    anterior = np.maximum(np.arange(len(g)) - 1, 0)
+    transicao = (dados.assign(EDICAO_ANTERIOR=np.where(tem_anterior, edicao[anterior], -1))
+                 .groupby(['ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO_ANTERIOR', 'EDICAO'], sort=False, observed=True)
+                 .ngroup().to_numpy())
+    variacao = np.where(tem_anterior, y - y[anterior], np.nan)
+    mudanca_niveis = np.where(tem_anterior, np.abs(percentuais - percentuais[anterior]).sum(axis=1) / 2, np.nan)
+    esperada = proficiencia_esperada(percentuais, y, etapa_componente)
+
+    tabela = dados[['ETAPA', 'COMPONENTE_CURRICULAR', 'INEP_ESC', 'ESCOLA', 'MUNICIPIO']].copy()
+    tabela['EDICAO_ANTERIOR'] = pd.Series(edicao[anterior]).where(tem_anterior).astype('Int16')
+    tabela['EDICAO'] = edicao
+    tabela['PROFICIENCIA_ANTERIOR'] = np.where(tem_anterior, y[anterior], np.nan)
+    tabela['PROFICIENCIA_MEDIA'] = y
+    tabela['VARIACAO'] = variacao
+    tabela['Z_VARIACAO'] = z_robusto(variacao, transicao)
+    tabela['MUDANCA_NIVEIS'] = mudanca_niveis
+    tabela['Z_NIVEIS'] = z_robusto(mudanca_niveis, transicao)
+    tabela['PROFICIENCIA_ESPERADA'] = esperada
+    tabela['Z_COERENCIA'] = z_robusto(y - esperada, etapa_componente)
+
+    # Maior desvio de cada linha; mudança pequena nos níveis não é anomalia
+    tabela['MAIOR_Z'] = np.fmax(np.fmax(np.abs(tabela['Z_VARIACAO']), tabela['Z_NIVEIS']), np.abs(tabela['Z_COERENCIA']))
+    return tabela
+
+
+# Tabela de anomalias em cache (memória e disco) por versão dos dados.
+# `versao`: base.versao_base(df) já calculada na carga (evita percorrer a base de novo)
+def tabela_anomalias(df, niveis, versao=None):
+    versao = versao or base.versao_base(df)
+    return cache_disco.obter_memoria(_cache, (versao, tuple(niveis)), lambda: cache_disco.obter(
+        'anomalias', versao, {'niveis': niveis}, lambda: calcular_anomalias(df, niveis)))
+
+
+# Tabela de anomalias das duas bases (2º Ano, 5º e 9º Ano)
+def tabela_anomalias_bases(result_spaece, result_alfa, versao_spaece=None, versao_alfa=None):
+    versao_spaece = versao_spaece or base.versao_base(result_spaece)
+    versao_alfa = versao_alfa or base.versao_base(result_alfa)
+    return cache_disco.obter_memoria(_cache, ('bases', versao_spaece, versao_alfa), lambda: pd.concat([
+        tabela_anomalias(result_spaece, validacao.NIVEIS_SPAECE, versao_spaece),
+        tabela_anomalias(result_alfa, validacao.NIVEIS_ALFA, versao_alfa),
+    ], ignore_index=True))
+
+
+# Resultados sinalizados em algum dos `tipos` (colunas de TIPOS), com filtros e ordenação
+def consultar_anomalias(tabela, etapa=None, componente=None, municipio=None, tipos=None,
+                        limite_z=LIMITE_Z, ordem='MAIOR_Z', crescente=False, limite=None):
+    tipos = list(tipos or TIPOS)
+    # A mudança dos níveis só é anomalia quando é maior que a das outras escolas
+    sinais = pd.DataFrame({
+        tipo: (tabela[tipo] if tipo == 'Z_NIVEIS' else tabela[tipo].abs()) >= limite_z for tipo in tipos
+    })
+    mascara = sinais.any(axis=1)
+    if etapa:
+        mascara &= tabela['ETAPA'] == etapa
+    if componente:
+        mascara &= tabela['COMPONENTE_CURRICULAR'] == componente
+    if municipio:
+        mascara &= tabela['MUNICIPIO'] == municipio
+
+    resultado = tabela.loc[mascara].copy()
+    resultado['ANOMALIAS'] = ['; '.join(TIPOS[tipo] for tipo in tipos if sinal[tipo])
+                              for sinal in sinais.loc[mascara].to_dict('records')]
+    resultado = resultado.sort_values(ordem, ascending=crescente, na_position='last')
+    return resultado.head(limite) if limite else resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Anomalias entre edições nos resultados do SPAECE (z robusto)")
+    parser.add_argument('--etapa', help="Ex.: '5º Ano'")
+    parser.add_argument('--componente', help="Ex.: 'MATEMÁTICA'")
+    parser.add_argument('--municipio')
+    parser.add_argument('--tipo', action='append', choices=list(TIPOS), help="Tipo de anomalia (pode repetir; padrão: todos)")
+    parser.add_argument('--limite-z', type=float, default=LIMITE_Z, help="|z| robusto mínimo para sinalizar")
+    parser.add_argument('--ordem', default='MAIOR_Z', help="Coluna de ordenação (MAIOR_Z, Z_VARIACAO, VARIACAO, ...)")
+    parser.add_argument('--crescente', action='store_true', help="Ordena do menor para o maior")
+    parser.add_argument('--limite', type=int, default=20)
+    parser.add_argument('--csv', help="Salva o resultado completo neste arquivo CSV")
+    args = parser.parse_args()
+
+    result_spaece, result_alfa, _ = base.carregar_bases()
+    resultado = consultar_anomalias(
+        tabela_anomalias_bases(result_spaece, result_alfa),
+        etapa=args.etapa, componente=args.componente, municipio=args.municipio, tipos=args.tipo,
+        limite_z=args.limite_z, ordem=args.ordem, crescente=args.crescente,
+        limite=None if args.csv else args.limite
+    )
+    resultado = base.formatar_base(resultado)
+
+    if args.csv:
+        resultado.to_csv(args.csv, index=False)
+        print(f"{len(resultado)} resultados sinalizados salvos em {args.csv}")
+    else:
+        pd.set_option('display.width', 250)
+        print(resultado.round(2).to_string(index=False))
@@ -0,0 +1,368 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+import banco
+import base
+import configuracao
+import consultas
+import coortes
+import crescimento
+import validacao
+
+# API HTTP somente leitura sobre os resultados do SPAECE, para outros sistemas
+# (BI, portais municipais) consultarem rankings, históricos, quartis e resultados
+# municipais em JSON ou Arrow IPC, sem baixar CSVs do dashboard.
+#
+# Todas as respostas saem de um índice montado uma única vez por versão dos dados
+# (a partir do cache em disco); as requisições fazem apenas buscas em dicionários
+# e fatiamento de páginas. As respostas serializadas também ficam em memória e
+# carregam um ETag derivado da versão dos dados (GET condicional com If-None-Match).
+# As rotas são funções comuns (não async): o Starlette as executa no pool de threads,
+# e a reconstrução do índice, os filtros do pandas e a serialização de uma requisição
+# não bloqueiam as demais.
+#
+# Uso: python dashboard_spaece_5_9_ano/api.py --porta 8000
+
+POR_PAGINA_PADRAO = 100
+POR_PAGINA_MAXIMO = 1000
+RESPOSTAS_EM_MEMORIA = 2048
+
+TIPO_ARROW = 'application/vnd.apache.arrow.stream'
+
+# Estudantes avaliados de cada escola (SPAECE / SPAECE-Alfa), peso das médias municipais calculadas
+COLUNAS_EFETIVOS = ['EFETIVO', 'EFETIVOS']
+
+
+# Erro de requisição devolvido ao cliente como JSON
+class ErroRequisicao(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+# Índice pré-calculado de todas as consultas da API para uma versão dos dados
+class IndiceSPAECE:
+    def __init__(self, result_spaece, result_alfa):
+        versao_spaece, versao_alfa = base.versao_base(result_spaece), base.versao_base(result_alfa)
+        self.versao = versao_spaece[:8] + versao_alfa[:8]
+        self.rankings = {}
+        self.quartis = {}
+        self.municipios = {}
+        self.historicos = {}
+
+        for etapa, componente, edicao in consultas.combinacoes(result_spaece, result_alfa):
+            df_base = consultas.selecionar_base(etapa, result_spaece, result_alfa)
+            versao = consultas.selecionar_base(etapa, versao_spaece, versao_alfa)
+            # EDIÇÃO como texto, como chega nos parâmetros da requisição
+            chave = (etapa, componente, str(edicao))
+
+            ranking = consultas.ranking_edicao_em_cache(df_base, etapa, componente, edicao, versao)
+            identificacao = df_base.loc[ranking.index, ['INEP_ESC', 'MUNICIPIO']]
+            self.rankings[chave] = pd.concat([ranking, identificacao], axis=1).reset_index(drop=True)
+
+            df_quartil, cortes = consultas.quartis_edicao_em_cache(df_base, etapa, componente, edicao, versao)
+            self.quartis[chave] = (
+                df_quartil[['INEP_ESC', 'ESCOLA', 'MUNICIPIO', 'PROFICIENCIA_MEDIA', 'QUARTIL']]
+                .sort_values('PROFICIENCIA_MEDIA', ascending=False).reset_index(drop=True),
+                dict(zip(['Q1', 'Q2', 'Q3'], cortes))
+            )
+
+        for df_base, niveis in [(result_spaece, validacao.NIVEIS_SPAECE), (result_alfa, validacao.NIVEIS_ALFA)]:
+            self._indexar_municipios(df_base, niveis)
+            self._indexar_historicos(df_base)
+
+        self.crescimento = crescimento.tabela_crescimento_bases(result_spaece, result_alfa, versao_spaece, versao_alfa)
+        self.coortes = coortes.tabelas_coortes(result_spaece, versao_spaece)[1]
+
+    # Resultado de cada município em cada (ETAPA, COMPONENTE, EDIÇÃO): a linha oficial da
+    # planilha (FONTE 'oficial'); sem ela, a média das escolas ponderada pelos estudantes
+    # avaliados (FONTE 'calculado', pode diferir do resultado oficial). N_ESCOLAS e a
+    # proficiência mínima e máxima vêm sempre das escolas do município.
+    def _indexar_municipios(self, df_base, niveis):
+        chave = ['ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO', 'INEP_MUN', 'MUNICIPIO']
+        colunas = ['PROFICIENCIA_MEDIA'] + niveis
+        df_base = df_base.assign(**base.decimais(df_base[colunas]))
+        escolas = base.escolas(df_base)
+        efetivos = next(coluna for coluna in COLUNAS_EFETIVOS if coluna in escolas.columns)
+
+        # Médias ponderadas: soma de valor x estudantes sobre a soma dos estudantes com valor
+        dados = escolas[chave].assign(N_ESCOLAS=1)
+        for coluna in colunas:
+            pesos = escolas[efetivos].astype('float64').where(escolas[coluna].notna(), 0).fillna(0)
+            dados[coluna] = escolas[coluna].fillna(0) * pesos
+            dados[f'PESO_{coluna}'] = pesos
+        somas = dados.groupby(chave, observed=True).sum()
+        extremos = escolas.groupby(chave, observed=True)['PROFICIENCIA_MEDIA'].agg(['min', 'max'])
+        calculados = pd.DataFrame({coluna: somas[coluna] / somas[f'PESO_{coluna}'].where(somas[f'PESO_{coluna}'] > 0)
+                                   for coluna in colunas}).assign(FONTE='calculado')
+
+        oficiais = base.municipios(df_base).set_index(chave)[colunas].assign(FONTE='oficial')
+        municipios = pd.concat([oficiais, calculados.drop(oficiais.index, errors='ignore')])
+        municipios = municipios.assign(
+            N_ESCOLAS=somas['N_ESCOLAS'].reindex(municipios.index).fillna(0).astype(int),
+            PROFICIENCIA_MINIMA=extremos['min'].reindex(municipios.index),
+            PROFICIENCIA_MAXIMA=extremos['max'].reindex(municipios.index),
+        )[['FONTE', 'N_ESCOLAS', 'PROFICIENCIA_MEDIA', 'PROFICIENCIA_MINIMA', 'PROFICIENCIA_MAXIMA'] + niveis]
+        municipios = municipios.round(2).reset_index().sort_values(['ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO', 'MUNICIPIO'])
+        for (etapa, componente, edicao), grupo in municipios.groupby(['ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO'], observed=True):
+            self.municipios[(etapa, componente, str(edicao))] = grupo.drop(columns=['ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO']).reset_index(drop=True)
+
+    # Histórico de cada escola com a posição no ranking de cada edição (aba "Classificação da Escola")
+    def _indexar_historicos(self, df_base):
+        historico = base.escolas(df_base)[['INEP_ESC', 'ESCOLA', 'MUNICIPIO', 'ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO', 'PROFICIENCIA_MEDIA']].copy()
+        historico['POSICAO'] = (historico.groupby(['ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO'], observed=True)['PROFICIENCIA_MEDIA']
+                                .rank(method='min', ascending=False).astype(int))
+        historico = historico[historico['INEP_ESC'].notna()].sort_values(['ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO'])
+        for inep, grupo in historico.groupby('INEP_ESC'):
+            inep = str(inep)
+            anterior = self.historicos.get(inep)
+            grupo = grupo.reset_index(drop=True)
+            self.historicos[inep] = grupo if anterior is None else pd.concat([anterior, grupo], ignore_index=True)
+
+
+# Mantém o índice da versão atual das planilhas e as respostas já serializadas
+class ServicoSPAECE:
+    def __init__(self, indice=None):
+        self._trava = threading.Lock()
+        self._indice = indice
+        self._assinatura = None if indice is None else self._assinatura_arquivos()
+        self._respostas = OrderedDict()
+
+    # Data de modificação e tamanho das planilhas (verificação barata a cada requisição)
+    def _assinatura_arquivos(self):
+        assinatura = []
+        for caminho in (configuracao.CAMINHO_SPAECE, configuracao.CAMINHO_ALFA):
+            info = os.stat(caminho)
+            assinatura.append((info.st_mtime_ns, info.st_size))
+        return tuple(assinatura)
+
+    # Índice atual; é reconstruído quando as planilhas mudam no disco
+    def indice(self):
+        assinatura = self._assinatura_arquivos()
+        if self._indice is None or assinatura != self._assinatura:
+            with self._trava:
+                if self._indice is None or assinatura != self._assinatura:
+                    result_spaece, result_alfa, _ = base.carregar_bases()
+                    if configuracao.BACKEND != 'pandas':
+                        banco.preparar_banco(result_spaece, result_alfa)
+                    self._indice = IndiceSPAECE(result_spaece, result_alfa)
+                    self._assinatura = assinatura
+                    self._respostas.clear()
+        return self._indice
+
+    def resposta_em_memoria(self, chave, gerar):
+        with self._trava:
+            if chave in self._respostas:
+                self._respostas.move_to_end(chave)
+                return self._respostas[chave]
+        resposta = gerar()
+        with self._trava:
+            self._respostas[chave] = resposta
+            if len(self._respostas) > RESPOSTAS_EM_MEMORIA:
+                self._respostas.popitem(last=False)
+        return resposta
+
+
+# ---------------------------------------------------------------------------
+# Serialização e paginação
+# ---------------------------------------------------------------------------
+
+def _parametro(requisicao, nome, obrigatorio=True):
+    valor = requisicao.query_params.get(nome)
+    if obrigatorio and not valor:
+        raise ErroRequisicao(400, f"Parâmetro obrigatório ausente: {nome}")
+    return valor
+
+
+def _inteiro(requisicao, nome, padrao, minimo, maximo):
+    valor = requisicao.query_params.get(nome)
+    if valor is None:
+        return padrao
+    try:
+        valor = int(valor)
+    except ValueError:
+        raise ErroRequisicao(400, f"Parâmetro '{nome}' deve ser um número inteiro")
+    return max(minimo, min(valor, maximo))
+
+
+def _formato(requisicao):
+    formato = requisicao.query_params.get('formato')
+    if formato is None:
+        formato = 'arrow' if TIPO_ARROW in requisicao.headers.get('accept', '') else 'json'
+    if formato not in ('json', 'arrow'):
+        raise ErroRequisicao(400, "Parâmetro 'formato' deve ser 'json' ou 'arrow'")
+    return formato
+
+
+def _serializar(df, metadados, formato):
+    df = base.formatar_base(df)
+    if formato == 'arrow':
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ErroRequisicao(406, "Formato Arrow indisponível: instale o pacote pyarrow")
+        tabela = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(
+            {'spaece': json.dumps(metadados, ensure_ascii=False, default=str)}
+        )
+        buffer = io.BytesIO()
+        with pa.ipc.new_stream(buffer, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        return buffer.getvalue(), TIPO_ARROW
+
+    corpo = dict(metadados, dados=json.loads(df.to_json(orient='records', force_ascii=False)))
+    return json.dumps(corpo, ensure_ascii=False, default=str).encode('utf-8'), 'application/json; charset=utf-8'
+
+
+# Responde uma consulta paginada com ETag e GET condicional
+def _responder(servico, requisicao, rota, parametros, obter_tabela, extras=None):
+    indice = servico.indice()
+    formato = _formato(requisicao)
+    pagina = _inteiro(requisicao, 'pagina', 1, 1, 10 ** 9)
+    por_pagina = _inteiro(requisicao, 'por_pagina', POR_PAGINA_PADRAO, 1, POR_PAGINA_MAXIMO)
+
+    # Recurso resolvido antes do GET condicional: combinação ou escola inexistente é 404
+    # mesmo com If-None-Match (inclusive '*')
+    tabela = obter_tabela(indice)
+
+    chave = (indice.versao, rota, tuple(sorted(parametros.items())), pagina, por_pagina, formato)
+    etag = '"' + hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()[:20] + '"'
+    cabecalhos = {'ETag': etag, 'Cache-Control': 'public, max-age=300', 'X-Versao-Dados': indice.versao}
+
+    # GET condicional: o cliente já tem esta versão
+    if_none_match = requisicao.headers.get('if-none-match', '')
+    if etag in [valor.strip() for valor in if_none_match.split(',')] or if_none_match.strip() == '*':
+        return Response(status_code=304, headers=cabecalhos)
+
+    def gerar():
+        total = len(tabela)
+        inicio = (pagina - 1) * por_pagina
+        metadados = dict(extras(indice) if extras else {}, versao=indice.versao, pagina=pagina,
+                         por_pagina=por_pagina, total=total, parametros=parametros)
+        corpo, tipo = _serializar(tabela.iloc[inicio:inicio + por_pagina], metadados, formato)
+        return corpo, tipo, total
+
+    corpo, tipo, total = servico.resposta_em_memoria(chave, gerar)
+    cabecalhos['X-Total-Count'] = str(total)
+    return Response(corpo, media_type=tipo, headers=cabecalhos)
+
+
+def _buscar(dicionario, chave, descricao):
+    if chave not in dicionario:
+        raise ErroRequisicao(404, f"{descricao} não encontrada: {' / '.join(chave if isinstance(chave, tuple) else [chave])}")
+    return dicionario[chave]
+
+
+# ---------------------------------------------------------------------------
+# Aplicação
+# ---------------------------------------------------------------------------
+
+def criar_app(servico=None):
+    servico = servico or ServicoSPAECE()
+
+    def _combinacao(requisicao):
+        return {
+            'etapa': _parametro(requisicao, 'etapa'),
+            'componente': _parametro(requisicao, 'componente'),
+            'edicao': _parametro(requisicao, 'edicao'),
+        }
+
+    def _chave(parametros):
+        return parametros['etapa'], parametros['componente'], parametros['edicao']
+
+    def versao(requisicao):
+        indice = servico.indice()
+        corpo = {
+            'versao': indice.versao,
+            'combinacoes': [dict(zip(['etapa', 'componente', 'edicao'], chave)) for chave in sorted(indice.rankings)],
+        }
+        return Response(json.dumps(corpo, ensure_ascii=False).encode('utf-8'),
+                        media_type='application/json; charset=utf-8', headers={'X-Versao-Dados': indice.versao})
+
+    def ranking(requisicao):
+        parametros = _combinacao(requisicao)
+        return _responder(servico, requisicao, 'ranking', parametros,
+                          lambda indice: _buscar(indice.rankings, _chave(parametros), 'Combinação'))
+
+    def quartis(requisicao):
+        parametros = _combinacao(requisicao)
+        return _responder(servico, requisicao, 'quartis', parametros,
+                          lambda indice: _buscar(indice.quartis, _chave(parametros), 'Combinação')[0],
+                          extras=lambda indice: {'cortes': indice.quartis[_chave(parametros)][1]})
+
+    def municipios(requisicao):
+        parametros = _combinacao(requisicao)
+        return _responder(servico, requisicao, 'municipios', parametros,
+                          lambda indice: _buscar(indice.municipios, _chave(parametros), 'Combinação'))
+
+    def historico(requisicao):
+        inep = requisicao.path_params['inep']
+        parametros = {'inep': inep}
+        for nome in ('etapa', 'componente'):
+            if requisicao.query_params.get(nome):
+                parametros[nome] = requisicao.query_params[nome]
+
+        def obter(indice):
+            tabela = _buscar(indice.historicos, inep, 'Escola')
+            if 'etapa' in parametros:
+                tabela = tabela[tabela['ETAPA'] == parametros['etapa']]
+            if 'componente' in parametros:
+                tabela = tabela[tabela['COMPONENTE_CURRICULAR'] == parametros['componente']]
+            return tabela
+
+        return _responder(servico, requisicao, 'historico', parametros, obter)
+
+    def tabela_crescimento(requisicao):
+        parametros = {nome: requisicao.query_params[nome] for nome in ('etapa', 'componente', 'municipio')
+                      if requisicao.query_params.get(nome)}
+        return _responder(servico, requisicao, 'crescimento', parametros,
+                          lambda indice: crescimento.consultar_crescimento(indice.crescimento, **parametros))
+
+    def tabela_coortes(requisicao):
+        parametros = {'componente': requisicao.query_params.get('componente', '')}
+        return _responder(servico, requisicao, 'coortes', parametros,
+                          lambda indice: indice.coortes[indice.coortes['COMPONENTE_CURRICULAR'] == parametros['componente']]
+                          if parametros['componente'] else indice.coortes)
+
+    # Converte ErroRequisicao em resposta JSON
+    def tratar_erros(funcao):
+        def rota(requisicao):
+            try:
+                return funcao(requisicao)
+            except ErroRequisicao as e:
+                return Response(json.dumps({'erro': e.mensagem}, ensure_ascii=False).encode('utf-8'),
+                                status_code=e.status, media_type='application/json; charset=utf-8')
+        return rota
+
+    return Starlette(routes=[
+        Route('/versao', tratar_erros(versao)),
+        Route('/ranking', tratar_erros(ranking)),
+        Route('/quartis', tratar_erros(quartis)),
+        Route('/municipios', tratar_erros(municipios)),
+        Route('/escolas/{inep}/historico', tratar_erros(historico)),
+        Route('/crescimento', tratar_erros(tabela_crescimento)),
+        Route('/coortes', tratar_erros(tabela_coortes)),
+    ])
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="API HTTP somente leitura dos resultados do SPAECE")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8000)
+    args = parser.parse_args()
+
+    servico = ServicoSPAECE()
+    servico.indice()  # monta o índice antes de aceitar requisições
+    uvicorn.run(criar_app(servico), host=args.host, port=args.porta)
@@ -0,0 +1,71 @@
+import argparse
+import time
+
+import anomalias
+import banco
+import base
+import cache_disco
+import configuracao
+import consultas
+import coortes
+import crescimento
+import relatorios
+
+# Pré-aquecimento do cache em disco: calcula as bases normalizadas, as tabelas de
+# crescimento, coortes e anomalias e as classificações e quartis das combinações
+# (ETAPA, COMPONENTE, EDIÇÃO) mais consultadas, antes da chegada dos usuários.
+#
+# Uso: python dashboard_spaece_5_9_ano/aquecer_cache.py [--ultimas-edicoes 3] [--pdfs]
+
+
+# Seleciona as combinações das N edições mais recentes de cada etapa e componente
+def combinacoes_recentes(result_spaece, result_alfa, ultimas_edicoes=None):
+    selecionadas = []
+    todas = consultas.combinacoes(result_spaece, result_alfa)
+    for etapa, componente in sorted({(etapa, componente) for etapa, componente, _ in todas}):
+        edicoes = sorted(edicao for e, c, edicao in todas if (e, c) == (etapa, componente))
+        if ultimas_edicoes:
+            edicoes = edicoes[-ultimas_edicoes:]
+        selecionadas.extend((etapa, componente, edicao) for edicao in edicoes)
+    return selecionadas
+
+
+def aquecer(ultimas_edicoes=None, pdfs=False):
+    inicio = time.perf_counter()
+    result_spaece, result_alfa, _ = base.carregar_bases()
+    if configuracao.BACKEND != 'pandas':
+        banco.preparar_banco(result_spaece, result_alfa)
+    # Versão de cada base calculada uma vez para todas as tabelas e combinações
+    versao_spaece, versao_alfa = base.versao_base(result_spaece), base.versao_base(result_alfa)
+    crescimento.tabela_crescimento_bases(result_spaece, result_alfa, versao_spaece, versao_alfa)
+    coortes.tabelas_coortes(result_spaece, versao_spaece)
+    anomalias.tabela_anomalias_bases(result_spaece, result_alfa, versao_spaece, versao_alfa)
+
+    selecionadas = combinacoes_recentes(result_spaece, result_alfa, ultimas_edicoes)
+    for etapa, componente, edicao in selecionadas:
+        df_base = consultas.selecionar_base(etapa, result_spaece, result_alfa)
+        versao = consultas.selecionar_base(etapa, versao_spaece, versao_alfa)
+        ranking = consultas.ranking_edicao_em_cache(df_base, etapa, componente, edicao, versao)
+        df_quartil, _ = consultas.quartis_edicao_em_cache(df_base, etapa, componente, edicao, versao)
+        if pdfs and not ranking.empty:
+            relatorios.gerar_pdf_em_cache(ranking, edicao)
+            relatorios.gerar_pdf_classificacao_em_cache(df_quartil, componente, etapa, edicao)
+
+    return len(selecionadas), time.perf_counter() - inicio
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pré-aquece o cache em disco do dashboard SPAECE")
+    parser.add_argument('--ultimas-edicoes', type=int, help="Apenas as N edições mais recentes de cada etapa e componente")
+    parser.add_argument('--pdfs', action='store_true', help="Gera também os PDFs de classificação e de quartis")
+    parser.add_argument('--limpar', action='store_true', help="Esvazia o cache antes de aquecer")
+    args = parser.parse_args()
+
+    if args.limpar:
+        cache_disco.limpar()
+
+    quantidade, duracao = aquecer(args.ultimas_edicoes, args.pdfs)
+    estatisticas = cache_disco.estatisticas()
+    print(f"{quantidade} combinações aquecidas em {duracao:.1f}s")
+    print(f"Cache: {estatisticas['itens']} itens, {estatisticas['tamanho_mb']:.1f} MB "
+          f"(limite {estatisticas['limite_mb']:.0f} MB) em {estatisticas['diretorio']}")
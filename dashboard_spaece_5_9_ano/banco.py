@@ -0,0 +1,346 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import base
+import configuracao
+import consultas
+
+# Backend SQL embarcado (SQLite ou DuckDB) para as consultas das abas do dashboard.
+# As bases normalizadas são gravadas em um arquivo de banco com índices nas chaves
+# de filtro, e classificação, quartis e variação entre edições são calculados em SQL
+# com funções de janela (RANK, ROW_NUMBER, LAG), sem filtrar os DataFrames inteiros
+# em memória. O backend é escolhido por SPAECE_BACKEND (ver configuracao.py) e os
+# resultados são conferidos contra o caminho pandas com --verificar.
+#
+# O banco substitui apenas essas consultas: as bases continuam carregadas em memória
+# em cada processo (opções dos seletores, abas de crescimento, coortes e anomalias,
+# boletins), então o backend SQL não reduz a memória do dashboard.
+#
+# A reconstrução do banco acontece numa única transação de escrita: no SQLite, outro
+# processo que use o mesmo arquivo espera a transação terminar e encontra a versão já
+# gravada. O DuckDB não permite que dois processos abram o mesmo arquivo para escrita;
+# com vários processos, use um arquivo por processo (SPAECE_CAMINHO_BANCO) ou o SQLite.
+#
+# Uso: python dashboard_spaece_5_9_ano/banco.py [--construir] [--verificar]
+
+# Tabela de cada base; a coluna LINHA guarda o índice original do DataFrame
+TABELAS = {'spaece': 'resultados_spaece', 'alfa': 'resultados_alfa'}
+
+INDICES = {
+    'edicao': ['ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO'],
+    'escola': ['ESCOLA', 'ETAPA', 'COMPONENTE_CURRICULAR'],
+    'municipio': ['MUNICIPIO', 'ESCOLA', 'ETAPA'],
+}
+
+# Uma conexão por thread (o Streamlit atende cada sessão em uma thread)
+_local = threading.local()
+_trava = threading.Lock()
+
+# Tempo máximo (s) de espera pela transação de escrita de outro processo (SQLite)
+ESPERA_TRAVA = 300
+
+
+def _aspas(coluna):
+    return '"' + coluna.replace('"', '""') + '"'
+
+
+def _tabela(etapa):
+    return TABELAS['alfa'] if etapa == '2º Ano' else TABELAS['spaece']
+
+
+def conectar(backend=None, caminho=None):
+    backend = backend or configuracao.BACKEND
+    caminho = caminho or configuracao.CAMINHO_BANCO
+    if backend == 'duckdb':
+        # Dependência opcional (requirements.txt), importada só com SPAECE_BACKEND=duckdb
+        import duckdb
+        return duckdb.connect(caminho)
+    # Espera a reconstrução feita por outro processo em vez de falhar com "database is locked"
+    return sqlite3.connect(caminho, timeout=ESPERA_TRAVA)
+
+
+# Conexão da thread atual com o banco configurado
+def conexao():
+    chave = (configuracao.BACKEND, configuracao.CAMINHO_BANCO)
+    if getattr(_local, 'chave', None) != chave:
+        _local.conexao = conectar()
+        _local.chave = chave
+    return _local.conexao
+
+
+def _consultar(sql, parametros=()):
+    con = conexao()
+    # Valores vindos das bases compactas (ex.: EDICAO int16) como tipos do Python
+    parametros = [valor.item() if isinstance(valor, np.generic) else valor for valor in parametros]
+    if configuracao.BACKEND == 'duckdb':
+        resultado = con.execute(sql, parametros).df()
+    else:
+        resultado = pd.read_sql_query(sql, con, params=parametros)
+    # NULL volta como None nas colunas de texto; o pandas usa NaN
+    return resultado.where(resultado.notna(), np.nan)
+
+
+def _colunas(tabela):
+    con = conexao()
+    colunas = [linha[1] for linha in con.execute(f"PRAGMA table_info({tabela})").fetchall()]
+    return [coluna for coluna in colunas if coluna != 'LINHA']
+
+
+# ---------------------------------------------------------------------------
+# Construção do banco
+# ---------------------------------------------------------------------------
+
+def _versao_gravada(con):
+    try:
+        return dict(con.execute("SELECT BASE, VERSAO FROM versao").fetchall())
+    except Exception:
+        return {}
+
+
+# Tipo SQLite de cada coluna (mesmos tipos que o DataFrame.to_sql usaria)
+def _tipo_sqlite(serie):
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(serie):
+        return 'REAL'
+    return 'TEXT'
+
+
+# Cria e preenche uma tabela do SQLite na transação aberta (o DataFrame.to_sql faria
+# commit no meio da reconstrução e liberaria a trava de escrita)
+def _gravar_tabela_sqlite(con, tabela, dados):
+    colunas = ', '.join(f"{_aspas(coluna)} {_tipo_sqlite(dados[coluna])}" for coluna in dados.columns)
+    con.execute(f"CREATE TABLE {tabela} ({colunas})")
+    # Valores como tipos do Python, com NULL no lugar de NaN e <NA>
+    valores = dados.astype(object).where(dados.notna(), None)
+    con.executemany(f"INSERT INTO {tabela} VALUES ({', '.join('?' * len(dados.columns))})",
+                    valores.itertuples(index=False, name=None))
+
+
+# Grava as bases no arquivo do banco quando a versão dos dados mudou. A verificação da
+# versão e a reconstrução ficam na mesma transação de escrita (entre processos no SQLite)
+def preparar_banco(result_spaece, result_alfa, forcar=False, versoes=None):
+    versoes = versoes or {'spaece': base.versao_base(result_spaece), 'alfa': base.versao_base(result_alfa)}
+    with _trava:
+        os.makedirs(os.path.dirname(configuracao.CAMINHO_BANCO) or '.', exist_ok=True)
+        con = conexao()
+        if not forcar and _versao_gravada(con) == versoes:
+            return False
+
+        con.execute("BEGIN TRANSACTION" if configuracao.BACKEND == 'duckdb' else "BEGIN IMMEDIATE")
+        try:
+            # Outro processo pode ter gravado a mesma versão enquanto este esperava a trava
+            # (tabela criada antes da leitura: no DuckDB, um erro dentro da transação a anula)
+            con.execute("CREATE TABLE IF NOT EXISTS versao (BASE VARCHAR, VERSAO VARCHAR)")
+            if not forcar and _versao_gravada(con) == versoes:
+                con.rollback()
+                return False
+
+            for nome, df in [('spaece', result_spaece), ('alfa', result_alfa)]:
+                tabela = TABELAS[nome]
+                # No banco, textos sem categorias e decimais em precisão dupla com 2 casas
+                dados = df.assign(LINHA=df.index)
+                for coluna in dados.columns:
+                    if isinstance(dados[coluna].dtype, pd.CategoricalDtype):
+                        dados[coluna] = dados[coluna].astype(object)
+                decimais = dados.select_dtypes(include='float32').columns
+                dados[decimais] = dados[decimais].astype('float64').round(2)
+                con.execute(f"DROP TABLE IF EXISTS {tabela}")
+                if configuracao.BACKEND == 'duckdb':
+                    con.register('dados_temporarios', dados)
+                    con.execute(f"CREATE TABLE {tabela} AS SELECT * FROM dados_temporarios")
+                    con.unregister('dados_temporarios')
+                else:
+                    _gravar_tabela_sqlite(con, tabela, dados)
+                for sufixo, colunas in INDICES.items():
+                    con.execute(f"CREATE INDEX idx_{tabela}_{sufixo} ON {tabela} ({', '.join(map(_aspas, colunas))})")
+
+            con.execute("DELETE FROM versao")
+            con.executemany("INSERT INTO versao VALUES (?, ?)", list(versoes.items()))
+            con.commit()
+        except BaseException:
+            con.rollback()
+            raise
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Consultas (mesmos formatos de saída de consultas.py)
+# ---------------------------------------------------------------------------
+
+# Classificação das escolas de uma edição com RANK() (sem os resultados oficiais dos municípios)
+def ranking_edicao(etapa, componente, edicao):
+    resultado = _consultar(f"""
+        SELECT LINHA, RANK() OVER (ORDER BY PROFICIENCIA_MEDIA DESC) AS ORD,
+               ESCOLA, ETAPA, PROFICIENCIA_MEDIA, COMPONENTE_CURRICULAR, EDICAO
+        FROM {_tabela(etapa)}
+        WHERE ETAPA = ? AND COMPONENTE_CURRICULAR = ? AND EDICAO = ? AND NOT AGREGADO
+        ORDER BY PROFICIENCIA_MEDIA DESC, LINHA
+    """, (etapa, componente, edicao))
+    resultado['ORD'] = resultado['ORD'].apply(lambda x: f"{int(x)}º")
+    return resultado.set_index('LINHA').rename_axis(None)
+
+
+# Quartis de uma edição: cortes por interpolação linear (como Series.quantile),
+# calculados com ROW_NUMBER() e COUNT() sobre a edição ordenada
+def quartis_edicao(etapa, componente, edicao):
+    tabela = _tabela(etapa)
+    resultado = _consultar(f"""
+        WITH filtrado AS (
+            SELECT * FROM {tabela}
+            WHERE ETAPA = ? AND COMPONENTE_CURRICULAR = ? AND EDICAO = ? AND NOT AGREGADO
+        ),
+        ordenado AS (
+            SELECT PROFICIENCIA_MEDIA AS X,
+                   ROW_NUMBER() OVER (ORDER BY PROFICIENCIA_MEDIA) - 1 AS I,
+                   COUNT(*) OVER () AS N
+            FROM filtrado
+        ),
+        posicoes AS (
+            SELECT P, (N - 1) * P AS H, FLOOR((N - 1) * P) AS BAIXO
+            FROM (SELECT DISTINCT N FROM ordenado) AS contagem,
+                 (SELECT 0.25 AS P UNION ALL SELECT 0.5 UNION ALL SELECT 0.75) AS probabilidades
+        ),
+        cortes AS (
+            SELECT posicoes.P,
+                   MAX(CASE WHEN I = BAIXO THEN X END)
+                   + (H - BAIXO) * (COALESCE(MAX(CASE WHEN I = BAIXO + 1 THEN X END), MAX(CASE WHEN I = BAIXO THEN X END))
+                                    - MAX(CASE WHEN I = BAIXO THEN X END)) AS CORTE
+            FROM posicoes, ordenado
+            GROUP BY posicoes.P, H, BAIXO
+        ),
+        q AS (
+            SELECT MAX(CASE WHEN P = 0.25 THEN CORTE END) AS Q1,
+                   MAX(CASE WHEN P = 0.5 THEN CORTE END) AS Q2,
+                   MAX(CASE WHEN P = 0.75 THEN CORTE END) AS Q3
+            FROM cortes
+        )
+        SELECT filtrado.LINHA, {', '.join('filtrado.' + _aspas(coluna) for coluna in _colunas(tabela))},
+               CASE WHEN PROFICIENCIA_MEDIA <= Q1 THEN ? WHEN PROFICIENCIA_MEDIA <= Q2 THEN ?
+                    WHEN PROFICIENCIA_MEDIA <= Q3 THEN ? ELSE ? END AS QUARTIL,
+               Q1, Q2, Q3
+        FROM filtrado, q
+        ORDER BY filtrado.LINHA
+    """, (etapa, componente, edicao, *consultas.ORDEM_QUARTIS))
+
+    if resultado.empty:
+        return resultado.drop(columns=['LINHA', 'QUARTIL', 'Q1', 'Q2', 'Q3']), None
+
+    cortes = tuple(float(resultado[coluna].iloc[0]) for coluna in ['Q1', 'Q2', 'Q3'])
+    return resultado.drop(columns=['Q1', 'Q2', 'Q3']).set_index('LINHA').rename_axis(None), cortes
+
+
+# Resultados de uma escola com a edição anterior de cada componente (LAG)
+def variacao_escola(municipio, escola, etapa):
+    tabela = _tabela(etapa)
+    colunas = ', '.join(_aspas(coluna) for coluna in _colunas(tabela))
+    resultado = _consultar(f"""
+        SELECT LINHA, {colunas},
+               LAG(EDICAO) OVER janela AS EDICAO_ANTERIOR,
+               LAG(PROFICIENCIA_MEDIA) OVER janela AS PROFICIENCIA_ANTERIOR
+        FROM {tabela}
+        WHERE MUNICIPIO = ? AND ESCOLA = ? AND ETAPA = ?
+        WINDOW janela AS (PARTITION BY COMPONENTE_CURRICULAR ORDER BY EDICAO)
+        ORDER BY COMPONENTE_CURRICULAR, EDICAO
+    """, (municipio, escola, etapa))
+    return resultado.set_index('LINHA').rename_axis(None)
+
+
+# Posição de uma escola no ranking de cada edição, com RANK() por edição
+def posicoes_escola(etapa, componente, escola):
+    resultado = _consultar(f"""
+        SELECT EDICAO, ESCOLA, ETAPA, COMPONENTE_CURRICULAR, PROFICIENCIA_MEDIA, POSICAO, LINHA
+        FROM (
+            SELECT *, RANK() OVER (PARTITION BY EDICAO ORDER BY PROFICIENCIA_MEDIA DESC) AS POSICAO
+            FROM {_tabela(etapa)}
+            WHERE ETAPA = ? AND COMPONENTE_CURRICULAR = ? AND NOT AGREGADO
+        ) AS classificadas
+        WHERE ESCOLA = ?
+        ORDER BY EDICAO, LINHA
+    """, (etapa, componente, escola))
+    return resultado.set_index('LINHA').rename_axis(None)
+
+
+# ---------------------------------------------------------------------------
+# Conferência com o caminho pandas
+# ---------------------------------------------------------------------------
+
+# Compara no formato de exibição (o caminho pandas usa as bases compactas)
+def _comparar(nome, esperado, obtido, diferencas):
+    try:
+        pd.testing.assert_frame_equal(
+            base.formatar_base(esperado).sort_index(), base.formatar_base(obtido).sort_index(),
+            check_dtype=False, check_index_type=False, check_exact=False, rtol=1e-9
+        )
+    except AssertionError as e:
+        diferencas.append((nome, str(e).splitlines()[0]))
+
+
+# Executa todas as consultas nos dois caminhos e retorna a lista de divergências
+def verificar_equivalencia(result_spaece, result_alfa):
+    diferencas = []
+    verificadas = 0
+
+    for etapa, componente, edicao in consultas.combinacoes(result_spaece, result_alfa):
+        df_base = consultas.selecionar_base(etapa, result_spaece, result_alfa)
+        rotulo = f"{etapa} / {componente} / {edicao}"
+
+        _comparar(f"ranking {rotulo}", consultas.ranking_edicao(df_base, etapa, componente, edicao),
+                  ranking_edicao(etapa, componente, edicao), diferencas)
+
+        esperado, cortes_esperados = consultas.quartis_edicao(df_base, etapa, componente, edicao)
+        obtido, cortes_obtidos = quartis_edicao(etapa, componente, edicao)
+        _comparar(f"quartis {rotulo}", esperado, obtido, diferencas)
+        # Cortes do caminho pandas calculados sobre float32: tolerância da precisão simples
+        if not np.allclose(cortes_esperados, cortes_obtidos, rtol=1e-6):
+            diferencas.append((f"cortes {rotulo}", f"{cortes_esperados} != {cortes_obtidos}"))
+        verificadas += 2
+
+    for df_base in (result_spaece, result_alfa):
+        escolas = df_base[['MUNICIPIO', 'ESCOLA', 'ETAPA', 'COMPONENTE_CURRICULAR']].drop_duplicates()
+        for municipio, escola, etapa, componente in escolas.itertuples(index=False, name=None):
+            rotulo = f"{escola} ({municipio}) / {etapa} / {componente}"
+            esperado = consultas.variacao_escola(df_base, municipio, escola, etapa)
+            _comparar(f"variação {rotulo}", esperado[esperado['COMPONENTE_CURRICULAR'] == componente],
+                      variacao_escola(municipio, escola, etapa).query('COMPONENTE_CURRICULAR == @componente'), diferencas)
+            _comparar(f"posições {rotulo}", consultas.posicoes_escola(df_base, etapa, componente, escola),
+                      posicoes_escola(etapa, componente, escola), diferencas)
+            verificadas += 2
+
+    return verificadas, diferencas
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backend SQL embarcado do dashboard SPAECE")
+    parser.add_argument('--backend', choices=['sqlite', 'duckdb'], help="Padrão: SPAECE_BACKEND ou sqlite")
+    parser.add_argument('--caminho', help="Arquivo do banco (padrão: SPAECE_CAMINHO_BANCO)")
+    parser.add_argument('--construir', action='store_true', help="Regrava o banco mesmo sem mudança nos dados")
+    parser.add_argument('--verificar', action='store_true', help="Confere as consultas SQL contra o caminho pandas")
+    args = parser.parse_args()
+
+    configuracao.BACKEND = args.backend or (configuracao.BACKEND if configuracao.BACKEND != 'pandas' else 'sqlite')
+    if args.caminho:
+        configuracao.CAMINHO_BANCO = args.caminho
+    elif not os.environ.get('SPAECE_CAMINHO_BANCO'):
+        configuracao.CAMINHO_BANCO = configuracao.caminho_banco_padrao(configuracao.BACKEND)
+
+    result_spaece, result_alfa, _ = base.carregar_bases()
+    inicio = time.perf_counter()
+    gravado = preparar_banco(result_spaece, result_alfa, forcar=args.construir)
+    print(f"Banco {configuracao.BACKEND} em {configuracao.CAMINHO_BANCO} "
+          f"({'gravado' if gravado else 'já atualizado'}, {time.perf_counter() - inicio:.1f}s)")
+
+    if args.verificar:
+        inicio = time.perf_counter()
+        verificadas, diferencas = verificar_equivalencia(result_spaece, result_alfa)
+        print(f"{verificadas} consultas conferidas em {time.perf_counter() - inicio:.1f}s, {len(diferencas)} divergências")
+        for nome, detalhe in diferencas[:20]:
+            print(f"  {nome}: {detalhe}")
+        if diferencas:
+            raise SystemExit(1)
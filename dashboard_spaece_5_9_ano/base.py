@@ -0,0 +1,129 @@
+import hashlib
+
+import pandas as pd
+
+import cache_disco
+import configuracao
+import validacao
+
+# Carga das planilhas do SPAECE (5º/9º Ano) e do SPAECE-Alfa (2º Ano)
+
+
+# Colunas de texto guardadas como categorias: cada rótulo distinto fica uma vez no
+# dicionário da coluna e as linhas guardam apenas o código inteiro
+COLUNAS_CATEGORICAS = validacao.COLUNAS_TEXTO
+
+# Códigos guardados como inteiros e exibidos como texto
+COLUNAS_CODIGOS = ['INEP_MUN', 'INEP_ESC', 'EDICAO', 'EDICAO_ANTERIOR']
+
+
+# Inteiro de 32 bits quando todos os códigos cabem, senão 64 bits
+# (anulavel: tipo do pandas que aceita valores ausentes)
+def _codigo_inteiro(serie, anulavel=False):
+    tipo = 'int32' if serie.dropna().abs().max() < 2 ** 31 else 'int64'
+    return serie.astype(tipo.capitalize() if anulavel else tipo)
+
+
+# Representação compacta das bases em memória: textos como categorias, EDICAO em
+# int16, códigos INEP em int32/int64 e decimais (2 casas) em float32. É o formato
+# usado em todas as consultas; os rótulos só voltam na exibição (formatar_base)
+def compactar_base(df):
+    df = df.copy()
+    for coluna in df.columns.intersection(COLUNAS_CATEGORICAS):
+        df[coluna] = df[coluna].astype('category')
+    df['EDICAO'] = df['EDICAO'].astype('int16')
+    df['INEP_MUN'] = _codigo_inteiro(df['INEP_MUN'])
+    df['INEP_ESC'] = _codigo_inteiro(df['INEP_ESC'], anulavel=True)
+
+    # Limitar valores a 2 casas decimais
+    colunas = df.select_dtypes(include='float').columns
+    df[colunas] = df[colunas].round(2).astype('float32')
+    return df
+
+
+# Decimais de uma coluna (ou colunas) das bases compactas em float64 com as 2 casas
+# da planilha: médias, quartis e diferenças são calculados sobre esses valores,
+# sem o erro de representação do float32
+def decimais(valores):
+    return valores.astype('float64').round(2)
+
+
+# Converte as colunas para o formato exibido no dashboard (tabelas, gráficos, PDFs,
+# CSVs e API): rótulos das categorias, códigos INEP e EDICAO como texto sem pontos
+# e vírgulas e decimais em float64 com 2 casas
+def formatar_base(df):
+    df = df.copy()
+    for coluna in df.columns:
+        if isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype(object)
+
+    for coluna in df.columns.intersection(COLUNAS_CODIGOS):
+        codigos = pd.to_numeric(df[coluna], errors='coerce').astype('Int64')
+        df[coluna] = codigos.astype(str).replace('<NA>', '')
+
+    colunas = df.select_dtypes(include='float32').columns
+    df[colunas] = decimais(df[colunas])
+    return df
+
+
+# Lê, valida e compacta uma planilha; retorna (DataFrame, relatório de qualidade)
+def carregar_base(caminho, niveis, nome):
+    bruto = pd.read_excel(caminho)
+    df, relatorio = validacao.validar_base(bruto, niveis, nome)
+    return compactar_base(df), relatorio
+
+
+# Versão das planilhas: hash do conteúdo dos arquivos
+def versao_arquivos(*caminhos):
+    conteudo = hashlib.sha1()
+    for caminho in caminhos:
+        with open(caminho, 'rb') as f:
+            conteudo.update(f.read())
+    return conteudo.hexdigest()[:16]
+
+
+# Carrega as duas bases do dashboard e o relatório de qualidade combinado.
+# O resultado fica no cache em disco: após um reinício, as planilhas só são
+# lidas novamente se o conteúdo dos arquivos mudar.
+def carregar_bases():
+    versao = versao_arquivos(configuracao.CAMINHO_SPAECE, configuracao.CAMINHO_ALFA)
+    return cache_disco.obter('bases', versao, None, _ler_bases)
+
+
+def _ler_bases():
+    result_spaece, relatorio_spaece = carregar_base(configuracao.CAMINHO_SPAECE, validacao.NIVEIS_SPAECE, 'result_spaece')
+    result_alfa, relatorio_alfa = carregar_base(configuracao.CAMINHO_ALFA, validacao.NIVEIS_ALFA, 'result_alfa')
+    relatorio = pd.concat([relatorio_spaece, relatorio_alfa], ignore_index=True)
+    return result_spaece, result_alfa, relatorio
+
+
+# Resultados das escolas, sem os resultados oficiais dos municípios (AGREGADO, ver validacao)
+def escolas(df):
+    return df[~df['AGREGADO'].astype(bool)]
+
+
+# Resultados oficiais dos municípios (linhas com o código do município no lugar do da escola)
+def municipios(df):
+    return df[df['AGREGADO'].astype(bool)]
+
+
+# Identificador da escola: código INEP ou, na falta dele, o município e o nome
+def identificar_escolas(df):
+    inep = df['INEP_ESC'].astype(str).replace({'<NA>': '', 'nan': ''})
+    return inep.where(inep != '', 'ESCOLA:' + df['MUNICIPIO'].astype(str) + '/' + df['ESCOLA'].astype(str))
+
+
+# Mesma identificação como inteiro (INEP ou, na falta dele, código negativo do
+# município e do nome), para agrupar todas as escolas sem montar textos
+def codigos_escolas(df):
+    inep = pd.to_numeric(df['INEP_ESC'], errors='coerce')
+    nomes = df.groupby(['MUNICIPIO', 'ESCOLA'], sort=False, observed=True, dropna=False).ngroup().to_numpy()
+    return inep.fillna(pd.Series(-1 - nomes, index=df.index)).astype('int64')
+
+
+# Versão de um DataFrame: hash do conteúdo, usado como chave dos caches de tabelas derivadas
+def versao_base(df):
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    conteudo = hashlib.sha1(hashes.tobytes())
+    conteudo.update('|'.join(df.columns.astype(str)).encode('utf-8'))
+    return conteudo.hexdigest()[:16]
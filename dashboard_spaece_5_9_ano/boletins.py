@@ -0,0 +1,352 @@
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+
+import base
+import cache_disco
+import configuracao
+import consultas
+import graficos
+import relatorios
+import validacao
+
+# Boletim em PDF por escola com todas as edições: para cada etapa e componente, as
+# barras de proficiência e as barras empilhadas por nível (aba "Dashboard"), a tabela
+# de variação entre edições e a evolução frente aos quartis (aba "Quartil").
+#
+# Os gráficos são os mesmos PNGs do cache em disco usados nos downloads do dashboard
+# (mesma especificação e resolução), e a logo é convertida uma vez por processo e
+# gravada uma única vez em cada documento. A geração em lote distribui as escolas
+# entre processos, grava cada PDF direto no disco e recicla os processos
+# periodicamente, mantendo a memória limitada.
+#
+# Uso: python dashboard_spaece_5_9_ano/boletins.py --saida boletins/ [--processos 4] [--limite 100]
+
+# Níveis e cores das barras empilhadas de cada etapa (as mesmas da aba "Dashboard")
+NIVEIS_ETAPA = {
+    '2º Ano': (validacao.NIVEIS_ALFA, ['red', 'orange', 'yellow', 'lightgreen', 'darkgreen']),
+    '5º Ano': (validacao.NIVEIS_SPAECE, ['red', 'yellow', 'lightgreen', 'darkgreen']),
+    '9º Ano': (validacao.NIVEIS_SPAECE, ['red', 'yellow', 'lightgreen', 'darkgreen']),
+}
+
+NOMES_COMPONENTES = {'MATEMÁTICA': 'Matemática', 'LÍNGUA PORTUGUESA': 'Língua Portuguesa'}
+
+# Área máxima de cada gráfico na página (mm)
+LARGURA_GRAFICO = 180
+ALTURA_GRAFICO = 130
+
+# Escolas por tarefa e tarefas por processo antes de reciclá-lo
+ESCOLAS_POR_LOTE = 8
+LOTES_POR_PROCESSO = 25
+
+
+# Texto compatível com as fontes padrão do FPDF (latin-1)
+def _texto(valor):
+    return str(valor).encode('latin1', 'replace').decode('latin1')
+
+
+class BoletimPDF(FPDF):
+    def __init__(self, escola, municipio, inep):
+        super().__init__(orientation='P', unit='mm', format='A4')
+        self.escola = escola
+        self.municipio = municipio
+        self.inep = inep
+        self.set_auto_page_break(auto=True, margin=15)
+        self.alias_nb_pages()
+
+    # Cabeçalho de todas as páginas (a logo é gravada uma vez e referenciada nas demais)
+    def header(self):
+        relatorios.adicionar_imagem(self, relatorios.png_logo(), x=10, y=8, w=40)
+        self.set_text_color(0, 0, 0)
+        self.set_xy(55, 9)
+        self.set_font('Arial', 'B', 12)
+        self.cell(0, 6, _texto(f"Boletim SPAECE - {self.escola}"), ln=True)
+        self.set_x(55)
+        self.set_font('Arial', '', 9)
+        self.cell(0, 5, _texto(f"{self.municipio} | INEP: {self.inep or 'não informado'}"), ln=True)
+        self.set_draw_color(0, 51, 102)
+        self.line(10, 22, 200, 22)
+        self.set_y(26)
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_text_color(0, 0, 0)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 6, _texto(f"Setor de Monitoramento e Processamento de Resultados - página {self.page_no()}/{{nb}}"), align='C')
+
+
+# Título de seção; começa nova página se não couber o conteúdo seguinte
+def _titulo_secao(pdf, texto, tamanho=12, espaco=30):
+    if pdf.get_y() + espaco > pdf.page_break_trigger:
+        pdf.add_page()
+    pdf.set_font('Arial', 'B', tamanho)
+    pdf.set_text_color(0, 51, 102)
+    pdf.cell(0, 8, _texto(texto), ln=True)
+    pdf.set_text_color(0, 0, 0)
+
+
+# Insere um PNG centralizado, reduzido para caber na área máxima
+def _inserir_grafico(pdf, png):
+    png, largura, altura = relatorios.png_rgb_em_cache(png)
+    escala = min(LARGURA_GRAFICO / largura, ALTURA_GRAFICO / altura)
+    largura, altura = largura * escala, altura * escala
+    if pdf.get_y() + altura > pdf.page_break_trigger:
+        pdf.add_page()
+    relatorios.adicionar_imagem(pdf, png, x=(210 - largura) / 2, y=pdf.get_y(), w=largura, h=altura)
+    pdf.set_y(pdf.get_y() + altura + 4)
+
+
+def _formatar_variacao(valor, sufixo=''):
+    if pd.isna(valor):
+        return "N/A"
+    return f"{'+' if valor > 0 else '-'} {abs(valor):.1f}{sufixo}"
+
+
+# Tabela de variação por edição (mesmos valores da aba "Dashboard")
+def _tabela_variacao(pdf, tabela):
+    larguras = [25, 35, 35, 40, 40]
+    cabecalhos = ["EDIÇÃO", "PERÍODO", "PROFICIÊNCIA", "DIFERENÇA", "VARIAÇÃO"]
+    margem = (210 - sum(larguras)) / 2
+
+    pdf.set_x(margem)
+    pdf.set_font('Arial', 'B', 9)
+    pdf.set_fill_color(0, 51, 102)
+    pdf.set_text_color(255, 255, 255)
+    for largura, cabecalho in zip(larguras, cabecalhos):
+        pdf.cell(largura, 7, _texto(cabecalho), 1, 0, 'C', fill=True)
+    pdf.ln()
+
+    pdf.set_font('Arial', '', 8)
+    for linha in tabela.itertuples(index=False):
+        if pdf.get_y() + 6 > pdf.page_break_trigger:
+            pdf.add_page()
+        pdf.set_x(margem)
+        pdf.set_text_color(0, 0, 0)
+        pdf.cell(larguras[0], 6, str(linha.EDICAO), 1, 0, 'C')
+        anterior = linha.EDICAO_ANTERIOR or 'N/A'
+        pdf.cell(larguras[1], 6, f"{linha.EDICAO}-{anterior}", 1, 0, 'C')
+        pdf.cell(larguras[2], 6, str(int(linha.PROFICIENCIA_MEDIA)), 1, 0, 'C')
+        for largura, valor, sufixo in [(larguras[3], linha.DIFERENCA, ''), (larguras[4], linha.VARIACAO_PERCENTUAL, '%')]:
+            if pd.isna(valor):
+                pdf.set_text_color(0, 0, 255)
+            else:
+                pdf.set_text_color(*((0, 128, 0) if valor > 0 else (200, 0, 0)))
+            pdf.cell(largura, 6, _formatar_variacao(valor, sufixo), 1, 0, 'C')
+        pdf.ln()
+    pdf.set_text_color(0, 0, 0)
+    pdf.ln(4)
+
+
+# Gera o boletim de uma escola (df_escola: resultados da escola em todas as etapas;
+# cortes: {(etapa, componente): consultas.cortes_quartis_edicoes(...)})
+def gerar_boletim(df_escola, cortes, dpi=None):
+    dpi = dpi or configuracao.DPI_BOLETIM
+    ultima = base.formatar_base(df_escola.sort_values('EDICAO').tail(1)).iloc[0]
+    pdf = BoletimPDF(ultima['ESCOLA'], ultima['MUNICIPIO'], ultima['INEP_ESC'])
+    pdf.add_page()
+
+    for etapa in consultas.ETAPAS:
+        df_etapa = df_escola[df_escola['ETAPA'] == etapa].sort_values('EDICAO', kind='stable')
+        if df_etapa.empty:
+            continue
+        niveis, cores = NIVEIS_ETAPA[etapa]
+        # Nome da edição mais recente nos títulos; a variação vem das próprias linhas da
+        # escola (pelo código INEP), mesmo que o nome tenha mudado entre edições
+        escola = df_etapa['ESCOLA'].iloc[-1]
+        dados_variacao = base.formatar_base(consultas.calcular_variacao(consultas.edicoes_anteriores(df_etapa)))
+
+        for componente in consultas.COMPONENTES:
+            dados = df_etapa[df_etapa['COMPONENTE_CURRICULAR'] == componente]
+            if dados.empty:
+                continue
+            _titulo_secao(pdf, f"{etapa} - {componente}", 13, espaco=80)
+            # Gráficos com os rótulos exibidos no dashboard (mesmos PNGs do cache)
+            rotulados = base.formatar_base(dados)
+
+            # Proficiência média por edição
+            titulo = f'Proficiência Média em {NOMES_COMPONENTES[componente]} - {escola} ({etapa})'
+            png = graficos.png_em_cache(graficos.spec_barras_proficiencia(rotulados, titulo),
+                                        lambda dpi: graficos.png_barras_proficiencia(rotulados, titulo, dpi=dpi), dpi)
+            _inserir_grafico(pdf, png)
+
+            # Distribuição percentual por nível
+            percentuais = graficos.calcular_percentuais(rotulados, niveis)
+            titulo = f'Distribuição Percentual - {componente} - {escola} ({etapa})'
+            png = graficos.png_em_cache(graficos.spec_empilhado(percentuais, niveis, cores, titulo),
+                                        lambda dpi: graficos.png_empilhado(percentuais, niveis, cores, titulo, dpi=dpi), dpi)
+            _inserir_grafico(pdf, png)
+
+            # Variação entre edições
+            _titulo_secao(pdf, "Variação por Edição", 11)
+            _tabela_variacao(pdf, dados_variacao[dados_variacao['COMPONENTE_CURRICULAR'] == componente])
+
+            # Evolução frente aos quartis de cada edição
+            df_resultado = consultas.evolucao_quartis_escola(dados, cortes[(etapa, componente)], escola)
+            if not df_resultado.empty:
+                titulo = f"Evolução da Proficiência\n{escola} - {componente} - {etapa}"
+                png = graficos.png_em_cache(graficos.spec_evolucao_quartis(df_resultado, escola, titulo.split('\n')),
+                                            lambda dpi: graficos.png_evolucao_quartis(df_resultado, escola, titulo, dpi=dpi), dpi)
+                _inserir_grafico(pdf, png)
+    
+    return pdf.output(dest='S').encode('latin1')
+
+
+# Cortes dos quartis de todas as etapas e componentes das duas bases
+def cortes_bases(result_spaece, result_alfa):
+    cortes = {}
+    for df_base in (result_spaece, result_alfa):
+        for etapa, componente in df_base[['ETAPA', 'COMPONENTE_CURRICULAR']].drop_duplicates().itertuples(index=False, name=None):
+            cortes[(etapa, componente)] = consultas.cortes_quartis_edicoes(df_base, etapa, componente)
+    return cortes
+
+
+# Resultados de cada escola (código INEP ou nome) nas duas bases
+def agrupar_escolas(result_spaece, result_alfa):
+    grupos = {}
+    for df_base in (base.escolas(result_spaece), base.escolas(result_alfa)):
+        for id_escola, grupo in df_base.groupby(base.identificar_escolas(df_base), sort=False):
+            grupos.setdefault(id_escola, []).append(grupo)
+    return {id_escola: pd.concat(partes) for id_escola, partes in grupos.items()}
+
+
+# Boletim da escola selecionada no dashboard, em cache pela versão dos dados
+# (`versao`: versões das duas bases já calculadas na carga)
+def boletim_escola(result_spaece, result_alfa, municipio, escola, dpi=None, versao=None):
+    dpi = dpi or configuracao.DPI_BOLETIM
+
+    def gerar():
+        df_escola = pd.concat([
+            df_base[(df_base['MUNICIPIO'] == municipio) & (df_base['ESCOLA'] == escola)]
+            for df_base in (base.escolas(result_spaece), base.escolas(result_alfa))
+        ])
+        return gerar_boletim(df_escola, cortes_bases(result_spaece, result_alfa), dpi)
+
+    versao = versao or base.versao_base(result_spaece) + base.versao_base(result_alfa)
+    return cache_disco.obter('boletim', versao, {'municipio': municipio, 'escola': escola, 'dpi': dpi}, gerar)
+
+
+def nome_arquivo(id_escola):
+    if id_escola.startswith('ESCOLA:'):
+        id_escola = re.sub(r'\W+', '_', id_escola.split(':', 1)[1]).strip('_')
+    return f"boletim_{id_escola}.pdf"
+
+
+# ---------------------------------------------------------------------------
+# Geração em lote
+# ---------------------------------------------------------------------------
+
+# Estado de cada processo de geração: dados agrupados por escola e cortes dos quartis
+_estado = {}
+
+
+def _iniciar_processo(saida, dpi):
+    result_spaece, result_alfa, _ = base.carregar_bases()
+    _estado['escolas'] = agrupar_escolas(result_spaece, result_alfa)
+    _estado['cortes'] = cortes_bases(result_spaece, result_alfa)
+    _estado['saida'] = saida
+    _estado['dpi'] = dpi
+
+
+# Gera e grava os boletins de um lote; retorna só os metadados e o pico de memória
+def _gerar_lote(ids):
+    resultados = []
+    for id_escola in ids:
+        inicio = time.perf_counter()
+        conteudo = gerar_boletim(_estado['escolas'][id_escola], _estado['cortes'], _estado['dpi'])
+        caminho = os.path.join(_estado['saida'], nome_arquivo(id_escola))
+        with open(caminho, 'wb') as f:
+            f.write(conteudo)
+        resultados.append((id_escola, caminho, len(conteudo), time.perf_counter() - inicio))
+    return resultados, pico_memoria_mb()
+
+
+# Pico de memória residente do processo atual em MB; None sem o módulo resource (Windows)
+def pico_memoria_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em bytes no macOS e em KiB no Linux
+    return pico / 1024 ** 2 if sys.platform == 'darwin' else pico / 1024
+
+
+# Gera os boletins de todas as escolas (ou de ids) em paralelo;
+# retorna (DataFrame com um boletim por linha, pico de memória por processo em MB ou None)
+def gerar_boletins(saida, ids=None, processos=None, dpi=None):
+    dpi = dpi or configuracao.DPI_BOLETIM
+    processos = processos or os.cpu_count() or 1
+    os.makedirs(saida, exist_ok=True)
+
+    result_spaece, result_alfa, _ = base.carregar_bases()
+    if ids is None:
+        ids = sorted(agrupar_escolas(result_spaece, result_alfa))
+    lotes = [ids[i:i + ESCOLAS_POR_LOTE] for i in range(0, len(ids), ESCOLAS_POR_LOTE)]
+
+    resultados = []
+    memorias = []
+    if processos == 1:
+        _iniciar_processo(saida, dpi)
+        for lote in lotes:
+            resultado, memoria = _gerar_lote(lote)
+            resultados.extend(resultado)
+            memorias.append(memoria)
+    else:
+        # Poucos lotes em andamento por vez: a fila não cresce com o número de escolas
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(processos, mp_context=contexto, initializer=_iniciar_processo,
+                                 initargs=(saida, dpi), max_tasks_per_child=LOTES_POR_PROCESSO) as executor:
+            pendentes = set()
+            lotes = iter(lotes)
+            while True:
+                for lote in lotes:
+                    pendentes.add(executor.submit(_gerar_lote, lote))
+                    if len(pendentes) >= processos * 2:
+                        break
+                if not pendentes:
+                    break
+                concluidos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    resultado, memoria = futuro.result()
+                    resultados.extend(resultado)
+                    memorias.append(memoria)
+
+    tabela = pd.DataFrame(resultados, columns=['ID_ESCOLA', 'ARQUIVO', 'BYTES', 'SEGUNDOS'])
+    memorias = [memoria for memoria in memorias if memoria is not None]
+    return tabela, max(memorias) if memorias else None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gera os boletins em PDF das escolas (todas as edições)")
+    parser.add_argument('--saida', default='boletins', help="Diretório dos PDFs")
+    parser.add_argument('--processos', type=int, help="Processos em paralelo (padrão: número de núcleos)")
+    parser.add_argument('--dpi', type=int, help="Resolução dos gráficos (padrão: SPAECE_DPI_BOLETIM)")
+    parser.add_argument('--limite', type=int, help="Apenas as N primeiras escolas")
+    parser.add_argument('--escola', action='append', help="Código INEP da escola (pode repetir)")
+    args = parser.parse_args()
+
+    ids = args.escola
+    if args.limite and not ids:
+        result_spaece, result_alfa, _ = base.carregar_bases()
+        ids = sorted(agrupar_escolas(result_spaece, result_alfa))[:args.limite]
+
+    inicio = time.perf_counter()
+    tabela, pico_memoria = gerar_boletins(args.saida, ids, args.processos, args.dpi)
+    duracao = time.perf_counter() - inicio
+
+    # Benchmark: tamanho dos arquivos e vazão
+    print(f"{len(tabela)} boletins em {duracao:.1f}s ({len(tabela) / duracao:.1f} boletins/s) em {args.saida}")
+    print(f"Tamanho: total {tabela['BYTES'].sum() / 1024 / 1024:.1f} MB, "
+          f"médio {tabela['BYTES'].mean() / 1024:.0f} KB, máximo {tabela['BYTES'].max() / 1024:.0f} KB")
+    print(f"Tempo por boletim: mediana {tabela['SEGUNDOS'].median():.2f}s, "
+          f"p95 {np.percentile(tabela['SEGUNDOS'], 95):.2f}s")
+    print(f"Pico de memória por processo: {pico_memoria:.0f} MB" if pico_memoria is not None
+          else "Pico de memória por processo: não disponível nesta plataforma")
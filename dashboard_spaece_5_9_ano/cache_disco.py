@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+import configuracao
+
+# Cache em disco para tabelas e arquivos derivados (bases normalizadas, rankings,
+# quartis, PNGs e PDFs), preservado entre reinícios do servidor.
+# Cada item é endereçado pelo conteúdo: hash do nome da função, da versão dos
+# dados e dos parâmetros. O tamanho total é limitado e os itens usados há mais
+# tempo são removidos primeiro (LRU, pela data de modificação do arquivo).
+
+# Incrementar quando o formato das tabelas derivadas mudar, para invalidar o cache
+VERSAO_FORMATO = 5
+
+# Bytes gravados por este processo desde a última verificação do limite: o diretório
+# só é varrido a cada ~1% do limite gravado, e não a cada item (geração em lote)
+_gravados_desde_limite = 0
+
+
+# Chave do item: hash de (formato, nome, versão dos dados, parâmetros)
+def gerar_chave(nome, versao, parametros=None):
+    conteudo = json.dumps([VERSAO_FORMATO, nome, versao, parametros], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def _caminho(chave):
+    return os.path.join(configuracao.DIRETORIO_CACHE, chave[:2], chave + '.pkl')
+
+
+# Lê um item do cache; retorna (encontrado, valor)
+def ler(chave):
+    caminho = _caminho(chave)
+    try:
+        with open(caminho, 'rb') as f:
+            valor = pickle.load(f)
+    except FileNotFoundError:
+        return False, None
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        # Arquivo corrompido ou de uma versão incompatível: descarta
+        remover(chave)
+        return False, None
+
+    # Marca o item como usado recentemente
+    try:
+        os.utime(caminho)
+    except OSError:
+        pass
+    return True, valor
+
+
+# Grava um item de forma atômica (arquivo temporário + rename)
+def gravar(chave, valor):
+    caminho = _caminho(chave)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as f:
+            pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.unlink(temporario)
+        raise
+
+    global _gravados_desde_limite
+    _gravados_desde_limite += os.path.getsize(caminho)
+    if _gravados_desde_limite >= configuracao.CACHE_TAMANHO_MAXIMO_MB * 1024 * 1024 / 100:
+        _gravados_desde_limite = 0
+        aplicar_limite()
+
+
+def remover(chave):
+    try:
+        os.unlink(_caminho(chave))
+    except OSError:
+        pass
+
+
+# Itens guardados em cada cache em memória dos módulos (_cache): as versões antigas dos
+# dados saem quando chegam versões novas
+ITENS_MEMORIA = 4
+
+
+# Retorna o valor do cache em memória `cache` (dicionário do módulo) ou calcula e guarda,
+# mantendo apenas os ITENS_MEMORIA itens usados mais recentemente
+def obter_memoria(cache, chave, calcular):
+    if chave in cache:
+        cache[chave] = cache.pop(chave)
+        return cache[chave]
+    valor = calcular()
+    cache[chave] = valor
+    while len(cache) > ITENS_MEMORIA:
+        del cache[next(iter(cache))]
+    return valor
+
+
+# Retorna o valor em cache ou calcula, grava e retorna
+def obter(nome, versao, parametros, calcular):
+    if not configuracao.CACHE_DISCO:
+        return calcular()
+
+    chave = gerar_chave(nome, versao, parametros)
+    encontrado, valor = ler(chave)
+    if encontrado:
+        return valor
+
+    valor = calcular()
+    try:
+        gravar(chave, valor)
+    except OSError:
+        # Falha de escrita (disco cheio, sem permissão) não interrompe o dashboard
+        pass
+    return valor
+
+
+# Lista os itens do cache: (caminho, tamanho em bytes, último uso)
+def listar_itens():
+    itens = []
+    if not os.path.isdir(configuracao.DIRETORIO_CACHE):
+        return itens
+    for pasta, _, arquivos in os.walk(configuracao.DIRETORIO_CACHE):
+        for arquivo in arquivos:
+            if not arquivo.endswith('.pkl'):
+                continue
+            caminho = os.path.join(pasta, arquivo)
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue
+            itens.append((caminho, info.st_size, info.st_mtime))
+    return itens
+
+
+# Remove os itens usados há mais tempo até o cache caber no limite configurado
+def aplicar_limite(tamanho_maximo=None):
+    if tamanho_maximo is None:
+        tamanho_maximo = configuracao.CACHE_TAMANHO_MAXIMO_MB * 1024 * 1024
+    itens = listar_itens()
+    total = sum(tamanho for _, tamanho, _ in itens)
+    for caminho, tamanho, _ in sorted(itens, key=lambda item: item[2]):
+        if total <= tamanho_maximo:
+            break
+        try:
+            os.unlink(caminho)
+            total -= tamanho
+        except OSError:
+            pass
+    return total
+
+
+# Quantidade de itens e tamanho total do cache
+def estatisticas():
+    itens = listar_itens()
+    return {
+        'itens': len(itens),
+        'tamanho_mb': sum(tamanho for _, tamanho, _ in itens) / (1024 * 1024),
+        'limite_mb': configuracao.CACHE_TAMANHO_MAXIMO_MB,
+        'diretorio': configuracao.DIRETORIO_CACHE,
+    }
+
+
+# Remove todos os itens do cache
+def limpar():
+    for caminho, _, _ in listar_itens():
+        try:
+            os.unlink(caminho)
+        except OSError:
+            pass
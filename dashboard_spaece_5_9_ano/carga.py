@@ -0,0 +1,334 @@
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import streamlit
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.sync.client import connect
+
+import sintetico
+
+# Teste de carga local do dashboard: sobe o servidor (`streamlit run dados.py`) e
+# simula usuários simultâneos com um cliente do protocolo do navegador (websocket
+# /_stcore/stream). Cada usuário é uma sessão que repete um roteiro realista:
+# município, escola, troca de aba, PDF. Para cada nível de concorrência, o relatório
+# traz os percentis da latência de cada rerun (envio do rerun até o fim do script),
+# a memória do servidor por sessão aberta e a ocupação de CPU do processo do servidor.
+#
+# O AppTest do Streamlit não serve para sessões simultâneas: cada execução troca o
+# Runtime global do processo. Por isso o teste usa o servidor de verdade, que roda
+# todas as sessões em threads de um único processo.
+#
+# Dependências: pip install -r dashboard_spaece_5_9_ano/requirements-dev.txt
+# Uso: python dashboard_spaece_5_9_ano/carga.py [--concorrencia 1 2 4 8] [--repeticoes 2] [--sintetico] [--etapas]
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados.py')
+TEMPO_LIMITE = 600
+PERCENTIS = [50, 90, 95, 99]
+
+# Escolhas no roteiro: a mesma semente repete os mesmos usuários
+SEMENTE = 0
+
+# Intervalo entre as amostras de CPU e memória do servidor (s)
+AMOSTRAGEM = 0.5
+
+# Versão do Streamlit para a qual o cliente foi escrito: usa as mensagens internas de
+# streamlit.proto e a chave no fim do id dos widgets ("...-<key>"). A versão está
+# fixada em requirements-dev.txt, junto com o websockets (o dashboard não a exige)
+VERSAO_STREAMLIT = '1.66.0'
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# Sobe o dashboard em segundo plano; `ambiente` acrescenta variáveis SPAECE_*
+def iniciar_servidor(porta, ambiente=None):
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', APP, '--server.headless', 'true',
+         '--server.port', str(porta), '--browser.gatherUsageStats', 'false'],
+        env={**os.environ, **(ambiente or {})}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    limite = time.time() + 60
+    while time.time() < limite:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{porta}/_stcore/health', timeout=1) as resposta:
+                if resposta.status == 200:
+                    return processo
+        except OSError:
+            time.sleep(0.2)
+    processo.kill()
+    raise RuntimeError(f"O servidor do Streamlit não respondeu na porta {porta}")
+
+
+# Tempo de CPU (s) e memória residente (MB) de um processo, lidos em /proc (Linux)
+def uso_processo(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        campos = f.read().rsplit(')', 1)[1].split()
+    cpu = (int(campos[11]) + int(campos[12])) / os.sysconf('SC_CLK_TCK')
+    with open(f'/proc/{pid}/status') as f:
+        rss = next(int(linha.split()[1]) for linha in f if linha.startswith('VmRSS:')) / 1024
+    return cpu, rss
+
+
+def conectar(url):
+    return connect(f'{url}/_stcore/stream', subprotocols=['streamlit'], max_size=None, open_timeout=60)
+
+
+# Sessão simulada: conexão, widgets da última execução e valores escolhidos pelo usuário
+def nova_sessao(conexao):
+    return {
+        'conexao': conexao,
+        'selectbox': {},  # chave do widget -> proto do selectbox
+        'botoes': {},     # rótulo -> id do botão
+        'valores': {},    # chave do widget -> (id do widget, valor escolhido)
+    }
+
+
+# Chave informada em key=... (fica no fim do id do widget)
+def _chave(id_widget):
+    chave = id_widget.rsplit('-', 1)[-1]
+    return None if chave == 'None' else chave
+
+
+# Um rerun como o navegador faz: envia os valores dos widgets (e o botão clicado) e lê
+# as mensagens até o fim do script; retorna (ms, exceção do app ou falha do roteiro, ou '')
+def rerun(sessao, selecoes=None, botao=None):
+    for chave, valor in (selecoes or {}).items():
+        sessao['valores'][chave] = (sessao['selectbox'][chave].id, valor)
+
+    mensagem = BackMsg()
+    mensagem.rerun_script.query_string = ''
+    for id_widget, valor in sessao['valores'].values():
+        mensagem.rerun_script.widget_states.widgets.append(WidgetState(id=id_widget, string_value=valor))
+    if botao:
+        mensagem.rerun_script.widget_states.widgets.append(WidgetState(id=sessao['botoes'][botao], trigger_value=True))
+
+    inicio = time.perf_counter()
+    sessao['conexao'].send(mensagem.SerializeToString())
+    selectbox, botoes, downloads, erros = {}, {}, [], []
+    while True:
+        resposta = ForwardMsg()
+        resposta.ParseFromString(sessao['conexao'].recv(timeout=TEMPO_LIMITE))
+        if resposta.WhichOneof('type') == 'script_finished':
+            break
+        if resposta.WhichOneof('type') != 'delta' or resposta.delta.WhichOneof('type') != 'new_element':
+            continue
+        elemento = resposta.delta.new_element
+        tipo = elemento.WhichOneof('type')
+        if tipo == 'selectbox' and _chave(elemento.selectbox.id):
+            selectbox[_chave(elemento.selectbox.id)] = elemento.selectbox
+        elif tipo == 'button':
+            botoes[elemento.button.label] = elemento.button.id
+        elif tipo == 'download_button':
+            downloads.append(elemento.download_button.label)
+        elif tipo == 'exception':
+            erros.append(elemento.exception.message)
+    duracao = (time.perf_counter() - inicio) * 1000
+
+    # O botão do roteiro gera um PDF: a execução precisa terminar com o download dele
+    if botao and not any('PDF' in rotulo for rotulo in downloads):
+        erros.append(f"sem download de PDF após '{botao}'")
+
+    # Widget com id novo (as opções mudaram) volta ao valor padrão, como no navegador
+    sessao['selectbox'], sessao['botoes'] = selectbox, botoes
+    sessao['valores'] = {
+        chave: (id_widget, valor) for chave, (id_widget, valor) in sessao['valores'].items()
+        if chave in selectbox and selectbox[chave].id == id_widget
+    }
+    return duracao, erros[0] if erros else ''
+
+
+def _opcao(sessao, chave, rng, ultimas=None):
+    opcoes = list(sessao['selectbox'][chave].options)
+    return rng.choice(opcoes[-ultimas:] if ultimas else opcoes)
+
+
+# Roteiro de um usuário: (etapa, escolhas), com escolhas(sessao, rng) -> (seleções, botão).
+# As abas do Streamlit são trocadas no navegador, sem rerun; trocar de aba aqui é usar
+# os widgets da aba. Na classificação e nos quartis, 5º ou 9º Ano (com dados nos dois
+# componentes); na classificação, uma das 3 edições mais recentes.
+ROTEIRO = [
+    ('abrir', lambda sessao, rng: ({}, None)),
+    ('municipio', lambda sessao, rng: ({'municipio_dashboard': _opcao(sessao, 'municipio_dashboard', rng)}, None)),
+    ('escola', lambda sessao, rng: ({'escola_dashboard': _opcao(sessao, 'escola_dashboard', rng)}, None)),
+    ('aba_classificacao', lambda sessao, rng: ({
+        'etapa_classificacao': rng.choice(['5º Ano', '9º Ano']),
+        'edicao_classificacao': _opcao(sessao, 'edicao_classificacao', rng, ultimas=3),
+    }, None)),
+    ('pdf_classificacao', lambda sessao, rng: ({}, "Gerar PDF da Classificação")),
+    ('aba_escola', lambda sessao, rng: ({'escola_classificacao_tab3': _opcao(sessao, 'escola_classificacao_tab3', rng)}, None)),
+    ('aba_quartil', lambda sessao, rng: ({
+        'etapa_quartil': rng.choice(['5º Ano', '9º Ano']),
+        'componente_quartil': _opcao(sessao, 'componente_quartil', rng),
+    }, None)),
+    ('pdf_quartis', lambda sessao, rng: ({}, "📄 Gerar PDF da Classificação")),
+]
+
+
+# Executa o roteiro `repeticoes` vezes numa sessão nova; registra (usuário, etapa, ms, erro).
+# A sessão fica aberta até `pronto`, para medir a memória de todas as sessões juntas.
+def _simular_usuario(url, usuario, repeticoes, pausa, registros, pronto):
+    rng = random.Random(SEMENTE + usuario)
+    aberta = False
+    try:
+        with conectar(url) as conexao:
+            sessao = nova_sessao(conexao)
+            for repeticao in range(repeticoes):
+                for etapa, escolhas in ROTEIRO:
+                    if repeticao > 0 and etapa == 'abrir':
+                        continue
+                    try:
+                        duracao, erro = rerun(sessao, *escolhas(sessao, rng))
+                    except KeyError as e:
+                        # Widget ou botão ausente na última execução (ex.: erro na etapa anterior)
+                        duracao, erro = 0.0, f"widget ausente: {e}"
+                    registros.append((usuario, etapa, duracao, erro))
+                    if pausa:
+                        time.sleep(rng.uniform(0, pausa))
+            aberta = True
+            pronto.wait()
+    except Exception as e:
+        registros.append((usuario, 'sessao', 0.0, repr(e)))
+    finally:
+        # Sessão que falhou não bloqueia a medição das demais
+        if not aberta:
+            pronto.wait()
+
+
+# Um nível de concorrência: `usuarios` sessões simultâneas; retorna (resumo, registros).
+# `pid`: processo do servidor, para medir CPU e memória (None: sem essas medidas)
+def medir_nivel(url, usuarios, repeticoes=1, pausa=0.0, pid=None):
+    registros = []
+    pronto = threading.Barrier(usuarios + 1)
+    amostras = []
+    parar = threading.Event()
+
+    def amostrar():
+        while not parar.wait(AMOSTRAGEM):
+            amostras.append((time.perf_counter(), *uso_processo(pid)))
+
+    if pid:
+        amostras.append((time.perf_counter(), *uso_processo(pid)))
+        amostragem = threading.Thread(target=amostrar, daemon=True)
+        amostragem.start()
+    inicio = time.perf_counter()
+    threads = [
+        threading.Thread(target=_simular_usuario, args=(url, usuario, repeticoes, pausa, registros, pronto))
+        for usuario in range(usuarios)
+    ]
+    for thread in threads:
+        thread.start()
+    pronto.wait()
+    duracao = time.perf_counter() - inicio
+    if pid:
+        parar.set()
+        amostragem.join()
+        amostras.append((time.perf_counter(), *uso_processo(pid)))
+    for thread in threads:
+        thread.join()
+
+    tabela = pd.DataFrame(registros, columns=['USUARIO', 'ETAPA', 'MS', 'ERRO'])
+    tabela['CONCORRENCIA'] = usuarios
+    reruns = tabela[tabela['ETAPA'] != 'sessao']
+    resumo = {
+        'CONCORRENCIA': usuarios,
+        'RERUNS': len(reruns),
+        'ERROS': int((tabela['ERRO'] != '').sum()),
+        **{f'P{p}_MS': np.percentile(reruns['MS'], p) if len(reruns) else np.nan for p in PERCENTIS},
+        'MAX_MS': reruns['MS'].max(),
+        'RERUNS_POR_S': len(reruns) / duracao,
+    }
+    if pid:
+        # CPU em núcleos ocupados pelo servidor: média do nível e pico entre amostras
+        tempos, cpus, rss = (np.array(coluna) for coluna in zip(*amostras))
+        media = (cpus[-1] - cpus[0]) / (tempos[-1] - tempos[0])
+        resumo.update({
+            'CPU_NUCLEOS': media,
+            'CPU_PICO': (np.diff(cpus) / np.diff(tempos)).max(),
+            'CPU_%': media / (os.cpu_count() or 1) * 100,
+            'MB_POR_SESSAO': max(rss[-1] - rss[0], 0) / usuarios,
+            'RSS_MB': rss[-1],
+        })
+    return resumo, tabela
+
+
+# Abre uma sessão para aquecer os caches do servidor (tempo da carga a frio) e mede
+# cada nível; retorna (primeira execução em s, resumo por nível, registros)
+def testar_carga(url, concorrencias, repeticoes=1, pausa=0.0, pid=None):
+    with conectar(url) as conexao:
+        primeira_execucao, erro = rerun(nova_sessao(conexao))
+    if erro:
+        raise RuntimeError(f"O dashboard falhou na primeira execução: {erro}")
+
+    resumos, tabelas = zip(*(medir_nivel(url, usuarios, repeticoes, pausa, pid) for usuarios in concorrencias))
+    return primeira_execucao / 1000, pd.DataFrame(resumos), pd.concat(tabelas, ignore_index=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Teste de carga do dashboard SPAECE com usuários simulados")
+    parser.add_argument('--concorrencia', type=int, nargs='+', default=[1, 2, 4, 8], help="Usuários simultâneos de cada nível")
+    parser.add_argument('--repeticoes', type=int, default=1, help="Vezes que cada usuário repete o roteiro")
+    parser.add_argument('--pausa', type=float, default=0.0, help="Pausa máxima (s) entre as ações de um usuário")
+    parser.add_argument('--sintetico', action='store_true', help="Usa planilhas sintéticas com o volume do estado")
+    parser.add_argument('--municipios', type=int, default=sintetico.MUNICIPIOS)
+    parser.add_argument('--escolas-por-municipio', type=int, default=sintetico.ESCOLAS_POR_MUNICIPIO)
+    parser.add_argument('--url', help="Testa um dashboard já em execução (ex.: http://localhost:8501), sem subir o servidor")
+    parser.add_argument('--pid', type=int, help="Com --url: processo do servidor, para medir CPU e memória")
+    parser.add_argument('--etapas', action='store_true', help="Mostra também os percentis por etapa do roteiro")
+    parser.add_argument('--csv', help="Grava a latência de cada rerun neste arquivo")
+    args = parser.parse_args()
+
+    if streamlit.__version__ != VERSAO_STREAMLIT:
+        print(f"Aviso: o teste de carga foi escrito para o Streamlit {VERSAO_STREAMLIT} (instalado: "
+              f"{streamlit.__version__}); o protocolo do navegador pode ter mudado.", file=sys.stderr)
+
+    servidor = None
+    url, pid = args.url, args.pid
+    if url:
+        url = url.replace('http://', 'ws://').replace('https://', 'wss://').rstrip('/')
+    else:
+        # As planilhas sintéticas entram pelas variáveis de ambiente lidas em configuracao.py
+        ambiente = {}
+        if args.sintetico:
+            pasta = tempfile.mkdtemp(prefix='spaece_carga_')
+            caminho_spaece, caminho_alfa = sintetico.gravar_bases(pasta, args.municipios, args.escolas_por_municipio)
+            ambiente = {'SPAECE_CAMINHO_SPAECE': caminho_spaece, 'SPAECE_CAMINHO_ALFA': caminho_alfa}
+            print(f"Planilhas sintéticas em {pasta}")
+        porta = porta_livre()
+        servidor = iniciar_servidor(porta, ambiente)
+        url, pid = f'ws://127.0.0.1:{porta}', servidor.pid
+
+    try:
+        primeira_execucao, resumo, tabela = testar_carga(url, args.concorrencia, args.repeticoes, args.pausa, pid)
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+
+    pd.set_option('display.width', 200)
+    print(f"Primeira execução (caches frios): {primeira_execucao:.1f}s; núcleos disponíveis: {os.cpu_count()}")
+    print(resumo.round(1).to_string(index=False))
+    if args.etapas:
+        print()
+        por_etapa = tabela[tabela['ETAPA'] != 'sessao'].groupby(['CONCORRENCIA', 'ETAPA'], sort=False)['MS']
+        print(por_etapa.describe(percentiles=[p / 100 for p in PERCENTIS]).drop(columns=['mean', 'std', 'min']).round(0).to_string())
+    erros = tabela[tabela['ERRO'] != '']
+    if len(erros):
+        print()
+        print(erros.groupby(['ETAPA', 'ERRO']).size().to_string())
+    if args.csv:
+        tabela.to_csv(args.csv, index=False)
@@ -0,0 +1,49 @@
+import os
+
+# Configurações do dashboard lidas de variáveis de ambiente
+
+# Diretório do dashboard (caminhos independentes do diretório de execução)
+DIRETORIO_BASE = os.path.dirname(os.path.abspath(__file__))
+
+CAMINHO_SPAECE = os.environ.get('SPAECE_CAMINHO_SPAECE', os.path.join(DIRETORIO_BASE, 'xls', 'result_spaece.xlsx'))
+CAMINHO_ALFA = os.environ.get('SPAECE_CAMINHO_ALFA', os.path.join(DIRETORIO_BASE, 'xls', 'result_alfa.xlsx'))
+CAMINHO_LOGO = os.path.join(DIRETORIO_BASE, 'img', 'logo_2021.png')
+
+# Backend de renderização dos gráficos:
+# 'cliente'  -> especificações Vega-Lite compactas renderizadas no navegador (padrão)
+# 'servidor' -> imagens PNG geradas com matplotlib (uma vez por gráfico, em memória)
+RENDERIZACAO = os.environ.get('SPAECE_RENDERIZACAO', 'cliente').strip().lower()
+
+if RENDERIZACAO not in ('cliente', 'servidor'):
+    RENDERIZACAO = 'cliente'
+
+# Resolução (DPI) dos PNGs gerados para download
+DPI_DOWNLOAD = int(os.environ.get('SPAECE_DPI_DOWNLOAD', '300'))
+
+# Resolução (DPI) dos gráficos inseridos nos boletins em PDF
+DPI_BOLETIM = int(os.environ.get('SPAECE_DPI_BOLETIM', '100'))
+
+# Painel de depuração com as contagens de recálculo dos nós do dashboard (grafo.py)
+DEPURACAO = os.environ.get('SPAECE_DEPURACAO', '0').strip().lower() in ('1', 'true', 'sim')
+
+# Cache em disco das tabelas derivadas, preservado entre reinícios do servidor
+CACHE_DISCO = os.environ.get('SPAECE_CACHE_DISCO', '1').strip().lower() not in ('0', 'false', 'nao', 'não')
+DIRETORIO_CACHE = os.environ.get('SPAECE_DIRETORIO_CACHE', os.path.join(DIRETORIO_BASE, '.cache'))
+CACHE_TAMANHO_MAXIMO_MB = float(os.environ.get('SPAECE_CACHE_TAMANHO_MAXIMO_MB', '512'))
+
+# Backend das consultas de classificação, quartis e variação:
+# 'pandas' -> filtros sobre os DataFrames em memória (padrão)
+# 'sqlite' / 'duckdb' -> SQL com funções de janela em um arquivo de banco embarcado
+#                        (cópia adicional das bases: a memória do dashboard não diminui;
+#                        'duckdb' requer o pacote opcional duckdb)
+BACKEND = os.environ.get('SPAECE_BACKEND', 'pandas').strip().lower()
+
+if BACKEND not in ('pandas', 'sqlite', 'duckdb'):
+    BACKEND = 'pandas'
+
+
+def caminho_banco_padrao(backend):
+    return os.path.join(DIRETORIO_CACHE, 'spaece.duckdb' if backend == 'duckdb' else 'spaece.sqlite')
+
+
+CAMINHO_BANCO = os.environ.get('SPAECE_CAMINHO_BANCO', caminho_banco_padrao(BACKEND))
@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+import base
+import cache_disco
+import configuracao
+
+# Consultas usadas pelas abas do dashboard e pelos comandos de linha de comando.
+# As funções *_em_cache guardam o resultado no cache em disco, pela versão dos dados.
+# Com SPAECE_BACKEND = 'sqlite' ou 'duckdb', as funções *_em_cache e consultar_*
+# executam as mesmas consultas em SQL no banco embarcado (ver banco.py).
+
+ETAPAS = ['2º Ano', '5º Ano', '9º Ano']
+COMPONENTES = ['MATEMÁTICA', 'LÍNGUA PORTUGUESA']
+
+# Rótulos e cores dos quartis da aba "Quartil"
+ORDEM_QUARTIS = ["Q1 (25% piores)", "Q2 (25% básicas)", "Q3 (25% intermediárias)", "Q4 (25% melhores)"]
+CORES_QUARTIS = ['#ff9999', '#ffcc99', '#99cc99', '#99ccff']
+
+# Rótulos da evolução de uma escola frente aos quartis (aba "Quartil", "Escola Específica")
+ORDEM_QUARTIS_ESCOLA = ["Q1 (25% baixo)", "Q2 (25% médio baixo)", "Q3 (25% médio alto)", "Q4 (25% alto)"]
+
+
+# Escolher o banco de dados correto com base na etapa (2º Ano: SPAECE-Alfa)
+def selecionar_base(etapa, result_spaece, result_alfa):
+    return result_alfa if etapa == '2º Ano' else result_spaece
+
+
+# Combinações (ETAPA, COMPONENTE, EDIÇÃO) com resultados de escolas nas bases
+def combinacoes(result_spaece, result_alfa):
+    pares = pd.concat([base.escolas(result_spaece), base.escolas(result_alfa)])[['ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO']]
+    return sorted(pares.drop_duplicates().itertuples(index=False, name=None))
+
+
+# Resultado oficial de cada município em uma edição (aba "Classificação por Edição")
+def resultados_municipios(df_base, etapa, componente, edicao):
+    df_base = base.municipios(df_base)
+    return df_base[
+        (df_base['ETAPA'] == etapa) &
+        (df_base['COMPONENTE_CURRICULAR'] == componente) &
+        (df_base['EDICAO'] == edicao)
+    ]
+
+
+# Classificação das escolas por proficiência média em uma edição (aba "Classificação por Edição")
+def ranking_edicao(df_base, etapa, componente, edicao):
+    df_base = base.escolas(df_base)
+    df_filtrado = df_base[
+        (df_base['ETAPA'] == etapa) &
+        (df_base['COMPONENTE_CURRICULAR'] == componente) &
+        (df_base['EDICAO'] == edicao)
+    ]
+
+    # Ordenar por PROFICIENCIA_MEDIA do maior para o menor
+    df_filtrado = df_filtrado.sort_values(by='PROFICIENCIA_MEDIA', ascending=False)
+
+    # Adicionar coluna ORD com a classificação ordinal (1º, 2º, 3º, etc.)
+    df_filtrado['ORD'] = df_filtrado['PROFICIENCIA_MEDIA'].rank(method='min', ascending=False).astype(int)
+    df_filtrado['ORD'] = df_filtrado['ORD'].apply(lambda x: f"{int(x)}º")
+
+    return df_filtrado[['ORD', 'ESCOLA', 'ETAPA', 'PROFICIENCIA_MEDIA', 'COMPONENTE_CURRICULAR', 'EDICAO']]
+
+
+# Classifica as escolas de uma edição nos quartis de proficiência (aba "Quartil")
+# Retorna (DataFrame com a coluna QUARTIL, (q1, q2, q3)); os cortes são None sem dados
+def quartis_edicao(df_base, etapa, componente, edicao):
+    df_base = base.escolas(df_base)
+    df_quartil = df_base[
+        (df_base['EDICAO'] == edicao) &
+        (df_base['ETAPA'] == etapa) &
+        (df_base['COMPONENTE_CURRICULAR'] == componente)
+    ].copy()
+
+    if df_quartil.empty:
+        return df_quartil, None
+
+    proficiencia = base.decimais(df_quartil['PROFICIENCIA_MEDIA'])
+    q1, q2, q3 = proficiencia.quantile([0.25, 0.5, 0.75])
+
+    def classificar_quartil(proficiencia):
+        if proficiencia <= q1:
+            return ORDEM_QUARTIS[0]
+        elif proficiencia <= q2:
+            return ORDEM_QUARTIS[1]
+        elif proficiencia <= q3:
+            return ORDEM_QUARTIS[2]
+        else:
+            return ORDEM_QUARTIS[3]
+
+    df_quartil['QUARTIL'] = proficiencia.apply(classificar_quartil)
+    return df_quartil, (q1, q2, q3)
+
+
+# Resultados de uma escola com a edição anterior de cada componente (tabela de variação do "Dashboard";
+# com o nome do município como escola, mostra o resultado oficial do município)
+def variacao_escola(df_base, municipio, escola, etapa):
+    dados = df_base[
+        (df_base['MUNICIPIO'] == municipio) &
+        (df_base['ESCOLA'] == escola) &
+        (df_base['ETAPA'] == etapa)
+    ].sort_values(['COMPONENTE_CURRICULAR', 'EDICAO'], kind='stable')
+
+    anteriores = dados.groupby('COMPONENTE_CURRICULAR', observed=True)[['EDICAO', 'PROFICIENCIA_MEDIA']].shift(1)
+    return dados.assign(EDICAO_ANTERIOR=anteriores['EDICAO'], PROFICIENCIA_ANTERIOR=anteriores['PROFICIENCIA_MEDIA'])
+
+
+# Edição anterior de cada escola e componente, pelo código da escola (INEP) e na ordem
+# das edições; mesmas colunas de variacao_escola (boletins, com todas as linhas da escola)
+def edicoes_anteriores(dados):
+    dados = dados.sort_values('EDICAO', kind='stable')
+    grupos = [base.codigos_escolas(dados), dados['COMPONENTE_CURRICULAR']]
+    anteriores = dados.groupby(grupos, observed=True)[['EDICAO', 'PROFICIENCIA_MEDIA']].shift(1)
+    return (dados.assign(EDICAO_ANTERIOR=anteriores['EDICAO'], PROFICIENCIA_ANTERIOR=anteriores['PROFICIENCIA_MEDIA'])
+            .sort_values(['COMPONENTE_CURRICULAR', 'EDICAO'], kind='stable'))
+
+
+# Posição de uma escola no ranking de cada edição (aba "Classificação da Escola")
+def posicoes_escola(df_base, etapa, componente, escola):
+    df_base = base.escolas(df_base)
+    df_posicao = df_base[
+        (df_base['ETAPA'] == etapa) &
+        (df_base['COMPONENTE_CURRICULAR'] == componente)
+    ].copy()
+    df_posicao['POSICAO'] = df_posicao.groupby('EDICAO')['PROFICIENCIA_MEDIA'].rank(method='min', ascending=False).astype(int)
+    df_posicao = df_posicao[df_posicao['ESCOLA'] == escola].sort_values('EDICAO', kind='stable')
+    return df_posicao[['EDICAO', 'ESCOLA', 'ETAPA', 'COMPONENTE_CURRICULAR', 'PROFICIENCIA_MEDIA', 'POSICAO']]
+
+
+# Cortes dos quartis de proficiência em cada edição de uma etapa e componente
+def cortes_quartis_edicoes(df_base, etapa, componente):
+    df_base = base.escolas(df_base)
+    dados = df_base[(df_base['ETAPA'] == etapa) & (df_base['COMPONENTE_CURRICULAR'] == componente)]
+    cortes = base.decimais(dados['PROFICIENCIA_MEDIA']).groupby(dados['EDICAO']).quantile([0.25, 0.5, 0.75]).unstack()
+    cortes.columns = ['Q1', 'MEDIANA (Q2)', 'Q3']
+    return cortes
+
+
+# Evolução de uma escola frente aos quartis de cada edição em que foi avaliada
+# (df_escola: resultados da escola na etapa e componente; cortes: cortes_quartis_edicoes)
+def evolucao_quartis_escola(df_escola, cortes, escola):
+    dados = (df_escola.drop_duplicates('EDICAO')[['EDICAO', 'PROFICIENCIA_MEDIA']]
+             .merge(cortes, left_on='EDICAO', right_index=True)
+             .sort_values('EDICAO'))
+    proficiencia = base.decimais(dados['PROFICIENCIA_MEDIA'])
+    quartil = np.select(
+        [proficiencia <= dados['Q1'], proficiencia <= dados['MEDIANA (Q2)'], proficiencia <= dados['Q3']],
+        ORDEM_QUARTIS_ESCOLA[:3], ORDEM_QUARTIS_ESCOLA[3]
+    )
+    return pd.DataFrame({
+        'ESCOLA': escola,
+        'EDIÇÃO': dados['EDICAO'].astype(str).values,
+        'PROFICIÊNCIA': proficiencia.values,
+        'QUARTIL': quartil,
+        'Q1': dados['Q1'].values,
+        'MEDIANA (Q2)': dados['MEDIANA (Q2)'].values,
+        'Q3': dados['Q3'].values,
+    })
+
+
+# Diferença e variação percentual em relação à edição anterior, sobre a proficiência
+# em valores inteiros como exibida na tabela de variação (entrada: variacao_escola)
+def calcular_variacao(dados_variacao):
+    atual = np.trunc(base.decimais(dados_variacao['PROFICIENCIA_MEDIA']))
+    anterior = np.trunc(base.decimais(dados_variacao['PROFICIENCIA_ANTERIOR']))
+    return dados_variacao.assign(DIFERENCA=atual - anterior, VARIACAO_PERCENTUAL=(atual - anterior) / anterior * 100)
+
+
+def _backend_sql():
+    return configuracao.BACKEND != 'pandas'
+
+
+# `versao`: base.versao_base(df_base) já calculada na carga (evita percorrer a base a cada consulta)
+def ranking_edicao_em_cache(df_base, etapa, componente, edicao, versao=None):
+    if _backend_sql():
+        import banco
+        return banco.ranking_edicao(etapa, componente, edicao)
+    return cache_disco.obter(
+        'ranking_edicao', versao or base.versao_base(df_base),
+        {'etapa': etapa, 'componente': componente, 'edicao': edicao},
+        lambda: ranking_edicao(df_base, etapa, componente, edicao)
+    )
+
+
+def quartis_edicao_em_cache(df_base, etapa, componente, edicao, versao=None):
+    if _backend_sql():
+        import banco
+        return banco.quartis_edicao(etapa, componente, edicao)
+    return cache_disco.obter(
+        'quartis_edicao', versao or base.versao_base(df_base),
+        {'etapa': etapa, 'componente': componente, 'edicao': edicao},
+        lambda: quartis_edicao(df_base, etapa, componente, edicao)
+    )
+
+
+def consultar_variacao_escola(df_base, municipio, escola, etapa):
+    if _backend_sql():
+        import banco
+        return banco.variacao_escola(municipio, escola, etapa)
+    return variacao_escola(df_base, municipio, escola, etapa)
+
+
+def consultar_posicoes_escola(df_base, etapa, componente, escola):
+    if _backend_sql():
+        import banco
+        return banco.posicoes_escola(etapa, componente, escola)
+    return posicoes_escola(df_base, etapa, componente, escola)
@@ -0,0 +1,121 @@
+import argparse
+
+import pandas as pd
+
+import base
+import cache_disco
+import validacao
+
+# Acompanhamento de coortes: a turma avaliada no 5º Ano na edição N é a mesma
+# avaliada no 9º Ano na edição N + 4. Os resultados das duas etapas são ligados
+# pelo código da escola em um único merge para todas as escolas.
+
+ETAPA_INICIAL = '5º Ano'
+ETAPA_FINAL = '9º Ano'
+DESLOCAMENTO_EDICOES = 4
+
+# Tabelas já calculadas, por versão dos dados (últimas versões, ver cache_disco.obter_memoria)
+_cache = {}
+
+
+# Liga os resultados de 5º Ano (edição N) aos de 9º Ano (edição N + 4) da mesma escola
+def calcular_coortes(result_spaece, niveis=validacao.NIVEIS_SPAECE):
+    result_spaece = base.escolas(result_spaece)
+    colunas = ['ID_ESCOLA', 'INEP_ESC', 'ESCOLA', 'MUNICIPIO', 'COMPONENTE_CURRICULAR', 'EDICAO', 'PROFICIENCIA_MEDIA'] + niveis
+    dados = result_spaece.assign(
+        ID_ESCOLA=base.identificar_escolas(result_spaece),
+        EDICAO=pd.to_numeric(result_spaece['EDICAO'])
+    )
+    dados[['PROFICIENCIA_MEDIA'] + niveis] = base.decimais(dados[['PROFICIENCIA_MEDIA'] + niveis])
+
+    inicial = dados.loc[dados['ETAPA'] == ETAPA_INICIAL, colunas]
+    final = dados.loc[dados['ETAPA'] == ETAPA_FINAL, colunas]
+    inicial = inicial.assign(EDICAO_FINAL=inicial['EDICAO'] + DESLOCAMENTO_EDICOES)
+
+    coortes = inicial.merge(
+        final.drop(columns=['INEP_ESC', 'ESCOLA', 'MUNICIPIO']),
+        left_on=['ID_ESCOLA', 'COMPONENTE_CURRICULAR', 'EDICAO_FINAL'],
+        right_on=['ID_ESCOLA', 'COMPONENTE_CURRICULAR', 'EDICAO'],
+        suffixes=('_5', '_9'),
+        how='inner',
+        validate='one_to_one'
+    )
+
+    tabela = coortes[['INEP_ESC', 'ESCOLA', 'MUNICIPIO', 'COMPONENTE_CURRICULAR']].copy()
+    tabela['COORTE'] = (coortes['EDICAO_5'].astype(str) + ' → ' + coortes['EDICAO_9'].astype(str))
+    tabela['EDICAO_5'] = coortes['EDICAO_5']
+    tabela['EDICAO_9'] = coortes['EDICAO_9']
+    tabela['PROFICIENCIA_5'] = coortes['PROFICIENCIA_MEDIA_5']
+    tabela['PROFICIENCIA_9'] = coortes['PROFICIENCIA_MEDIA_9']
+    tabela['GANHO'] = coortes['PROFICIENCIA_MEDIA_9'] - coortes['PROFICIENCIA_MEDIA_5']
+    for nivel in niveis:
+        tabela[f'DELTA_{nivel}'] = coortes[f'{nivel}_9'] - coortes[f'{nivel}_5']
+
+    return tabela.sort_values(['COMPONENTE_CURRICULAR', 'EDICAO_5', 'GANHO'], ascending=[True, True, False]).reset_index(drop=True)
+
+
+# Resumo estadual por coorte: escolas acompanhadas e ganhos médios
+def resumir_coortes(tabela, niveis=validacao.NIVEIS_SPAECE):
+    agregacoes = {
+        'N_ESCOLAS': ('GANHO', 'size'),
+        'PROFICIENCIA_5': ('PROFICIENCIA_5', 'mean'),
+        'PROFICIENCIA_9': ('PROFICIENCIA_9', 'mean'),
+        'GANHO_MEDIO': ('GANHO', 'mean'),
+        'GANHO_MEDIANO': ('GANHO', 'median'),
+        'GANHO_MINIMO': ('GANHO', 'min'),
+        'GANHO_MAXIMO': ('GANHO', 'max'),
+    }
+    agregacoes.update({f'DELTA_{nivel}': (f'DELTA_{nivel}', 'mean') for nivel in niveis})
+    return (tabela.groupby(['COMPONENTE_CURRICULAR', 'COORTE', 'EDICAO_5', 'EDICAO_9'], observed=True)
+            .agg(**agregacoes).reset_index().sort_values(['COMPONENTE_CURRICULAR', 'EDICAO_5']))
+
+
+# Tabelas de coortes (por escola e estadual) em cache (memória e disco) por versão dos dados.
+# `versao`: base.versao_base(result_spaece) já calculada na carga
+def tabelas_coortes(result_spaece, versao=None):
+    versao = versao or base.versao_base(result_spaece)
+
+    def calcular():
+        tabela = calcular_coortes(result_spaece)
+        return tabela, resumir_coortes(tabela)
+    return cache_disco.obter_memoria(_cache, versao, lambda: cache_disco.obter('coortes', versao, None, calcular))
+
+
+# Consulta a tabela de coortes por escola
+def consultar_coortes(tabela, componente=None, municipio=None, escola=None, coorte=None):
+    mascara = pd.Series(True, index=tabela.index)
+    if componente:
+        mascara &= tabela['COMPONENTE_CURRICULAR'] == componente
+    if municipio:
+        mascara &= tabela['MUNICIPIO'] == municipio
+    if escola:
+        mascara &= tabela['ESCOLA'] == escola
+    if coorte:
+        mascara &= tabela['COORTE'] == coorte
+    return tabela.loc[mascara]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Coortes do 5º Ano (edição N) ao 9º Ano (edição N + 4)")
+    parser.add_argument('--componente', help="Ex.: 'MATEMÁTICA'")
+    parser.add_argument('--municipio')
+    parser.add_argument('--escola')
+    parser.add_argument('--coorte', help="Ex.: '2015 → 2019'")
+    parser.add_argument('--escolas', action='store_true', help="Lista as escolas em vez do resumo estadual")
+    parser.add_argument('--csv', help="Salva o resultado neste arquivo CSV")
+    args = parser.parse_args()
+
+    result_spaece, _, _ = base.carregar_bases()
+    tabela, resumo = tabelas_coortes(result_spaece)
+    if args.escolas or args.municipio or args.escola or args.coorte:
+        resultado = consultar_coortes(tabela, args.componente, args.municipio, args.escola, args.coorte)
+    else:
+        resultado = resumo[resumo['COMPONENTE_CURRICULAR'] == args.componente] if args.componente else resumo
+    resultado = base.formatar_base(resultado)
+
+    if args.csv:
+        resultado.to_csv(args.csv, index=False)
+        print(f"{len(resultado)} linhas salvas em {args.csv}")
+    else:
+        pd.set_option('display.width', 200)
+        print(resultado.round(2).to_string(index=False))
@@ -0,0 +1,161 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import base
+import cache_disco
+import validacao
+
+# Análise de crescimento de todas as escolas ao longo das edições:
+# tendência linear (mínimos quadrados), taxa de crescimento anual composta (CAGR),
+# volatilidade e mudança na distribuição por níveis de proficiência.
+# Todas as escolas são calculadas de uma vez com somas agrupadas do NumPy
+# (np.bincount), sem laços por escola.
+
+GRUPO = ['ETAPA', 'COMPONENTE_CURRICULAR', 'ID_ESCOLA']
+
+# Mínimo de edições para a escola entrar no ranking de crescimento
+MIN_EDICOES_RANKING = 3
+
+# Tabelas já calculadas, por versão dos dados e níveis (últimas versões, ver cache_disco.obter_memoria)
+_cache = {}
+
+
+# Calcula a tabela de crescimento de todas as escolas de uma base
+def calcular_crescimento(df, niveis):
+    df = base.escolas(df)
+    dados = df[['ETAPA', 'COMPONENTE_CURRICULAR', 'INEP_ESC', 'ESCOLA', 'MUNICIPIO', 'EDICAO', 'PROFICIENCIA_MEDIA'] + niveis].copy()
+    dados['ID_ESCOLA'] = base.identificar_escolas(dados)
+    dados['EDICAO'] = pd.to_numeric(dados['EDICAO'])
+    dados = dados.sort_values(GRUPO + ['EDICAO'], kind='mergesort').reset_index(drop=True)
+
+    # Código do grupo de cada linha (linhas de um mesmo grupo ficam contíguas)
+    g = dados.groupby(GRUPO, sort=False, observed=True).ngroup().to_numpy()
+    n_grupos = g.max() + 1 if len(g) else 0
+    x = dados['EDICAO'].to_numpy(dtype=float)
+    y = base.decimais(dados['PROFICIENCIA_MEDIA']).to_numpy()
+
+    n = np.bincount(g, minlength=n_grupos).astype(float)
+    fim = np.cumsum(n).astype(int) - 1
+    inicio = fim - n.astype(int) + 1
+
+    # Regressão linear por grupo (valores centrados na média do grupo)
+    media_x = np.bincount(g, x, n_grupos) / n
+    media_y = np.bincount(g, y, n_grupos) / n
+    dx = x - media_x[g]
+    dy = y - media_y[g]
+    sxx = np.bincount(g, dx * dx, n_grupos)
+    sxy = np.bincount(g, dx * dy, n_grupos)
+    syy = np.bincount(g, dy * dy, n_grupos)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tendencia = np.where(sxx > 0, sxy / sxx, np.nan)
+        r2 = np.where((sxx > 0) & (syy > 0), sxy * sxy / (sxx * syy), np.nan)
+
+        # CAGR entre a primeira e a última edição (em % ao ano)
+        anos = x[fim] - x[inicio]
+        cagr = np.where((anos > 0) & (y[inicio] > 0), ((y[fim] / y[inicio]) ** (1 / anos) - 1) * 100, np.nan)
+
+        # Volatilidade: desvio padrão das variações percentuais entre edições consecutivas
+        # (sem as variações a partir de uma proficiência zero, que não têm percentual)
+        consecutivas = (g[1:] == g[:-1]) & (y[:-1] > 0)
+        gv = g[1:][consecutivas]
+        variacoes = (y[1:][consecutivas] / y[:-1][consecutivas] - 1) * 100
+        n_var = np.bincount(gv, minlength=n_grupos)
+        media_var = np.bincount(gv, variacoes, n_grupos) / n_var
+        soma_quadrados = np.bincount(gv, (variacoes - media_var[gv]) ** 2, n_grupos)
+        volatilidade = np.where(n_var >= 2, np.sqrt(soma_quadrados / (n_var - 1)), np.nan)
+
+    tabela = dados.loc[fim, GRUPO + ['INEP_ESC', 'ESCOLA', 'MUNICIPIO']].reset_index(drop=True)
+    tabela['N_EDICOES'] = n.astype(int)
+    tabela['PRIMEIRA_EDICAO'] = x[inicio].astype(int)
+    tabela['ULTIMA_EDICAO'] = x[fim].astype(int)
+    tabela['PROFICIENCIA_INICIAL'] = y[inicio]
+    tabela['PROFICIENCIA_FINAL'] = y[fim]
+    tabela['TENDENCIA_ANUAL'] = tendencia
+    tabela['R2'] = r2
+    tabela['CAGR_%'] = cagr
+    tabela['VOLATILIDADE_%'] = volatilidade
+
+    # Mudança na distribuição por nível (pontos percentuais, última - primeira edição)
+    percentuais = base.decimais(dados[niveis]).to_numpy()
+    for i, nivel in enumerate(niveis):
+        tabela[f'DELTA_{nivel}'] = percentuais[fim, i] - percentuais[inicio, i]
+
+    return tabela.drop(columns='ID_ESCOLA')
+
+
+# Ranking por tendência dentro de cada etapa e componente, entre as escolas com pelo
+# menos `min_edicoes` edições (as demais ficam sem posição)
+def ranking_crescimento(tabela, min_edicoes=MIN_EDICOES_RANKING):
+    elegiveis = tabela['N_EDICOES'] >= min_edicoes
+    return (tabela['TENDENCIA_ANUAL'].where(elegiveis)
+            .groupby([tabela['ETAPA'], tabela['COMPONENTE_CURRICULAR']], observed=True)
+            .rank(method='min', ascending=False).astype('Int64'))
+
+
+# Tabela de crescimento em cache (memória e disco) por versão dos dados.
+# `versao`: base.versao_base(df) já calculada na carga (evita percorrer a base de novo)
+def tabela_crescimento(df, niveis, versao=None):
+    versao = versao or base.versao_base(df)
+    return cache_disco.obter_memoria(_cache, (versao, tuple(niveis)), lambda: cache_disco.obter(
+        'crescimento', versao, {'niveis': niveis}, lambda: calcular_crescimento(df, niveis)))
+
+
+# Tabela de crescimento das duas bases (2º Ano, 5º e 9º Ano)
+def tabela_crescimento_bases(result_spaece, result_alfa, versao_spaece=None, versao_alfa=None):
+    versao_spaece = versao_spaece or base.versao_base(result_spaece)
+    versao_alfa = versao_alfa or base.versao_base(result_alfa)
+    return cache_disco.obter_memoria(_cache, ('bases', versao_spaece, versao_alfa), lambda: pd.concat([
+        tabela_crescimento(result_spaece, validacao.NIVEIS_SPAECE, versao_spaece),
+        tabela_crescimento(result_alfa, validacao.NIVEIS_ALFA, versao_alfa),
+    ], ignore_index=True))
+
+
+# Consulta a tabela de crescimento com filtros e ordenação; o RANKING é estadual e
+# considera o mesmo mínimo de edições do filtro
+def consultar_crescimento(tabela, etapa=None, componente=None, municipio=None,
+                          min_edicoes=MIN_EDICOES_RANKING, ordem='TENDENCIA_ANUAL', crescente=False, limite=None):
+    tabela = tabela.assign(RANKING=ranking_crescimento(tabela, min_edicoes))
+    mascara = tabela['N_EDICOES'] >= min_edicoes
+    if etapa:
+        mascara &= tabela['ETAPA'] == etapa
+    if componente:
+        mascara &= tabela['COMPONENTE_CURRICULAR'] == componente
+    if municipio:
+        mascara &= tabela['MUNICIPIO'] == municipio
+
+    resultado = tabela.loc[mascara].sort_values(ordem, ascending=crescente, na_position='last')
+    # Remove colunas de níveis que não se aplicam à etapa consultada
+    resultado = resultado.dropna(axis=1, how='all')
+    return resultado.head(limite) if limite else resultado
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ranking de crescimento das escolas no SPAECE")
+    parser.add_argument('--etapa', help="Ex.: '5º Ano'")
+    parser.add_argument('--componente', help="Ex.: 'MATEMÁTICA'")
+    parser.add_argument('--municipio')
+    parser.add_argument('--min-edicoes', type=int, default=MIN_EDICOES_RANKING)
+    parser.add_argument('--ordem', default='TENDENCIA_ANUAL',
+                        help="Coluna de ordenação (TENDENCIA_ANUAL, CAGR_%%, VOLATILIDADE_%%, ...)")
+    parser.add_argument('--crescente', action='store_true', help="Ordena do menor para o maior")
+    parser.add_argument('--limite', type=int, default=20)
+    parser.add_argument('--csv', help="Salva o resultado completo neste arquivo CSV")
+    args = parser.parse_args()
+
+    result_spaece, result_alfa, _ = base.carregar_bases()
+    resultado = consultar_crescimento(
+        tabela_crescimento_bases(result_spaece, result_alfa),
+        etapa=args.etapa, componente=args.componente, municipio=args.municipio,
+        min_edicoes=args.min_edicoes, ordem=args.ordem, crescente=args.crescente,
+        limite=None if args.csv else args.limite
+    )
+    resultado = base.formatar_base(resultado)
+
+    if args.csv:
+        resultado.to_csv(args.csv, index=False)
+        print(f"{len(resultado)} escolas salvas em {args.csv}")
+    else:
+        pd.set_option('display.width', 200)
+        print(resultado.round(2).to_string(index=False))
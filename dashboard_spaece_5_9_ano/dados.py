@@ -1,61 +1,87 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
 import os
-from fpdf import FPDF
 from PIL import Image
-import tempfile
+
+import anomalias
+import base
+import boletins
+import configuracao
+import consultas
+import coortes
+import crescimento
+import grafo
+import graficos
+import relatorios
+import validacao
 
 # Configuração do layout para aumentar a largura do conteúdo
 st.set_page_config(layout="wide")
 
-# Função para formatar números sem pontos e vírgulas
-def formatar_numero(numero):
-    return str(numero).replace('.', '').replace(',', '')
+# PNG exibido no modo 'servidor', guardado em memória por especificação: as execuções
+# seguintes com o mesmo gráfico não rasterizam nem leem o cache em disco de novo
+@st.cache_data(max_entries=128, show_spinner=False)
+def png_exibicao(spec, _gerar_png):
+    return graficos.png_em_cache(spec, _gerar_png, 100)
+
+# Função para exibir um gráfico conforme o backend de renderização configurado.
+# No modo 'cliente' só a especificação Vega-Lite é enviada ao navegador; no modo
+# 'servidor' o gráfico é exibido como PNG. Nos dois modos o PNG em alta resolução
+# é gerado apenas quando o download é solicitado.
+def exibir_grafico(spec, gerar_png, rotulo_download, nome_arquivo, chave):
+    if configuracao.RENDERIZACAO == 'servidor':
+        st.image(png_exibicao(spec, gerar_png))
+    else:
+        st.vega_lite_chart(spec, width='stretch')
+    if st.button("Gerar PNG para download", key=f"{chave}_png"):
+        with st.spinner("Gerando imagem..."):
+            st.download_button(
+                label=rotulo_download,
+                data=graficos.png_em_cache(spec, gerar_png, configuracao.DPI_DOWNLOAD),
+                file_name=nome_arquivo,
+                mime="image/png",
+                key=f"{chave}_download"
+            )
 
 # Verificar se os arquivos existem
-if not os.path.exists('dashboard_spaece_5_9_ano/xls/result_spaece.xlsx'):
+if not os.path.exists(configuracao.CAMINHO_SPAECE):
     st.error("Arquivo 'result_spaece.xlsx' não encontrado.")
     st.stop()
 
-if not os.path.exists('dashboard_spaece_5_9_ano/xls/result_alfa.xlsx'):
+if not os.path.exists(configuracao.CAMINHO_ALFA):
     st.error("Arquivo 'result_alfa.xlsx' não encontrado.")
     st.stop()
 
-# Carregar os datasets
+# Carregar e validar os datasets uma única vez por versão das planilhas (as execuções
+# seguintes usam o cache; uma planilha editada muda a data de modificação e é lida de novo)
+@st.cache_data(max_entries=1, show_spinner="Carregando e validando os dados...")
+def carregar_dados(modificacao):
+    result_spaece, result_alfa, relatorio = base.carregar_bases()
+    # Versão (hash do conteúdo) de cada base, calculada uma vez aqui e usada como chave
+    # dos caches das tabelas derivadas em todas as execuções
+    versao_spaece, versao_alfa = base.versao_base(result_spaece), base.versao_base(result_alfa)
+    # Backend SQL: grava as bases no banco embarcado quando a versão dos dados mudou
+    # (as bases continuam em memória para os seletores e as demais abas)
+    if configuracao.BACKEND != 'pandas':
+        import banco
+        banco.preparar_banco(result_spaece, result_alfa, versoes={'spaece': versao_spaece, 'alfa': versao_alfa})
+    return result_spaece, result_alfa, relatorio, versao_spaece, versao_alfa
+
 try:
-    result_spaece = pd.read_excel('dashboard_spaece_5_9_ano/xls/result_spaece.xlsx')
-    result_alfa = pd.read_excel('dashboard_spaece_5_9_ano/xls/result_alfa.xlsx')
+    result_spaece, result_alfa, relatorio_qualidade, versao_spaece, versao_alfa = carregar_dados(
+        (os.path.getmtime(configuracao.CAMINHO_SPAECE), os.path.getmtime(configuracao.CAMINHO_ALFA))
+    )
+    versao_dados = versao_spaece + versao_alfa
+except validacao.ErroValidacao as e:
+    st.error(f"Planilha inválida: {e}")
+    st.stop()
 except Exception as e:
     st.error(f"Erro ao carregar os arquivos: {e}")
     st.stop()
 
-# Eliminar coluna 'Unnamed: 0' se existir
-result_spaece = result_spaece.loc[:, ~result_spaece.columns.str.contains('^Unnamed')]
-result_alfa = result_alfa.loc[:, ~result_alfa.columns.str.contains('^Unnamed')]
-
-# Converter colunas para texto sem pontos e vírgulas
-result_spaece['INEP_MUN'] = result_spaece['INEP_MUN'].apply(formatar_numero)
-result_spaece['INEP_ESC'] = result_spaece['INEP_ESC'].apply(formatar_numero)
-result_spaece['EDICAO'] = result_spaece['EDICAO'].apply(formatar_numero)
-result_alfa['INEP_MUN'] = result_alfa['INEP_MUN'].apply(formatar_numero)
-result_alfa['INEP_ESC'] = result_alfa['INEP_ESC'].apply(formatar_numero)
-result_alfa['EDICAO'] = result_alfa['EDICAO'].apply(formatar_numero)
-
-# Limitar valores a 2 casas decimais
-def limitar_decimais(valor):
-    if isinstance(valor, (int, float)):
-        return round(valor, 2)
-    return valor
-
-result_spaece = result_spaece.applymap(limitar_decimais)
-result_alfa = result_alfa.applymap(limitar_decimais)
-
 # Sidebar com logotipo e instruções de uso
-st.sidebar.image('dashboard_spaece_5_9_ano/img/logo_2021.png', width=300)
+st.sidebar.image(configuracao.CAMINHO_LOGO, width=300)
 st.sidebar.title("Instruções de Uso")
 st.sidebar.write("""
 1. Selecione o município, escola e etapa.
@@ -64,35 +90,51 @@ st.sidebar.write("""
 4. Faça o download dos gráficos e tabelas.
 """)
 
+# Relatório de qualidade gerado na carga dos dados
+with st.sidebar.expander(f"Qualidade dos Dados ({len(relatorio_qualidade)} ocorrências)"):
+    if relatorio_qualidade.empty:
+        st.write("Nenhum problema encontrado nas planilhas.")
+    else:
+        st.dataframe(validacao.resumir_relatorio(relatorio_qualidade), width='stretch', hide_index=True)
+        st.download_button(
+            "Download do Relatório de Qualidade (CSV)",
+            relatorio_qualidade.to_csv(index=False).encode('utf-8'),
+            "relatorio_qualidade.csv",
+            mime="text/csv"
+        )
+
 # Título principal e subtítulo
 st.title("📊 Dashboard de Análise de Desempenho por Escola e Municipío / SPAECE (2007 - 2024)")
 st.subheader("Selecione os filtros abaixo para visualizar os dados")
 
 # Criar abas
-tab1, tab2, tab3, tab4 = st.tabs(["Dashboard", "Classificação por Edição", "Classificação da Escola", "Quartil"])
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["Dashboard", "Classificação por Edição", "Classificação da Escola", "Quartil", "Crescimento", "Coortes", "Anomalias"])
 
 with tab1:
     # Divisão em colunas para os seletores
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        municipio = st.selectbox('Selecione o Município', result_spaece['MUNICIPIO'].unique())
+        municipio = st.selectbox('Selecione o Município', result_spaece['MUNICIPIO'].unique(), key="municipio_dashboard")
 
     with col2:
-        escola = st.selectbox('Selecione a Escola', result_spaece[result_spaece['MUNICIPIO'] == municipio]['ESCOLA'].unique())
+        escola = st.selectbox('Selecione a Escola', result_spaece[result_spaece['MUNICIPIO'] == municipio]['ESCOLA'].unique(), key="escola_dashboard")
 
     with col3:
-        etapa = st.selectbox('Selecione a Etapa', ['2º Ano', '5º Ano', '9º Ano'])
-
-    # Filtrar os dados com base nas seleções
-    if etapa in ['5º Ano', '9º Ano']:
-        filtered_data = result_spaece[(result_spaece['MUNICIPIO'] == municipio) & 
-                                      (result_spaece['ESCOLA'] == escola) & 
-                                      (result_spaece['ETAPA'] == etapa)]
-    else:
-        filtered_data = result_alfa[(result_alfa['MUNICIPIO'] == municipio) & 
-                                    (result_alfa['ESCOLA'] == escola) & 
-                                    (result_alfa['ETAPA'] == etapa)]
+        etapa = st.selectbox('Selecione a Etapa', ['2º Ano', '5º Ano', '9º Ano'], key="etapa_dashboard")
+
+    # Filtrar os dados com base nas seleções (com a edição anterior de cada componente)
+    dados_variacao = grafo.no(
+        'variacao_escola',
+        lambda: consultas.consultar_variacao_escola(consultas.selecionar_base(etapa, result_spaece, result_alfa),
+                                                    municipio, escola, etapa),
+        widgets=['municipio_dashboard', 'escola_dashboard', 'etapa_dashboard'],
+        parametros={'dados': versao_dados}
+    )
+    # Rótulos para exibição (as consultas usam as bases compactas)
+    filtered_data = base.formatar_base(dados_variacao.drop(columns=['EDICAO_ANTERIOR', 'PROFICIENCIA_ANTERIOR', 'AGREGADO']))
+    # Escola com o nome do município: resultado oficial do município (sem boletim de escola)
+    resultado_municipio = dados_variacao['AGREGADO'].astype(bool).any()
 
     # Verificar se os dados filtrados estão vazios
     if filtered_data.empty:
@@ -100,7 +142,7 @@ with tab1:
     else:
         # Exibir a tabela de resultados
         st.write("### Tabela de Resultados")
-        st.dataframe(filtered_data, use_container_width=True)
+        st.dataframe(filtered_data, width='stretch')
 
         # Gráficos de PROFICIENCIA_MEDIA por EDICAO e COMPONENTE_CURRICULAR (MATEMÁTICA e LÍNGUA PORTUGUESA)
         st.write("### Gráficos de Proficiência Média por Edição e Componente Curricular")
@@ -112,74 +154,26 @@ with tab1:
         # Gráfico para Matemática
         if not matematica_data.empty:
             st.write("#### Matemática")
-
-            # Ordenar dados por EDICAO
-            matematica_data = matematica_data.sort_values(by='EDICAO')
-
-            fig_mat, ax_mat = plt.subplots(figsize=(8, 4))
-            sns.barplot(data=matematica_data, x='EDICAO', y='PROFICIENCIA_MEDIA', ax=ax_mat)
-            ax_mat.set_ylabel('Proficiência Média')
-            ax_mat.set_xlabel('Edição')
-            ax_mat.set_title(f'Proficiência Média em Matemática - {escola} ({etapa})')
-            
-            # Adicionar rótulos acima das barras
-            for p in ax_mat.patches:
-                ax_mat.annotate(f'{p.get_height():.0f}', (p.get_x() + p.get_width() / 2., p.get_height()),
-                                ha='center', va='center', fontsize=10, color='black', xytext=(0, 5),
-                                textcoords='offset points')
-            
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-
-            # Salvar o gráfico em um buffer de bytes
-            buf_mat = io.BytesIO()
-            plt.savefig(buf_mat, format='png')
-            buf_mat.seek(0)
-
-            # Botão de download do gráfico
-            st.download_button(
-                label="Download do Gráfico de Matemática",
-                data=buf_mat,
-                file_name=f"proficiencia_matematica_{escola}_{etapa}.png",
-                mime="image/png"
+            titulo_mat = f'Proficiência Média em Matemática - {escola} ({etapa})'
+            exibir_grafico(
+                graficos.spec_barras_proficiencia(matematica_data, titulo_mat),
+                lambda dpi: graficos.png_barras_proficiencia(matematica_data, titulo_mat, dpi=dpi),
+                "Download do Gráfico de Matemática",
+                f"proficiencia_matematica_{escola}_{etapa}.png",
+                chave="grafico_matematica"
             )
-            st.pyplot(fig_mat)
 
         # Gráfico para Língua Portuguesa
         if not portugues_data.empty:
             st.write("#### Língua Portuguesa")
-
-            # Ordenar dados por EDICAO
-            portugues_data = portugues_data.sort_values(by='EDICAO')
-
-            fig_port, ax_port = plt.subplots(figsize=(8, 4))
-            sns.barplot(data=portugues_data, x='EDICAO', y='PROFICIENCIA_MEDIA', ax=ax_port)
-            ax_port.set_ylabel('Proficiência Média')
-            ax_port.set_xlabel('Edição')
-            ax_port.set_title(f'Proficiência Média em Língua Portuguesa - {escola} ({etapa})')
-            
-            # Adicionar rótulos acima das barras
-            for p in ax_port.patches:
-                ax_port.annotate(f'{p.get_height():.0f}', (p.get_x() + p.get_width() / 2., p.get_height()),
-                                 ha='center', va='center', fontsize=10, color='black', xytext=(0, 5),
-                                 textcoords='offset points')
-            
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-
-            # Salvar o gráfico em um buffer de bytes
-            buf_port = io.BytesIO()
-            plt.savefig(buf_port, format='png')
-            buf_port.seek(0)
-
-            # Botão de download do gráfico
-            st.download_button(
-                label="Download do Gráfico de Língua Portuguesa",
-                data=buf_port,
-                file_name=f"proficiencia_portugues_{escola}_{etapa}.png",
-                mime="image/png"
+            titulo_port = f'Proficiência Média em Língua Portuguesa - {escola} ({etapa})'
+            exibir_grafico(
+                graficos.spec_barras_proficiencia(portugues_data, titulo_port),
+                lambda dpi: graficos.png_barras_proficiencia(portugues_data, titulo_port, dpi=dpi),
+                "Download do Gráfico de Língua Portuguesa",
+                f"proficiencia_portugues_{escola}_{etapa}.png",
+                chave="grafico_portugues"
             )
-            st.pyplot(fig_port)
 
         # Função para criar gráficos de barras empilhadas por EDICAO em uma única visualização (barras horizontais)
         def criar_grafico_empilhado_unificado(tabela, etapa, componente_curricular, escola):
@@ -193,63 +187,17 @@ with tab1:
                 st.warning("Etapa não suportada para gráficos empilhados.")
                 return
 
-            # Agrupar dados por EDICAO
-            grouped_data = tabela.groupby('EDICAO')[categories].sum()
-
             # Calcular percentuais para cada EDICAO
-            percentuais = grouped_data.div(grouped_data.sum(axis=1), axis=0) * 100
-
-            # Criar figura e eixo
-            fig, ax = plt.subplots(figsize=(10, len(percentuais) * 0.8))
-            y_positions = range(len(percentuais))
-
-            # Criar barras empilhadas para cada EDICAO
-            for i, (edicao, percentuais_edicao) in enumerate(percentuais.iterrows()):
-                left = 0
-                for j, (category, color) in enumerate(zip(categories, colors)):
-                    ax.barh(y_positions[i], percentuais_edicao[category], left=left, color=color, label=category if i == 0 else "")
-                    left += percentuais_edicao[category]
-
-                # Adicionar rótulos
-                left = 0
-                for j, (category, color) in enumerate(zip(categories, colors)):
-                    width = percentuais_edicao[category]
-                    if width > 0:
-                        label_color = 'white' if color in ['darkgreen', 'red'] else 'black'
-                        ax.text(left + width / 2, y_positions[i], f'{width:.1f}%', ha='center', va='center', color=label_color, fontsize=8)
-                    left += width
-
-            # Configurar eixo Y com as edições
-            ax.set_yticks(y_positions)
-            ax.set_yticklabels(percentuais.index)
-            ax.set_xlim(0, 100)
-            ax.set_xlabel('Percentual')
-            ax.set_title(f'Distribuição Percentual - {componente_curricular} - {escola} ({etapa})')
-
-            # Remover bordas desnecessárias
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.spines['left'].set_visible(False)
-
-            # Adicionar legenda
-            handles, labels = ax.get_legend_handles_labels()
-            ax.legend(handles, labels, bbox_to_anchor=(1.05, 1), loc='upper left', fontsize='small')
-
-            plt.tight_layout()
-
-            # Salvar o gráfico empilhado em um buffer de bytes
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', bbox_inches='tight')
-            buf.seek(0)
-
-            # Botão de download do gráfico empilhado
-            st.download_button(
-                label=f"Download do Gráfico Empilhado - {componente_curricular}",
-                data=buf,
-                file_name=f"grafico_empilhado_{componente_curricular.lower()}_{escola}_{etapa}.png",
-                mime="image/png"
+            percentuais = graficos.calcular_percentuais(tabela, categories)
+            titulo = f'Distribuição Percentual - {componente_curricular} - {escola} ({etapa})'
+
+            exibir_grafico(
+                graficos.spec_empilhado(percentuais, categories, colors, titulo),
+                lambda dpi: graficos.png_empilhado(percentuais, categories, colors, titulo, dpi=dpi),
+                f"Download do Gráfico Empilhado - {componente_curricular}",
+                f"grafico_empilhado_{componente_curricular.lower()}_{escola}_{etapa}.png",
+                chave=f"grafico_empilhado_{componente_curricular}"
             )
-            st.pyplot(fig)
 
         # Aplicar a função para criar gráficos de barras empilhadas unificados
         if etapa in ['2º Ano', '5º Ano', '9º Ano']:
@@ -271,23 +219,22 @@ with tab1:
         st.write("### Tabela de Variação por Edição")
 
         # Filtrar dados para LÍNGUA PORTUGUESA e MATEMÁTICA
-        tabela_portugues = filtered_data[filtered_data['COMPONENTE_CURRICULAR'] == 'LÍNGUA PORTUGUESA'].copy()
-        tabela_matematica = filtered_data[filtered_data['COMPONENTE_CURRICULAR'] == 'MATEMÁTICA'].copy()
+        tabela_portugues = dados_variacao[dados_variacao['COMPONENTE_CURRICULAR'] == 'LÍNGUA PORTUGUESA'].copy()
+        tabela_matematica = dados_variacao[dados_variacao['COMPONENTE_CURRICULAR'] == 'MATEMÁTICA'].copy()
 
         # Função para processar e exibir a tabela
         def processar_tabela(tabela, componente):
             if not tabela.empty:
                 st.write(f"#### {componente}")
                 
+                # Calcular variação percentual e diferença de proficiência em relação à edição anterior
+                # (a tabela já vem ordenada por EDICAO)
+                tabela = base.formatar_base(consultas.calcular_variacao(tabela))
+                tabela['Variação Percentual'] = tabela['VARIACAO_PERCENTUAL']
+                tabela['Diferença de Proficiência'] = tabela['DIFERENCA']
+
                 # Converter PROFICIENCIA_MEDIA para números inteiros
                 tabela['PROFICIENCIA_MEDIA'] = tabela['PROFICIENCIA_MEDIA'].astype(int)
-
-                # Ordenar tabela por EDICAO
-                tabela = tabela.sort_values(by='EDICAO')  # Adicione essa linha
-                
-                # Calcular variação percentual e diferença de proficiência
-                tabela['Variação Percentual'] = tabela['PROFICIENCIA_MEDIA'].pct_change() * 100
-                tabela['Diferença de Proficiência'] = tabela['PROFICIENCIA_MEDIA'].diff()
                 
                 # Formatar diferença e variação percentual
                 def formatar_variacao(valor, coluna):
@@ -308,7 +255,7 @@ with tab1:
                 )
                 
                 # Adicionar coluna de período
-                tabela['PERÍODO'] = tabela['EDICAO'].astype(str) + '-' + tabela['EDICAO'].shift(1).astype(str)
+                tabela['PERÍODO'] = tabela['EDICAO'] + '-' + tabela['EDICAO_ANTERIOR'].replace('', 'N/A')
                 
                 # Aplicar cores apenas nas colunas de Diferença e Variação
                 def colorir_variacao(valor):
@@ -322,7 +269,7 @@ with tab1:
                     return "color: black;"
                 
                 # Selecionar e estilizar as colunas desejadas
-                styled_table = tabela[['ESCOLA','EDICAO', 'PERÍODO', 'PROFICIENCIA_MEDIA', 'Diferença de Proficiência', 'Variação Percentual']].style.applymap(
+                styled_table = tabela[['ESCOLA','EDICAO', 'PERÍODO', 'PROFICIENCIA_MEDIA', 'Diferença de Proficiência', 'Variação Percentual']].style.map(
                     colorir_variacao, subset=['Diferença de Proficiência', 'Variação Percentual']  # Aplica cores apenas nessas colunas
                 )
                 
@@ -347,71 +294,16 @@ with tab1:
             unsafe_allow_html=True
         )
 
+        # Boletim da escola em PDF com todas as etapas e edições (gráficos, variação e quartis)
+        if not resultado_municipio and st.button("📄 Gerar Boletim da Escola (PDF)"):
+            with st.spinner("Gerando boletim..."):
+                st.download_button(
+                    label="⬇️ Download do Boletim (PDF)",
+                    data=boletins.boletim_escola(result_spaece, result_alfa, municipio, escola, versao=versao_dados),
+                    file_name=f"boletim_{escola}.pdf",
+                    mime="application/pdf"
+                )
 
-# Função para gerar o PDF
-def gerar_pdf(df_filtrado, edicao_selecionada):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-
-    # Adicionar a logo
-    logo_path = 'dashboard_spaece_5_9_ano/img/logo_2021.png'
-    pdf.image(logo_path, x=60, y=10, w=90)  # Ajuste a posição e o tamanho da logo
-
-    # Adicionar título e subtítulo
-    pdf.set_font("Arial", 'B', 16)
-    pdf.ln(40)  # Espaço após a logo
-    pdf.cell(0, 10, "SETOR DE MONITORAMENTO E PROCESSAMENTO DE RESULTADOS", ln=True, align='C')
-    pdf.cell(0, 10, "Ranking SPAECE", ln=True, align='C')
-    pdf.set_font("Arial", 'B', 14)
-    pdf.cell(0, 10, f"Edição: {edicao_selecionada}", ln=True, align='C')
-
-    # Configurações da tabela
-    pdf.set_font("Arial", 'B', 10)  # Fonte menor para o cabeçalho
-    pdf.set_fill_color(0, 51, 102)  # Azul escuro para o cabeçalho
-    pdf.set_text_color(255, 255, 255)  # Texto branco
-
-    # Definir larguras das colunas
-    col_widths = [15, 60, 20, 25, 50, 20]  # Larguras ajustadas para cada coluna
-
-    # Cabeçalho da tabela
-    headers = ["ORD", "ESCOLA", "ETAPA", "PROFICIÊNCIA", "COMPONENTE", "EDIÇÃO"]
-    for i, header in enumerate(headers):
-        pdf.cell(col_widths[i], 10, header, 1, 0, 'C', fill=True)
-    pdf.ln()
-
-    # Preencher a tabela com os dados
-    pdf.set_font("Arial", '', 8)  # Fonte menor para o conteúdo
-    pdf.set_text_color(0, 0, 0)  # Texto preto
-
-    for index, row in df_filtrado.iterrows():
-        # ORD
-        pdf.cell(col_widths[0], 10, row['ORD'], 1, 0, 'C')
-        
-        # ESCOLA (com quebra de texto dentro da célula, sem bordas internas)
-        x = pdf.get_x()
-        y = pdf.get_y()
-        pdf.multi_cell(col_widths[1], 10, row['ESCOLA'], 0, 'L')  # Sem bordas internas (0 no lugar de 1)
-        pdf.set_xy(x + col_widths[1], y)  # Reposiciona o cursor para a próxima coluna
-        
-        # ETAPA
-        pdf.cell(col_widths[2], 10, row['ETAPA'], 1, 0, 'C')
-        
-        # PROFICIÊNCIA
-        pdf.cell(col_widths[3], 10, str(row['PROFICIENCIA_MEDIA']), 1, 0, 'C')
-        
-        # COMPONENTE
-        pdf.cell(col_widths[4], 10, row['COMPONENTE_CURRICULAR'], 1, 0, 'L')
-        
-        # EDIÇÃO
-        pdf.cell(col_widths[5], 10, str(row['EDICAO']), 1, 1, 'C')
-
-    # Salvar o PDF em um buffer de bytes
-    pdf_output = io.BytesIO()
-    pdf_output.write(pdf.output(dest='S').encode('latin1'))
-    pdf_output.seek(0)
-
-    return pdf_output
 
 # ... (código anterior até a aba "Classificação")
 
@@ -428,40 +320,36 @@ with tab2:
     with col3:
         edicao_selecionada = st.selectbox("Selecione a EDIÇÃO", sorted(result_spaece['EDICAO'].unique()), key="edicao_classificacao")
     
-    # Escolher o banco de dados correto com base na etapa selecionada
-    if etapa_selecionada == '2º Ano':
-        df_filtrado = result_alfa[
-            (result_alfa['ETAPA'] == etapa_selecionada) &
-            (result_alfa['COMPONENTE_CURRICULAR'] == componente_selecionado) &
-            (result_alfa['EDICAO'] == edicao_selecionada)
-        ]
-    else:
-        df_filtrado = result_spaece[
-            (result_spaece['ETAPA'] == etapa_selecionada) &
-            (result_spaece['COMPONENTE_CURRICULAR'] == componente_selecionado) &
-            (result_spaece['EDICAO'] == edicao_selecionada)
-        ]
+    # Classificação calculada uma vez por combinação e guardada no cache em disco
+    df_filtrado = grafo.no(
+        'ranking_edicao',
+        lambda: consultas.ranking_edicao_em_cache(consultas.selecionar_base(etapa_selecionada, result_spaece, result_alfa),
+                                                  etapa_selecionada, componente_selecionado, edicao_selecionada,
+                                                  consultas.selecionar_base(etapa_selecionada, versao_spaece, versao_alfa)),
+        widgets=['etapa_classificacao', 'componente_classificacao', 'edicao_classificacao'],
+        parametros={'dados': versao_dados}
+    )
+
+    # Resultado oficial do município na edição (linhas do município na planilha)
+    df_municipio = base.formatar_base(consultas.resultados_municipios(
+        consultas.selecionar_base(etapa_selecionada, result_spaece, result_alfa),
+        etapa_selecionada, componente_selecionado, edicao_selecionada
+    )[['MUNICIPIO', 'ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO', 'PROFICIENCIA_MEDIA']])
+    if not df_municipio.empty:
+        st.write("### Resultado Oficial do Município")
+        st.dataframe(df_municipio, width='stretch', hide_index=True)
 
     # Verificar se há dados filtrados
     if df_filtrado.empty:
-        st.warning("Nenhum dado encontrado para os filtros selecionados.")
+        st.warning("Nenhuma escola encontrada para os filtros selecionados.")
     else:
-        # Ordenar por PROFICIENCIA_MEDIA do maior para o menor
-        df_filtrado = df_filtrado.sort_values(by='PROFICIENCIA_MEDIA', ascending=False)
-
-        # Adicionar coluna ORD com a classificação ordinal (1º, 2º, 3º, etc.)
-        df_filtrado['ORD'] = df_filtrado['PROFICIENCIA_MEDIA'].rank(method='min', ascending=False).astype(int)
-        df_filtrado['ORD'] = df_filtrado['ORD'].apply(lambda x: f"{int(x)}º")
-
-        # Selecionar as colunas desejadas
-        df_filtrado = df_filtrado[['ORD', 'ESCOLA', 'ETAPA', 'PROFICIENCIA_MEDIA', 'COMPONENTE_CURRICULAR', 'EDICAO']]
-
         # Exibir o DataFrame
         st.write("### Classificação por Proficiência Média")
-        st.dataframe(df_filtrado, use_container_width=True)
+        tabela_classificacao = base.formatar_base(df_filtrado)
+        st.dataframe(tabela_classificacao, width='stretch')
 
         # Botão para download do DataFrame em CSV
-        csv = df_filtrado.to_csv(index=False).encode('utf-8')
+        csv = relatorios.csv_classificacao(df_filtrado)
         st.download_button(
             label="Download da Classificação (CSV)",
             data=csv,
@@ -471,7 +359,7 @@ with tab2:
 
         # Botão para gerar e baixar o PDF
         if st.button("Gerar PDF da Classificação"):
-            pdf_output = gerar_pdf(df_filtrado, edicao_selecionada)
+            pdf_output = relatorios.gerar_pdf_em_cache(df_filtrado, edicao_selecionada)
 
             # Botão de download do PDF
             st.download_button(
@@ -487,63 +375,31 @@ with tab3:
     # Seletores para ESCOLA, ETAPA e COMPONENTE CURRICULAR
     col1, col2, col3 = st.columns(3)
     with col1:
-        escola_selecionada = st.selectbox("Selecione a ESCOLA", result_spaece['ESCOLA'].unique(), key="escola_classificacao_tab3")
+        escola_selecionada = st.selectbox("Selecione a ESCOLA", base.escolas(result_spaece)['ESCOLA'].unique(), key="escola_classificacao_tab3")
     with col2:
         etapa_escola = st.selectbox("Selecione a ETAPA", ['2º Ano', '5º Ano', '9º Ano'], key="etapa_escola_tab3")
     with col3:
         componente_escola = st.selectbox("Selecione o COMPONENTE CURRICULAR", result_spaece['COMPONENTE_CURRICULAR'].unique(), key="componente_escola_tab3")
 
-    # Escolher o banco de dados correto com base na etapa selecionada
-    if etapa_escola == '2º Ano':
-        df_escola_filtrado = result_alfa[
-            (result_alfa['ESCOLA'] == escola_selecionada) &
-            (result_alfa['ETAPA'] == etapa_escola) &
-            (result_alfa['COMPONENTE_CURRICULAR'] == componente_escola)
-        ]
-    else:
-        df_escola_filtrado = result_spaece[
-            (result_spaece['ESCOLA'] == escola_selecionada) &
-            (result_spaece['ETAPA'] == etapa_escola) &
-            (result_spaece['COMPONENTE_CURRICULAR'] == componente_escola)
-        ]
+    # Posição da escola no ranking de cada edição
+    df_posicao_escola = base.formatar_base(grafo.no(
+        'posicoes_escola',
+        lambda: consultas.consultar_posicoes_escola(consultas.selecionar_base(etapa_escola, result_spaece, result_alfa),
+                                                    etapa_escola, componente_escola, escola_selecionada),
+        widgets=['escola_classificacao_tab3', 'etapa_escola_tab3', 'componente_escola_tab3'],
+        parametros={'dados': versao_dados}
+    ))
 
     # Verificar se há dados filtrados
-    if df_escola_filtrado.empty:
+    if df_posicao_escola.empty:
         st.warning("Nenhum dado encontrado para os filtros selecionados.")
     else:
-        # Calcular a posição da escola em cada edição
-        if etapa_escola == '2º Ano':
-            df_posicao_escola = result_alfa[
-                (result_alfa['ETAPA'] == etapa_escola) &
-                (result_alfa['COMPONENTE_CURRICULAR'] == componente_escola)
-            ]
-        else:
-            df_posicao_escola = result_spaece[
-                (result_spaece['ETAPA'] == etapa_escola) &
-                (result_spaece['COMPONENTE_CURRICULAR'] == componente_escola)
-            ]
-
-        # Ordenar por EDICAO e PROFICIENCIA_MEDIA (decrescente)
-        df_posicao_escola = df_posicao_escola.sort_values(by=['EDICAO', 'PROFICIENCIA_MEDIA'], ascending=[True, False])
-
-        # Calcular a posição de cada escola em cada edição
-        df_posicao_escola['POSICAO'] = df_posicao_escola.groupby('EDICAO')['PROFICIENCIA_MEDIA'].rank(method='min', ascending=False).astype(int)
-
-        # Filtrar apenas os dados da escola selecionada
-        df_posicao_escola = df_posicao_escola[df_posicao_escola['ESCOLA'] == escola_selecionada]
-
         # Formatar a posição como ordinal (1º, 2º, 3º, etc.)
         df_posicao_escola['POSICAO'] = df_posicao_escola['POSICAO'].apply(lambda x: f"{int(x)}º")
 
-        # Selecionar as colunas desejadas
-        df_posicao_escola = df_posicao_escola[['EDICAO', 'ESCOLA', 'ETAPA', 'COMPONENTE_CURRICULAR', 'PROFICIENCIA_MEDIA', 'POSICAO']]
-
-        # Ordenar por EDICAO
-        df_posicao_escola = df_posicao_escola.sort_values(by='EDICAO')
-
         # Exibir o DataFrame
         st.write(f"### Classificação da Escola {escola_selecionada} em Todas as Edições")
-        st.dataframe(df_posicao_escola, use_container_width=True)
+        st.dataframe(df_posicao_escola, width='stretch')
 
         # Botão para download do DataFrame em CSV
         csv_escola = df_posicao_escola.to_csv(index=False).encode('utf-8')
@@ -567,19 +423,15 @@ with tab4:
         
         with col2:
             if filtro_escola == 'Escola Específica':
-                # Carrega escolas conforme etapa selecionada
-                if etapa_quartil == '2º Ano':
-                    escolas_options = result_alfa[result_alfa['ETAPA'] == '2º Ano']['ESCOLA'].unique()
-                else:
-                    escolas_options = result_spaece[result_spaece['ETAPA'] == etapa_quartil]['ESCOLA'].unique()
+                # Carrega escolas conforme etapa selecionada (sem os resultados dos municípios)
+                escolas_etapa = base.escolas(consultas.selecionar_base(etapa_quartil, result_spaece, result_alfa))
+                escolas_options = escolas_etapa[escolas_etapa['ETAPA'] == etapa_quartil]['ESCOLA'].unique()
                 
                 escola_selecionada = st.selectbox("Selecione a ESCOLA", sorted(escolas_options), key="escola_quartil")
             else:
-                # Filtra edições disponíveis conforme a etapa
-                if etapa_quartil == '2º Ano':
-                    edicoes_disponiveis = sorted(result_alfa['EDICAO'].unique())
-                else:
-                    edicoes_disponiveis = sorted(result_spaece[result_spaece['ETAPA'] == etapa_quartil]['EDICAO'].unique())
+                # Filtra edições disponíveis conforme a etapa (edições com resultados de escolas)
+                escolas_etapa = base.escolas(consultas.selecionar_base(etapa_quartil, result_spaece, result_alfa))
+                edicoes_disponiveis = sorted(escolas_etapa[escolas_etapa['ETAPA'] == etapa_quartil]['EDICAO'].unique())
                 
                 edicao_quartil = st.selectbox("Selecione a EDIÇÃO", edicoes_disponiveis, key="edicao_quartil")
             
@@ -587,74 +439,45 @@ with tab4:
                                             ['MATEMÁTICA', 'LÍNGUA PORTUGUESA'], 
                                             key="componente_quartil")
 
-    # Processamento dos dados
+    # Processamento dos dados: cada etapa é um nó do grafo e só é recalculada quando
+    # muda um dos widgets que declara (ou um nó anterior)
+    df_base = grafo.no(
+        'base_quartil',
+        lambda: consultas.selecionar_base(etapa_quartil, result_spaece, result_alfa),
+        widgets=['etapa_quartil'],
+        parametros={'dados': versao_dados}
+    )
+
     if filtro_escola == 'Escola Específica':
         try:
-            if etapa_quartil == '2º Ano':
-                df_escola = result_alfa[
-                    (result_alfa['ESCOLA'] == escola_selecionada) & 
-                    (result_alfa['ETAPA'] == '2º Ano') &
-                    (result_alfa['COMPONENTE_CURRICULAR'] == componente_quartil)
-                ].copy()
-            else:
-                df_escola = result_spaece[
-                    (result_spaece['ESCOLA'] == escola_selecionada) & 
-                    (result_spaece['ETAPA'] == etapa_quartil) &
-                    (result_spaece['COMPONENTE_CURRICULAR'] == componente_quartil)
-                ].copy()
+            df_escola = grafo.no(
+                'escola_quartil',
+                lambda: df_base[
+                    (df_base['ESCOLA'] == escola_selecionada) &
+                    (df_base['ETAPA'] == etapa_quartil) &
+                    (df_base['COMPONENTE_CURRICULAR'] == componente_quartil)
+                ].copy(),
+                widgets=['escola_quartil', 'componente_quartil'],
+                depende=['base_quartil']
+            )
             
             if df_escola.empty:
                 st.warning(f"Nenhum dado encontrado para a escola {escola_selecionada} na etapa {etapa_quartil}")
             else:
-                # Processa cada edição para classificar nos quartis
-                resultados = []
-                for edicao in df_escola['EDICAO'].unique():
-                    # Filtra dados da edição específica
-                    if etapa_quartil == '2º Ano':
-                        df_edicao = result_alfa[
-                            (result_alfa['EDICAO'] == edicao) &
-                            (result_alfa['ETAPA'] == '2º Ano') &
-                            (result_alfa['COMPONENTE_CURRICULAR'] == componente_quartil)
-                        ].copy()
-                    else:
-                        df_edicao = result_spaece[
-                            (result_spaece['EDICAO'] == edicao) &
-                            (result_spaece['ETAPA'] == etapa_quartil) &
-                            (result_spaece['COMPONENTE_CURRICULAR'] == componente_quartil)
-                        ].copy()
-                    
-                    if not df_edicao.empty:
-                        # Garante que a proficiência é numérica
-                        df_edicao['PROFICIENCIA_MEDIA'] = pd.to_numeric(df_edicao['PROFICIENCIA_MEDIA'], errors='coerce')
-                        df_edicao = df_edicao.dropna(subset=['PROFICIENCIA_MEDIA'])
-                        
-                        if not df_edicao.empty:
-                            q1, q2, q3 = df_edicao['PROFICIENCIA_MEDIA'].quantile([0.25, 0.5, 0.75])
-                            prof_escola = float(df_escola[df_escola['EDICAO'] == edicao]['PROFICIENCIA_MEDIA'].values[0])
-                            
-                            # Classifica o quartil
-                            if prof_escola <= q1:
-                                quartil = "Q1 (25% baixo)"
-                            elif prof_escola <= q2:
-                                quartil = "Q2 (25% médio baixo)"
-                            elif prof_escola <= q3:
-                                quartil = "Q3 (25% médio alto)"
-                            else:
-                                quartil = "Q4 (25% alto)"
-                            
-                            resultados.append({
-                                'ESCOLA': escola_selecionada,
-                                'EDIÇÃO': edicao,
-                                'PROFICIÊNCIA': prof_escola,
-                                'QUARTIL': quartil,
-                                'Q1': q1,
-                                'MEDIANA (Q2)': q2,
-                                'Q3': q3
-                            })
+                # Classifica a escola nos quartis de cada edição
+                cortes_edicoes = grafo.no(
+                    'cortes_edicoes_quartil',
+                    lambda: consultas.cortes_quartis_edicoes(df_base, etapa_quartil, componente_quartil),
+                    widgets=['componente_quartil'],
+                    depende=['base_quartil']
+                )
+                df_resultado = grafo.no(
+                    'evolucao_quartil',
+                    lambda: consultas.evolucao_quartis_escola(df_escola, cortes_edicoes, escola_selecionada),
+                    depende=['escola_quartil', 'cortes_edicoes_quartil']
+                )
                 
-                if resultados:
-                    df_resultado = pd.DataFrame(resultados).sort_values('EDIÇÃO')
-                    
+                if not df_resultado.empty:
                     # Exibe tabela com estilo
                     def color_quartil(val):
                         color = 'red' if 'Q1' in val else 'orange' if 'Q2' in val else 'lightgreen' if 'Q3' in val else 'darkgreen'
@@ -666,59 +489,30 @@ with tab4:
                             'Q1': '{:.1f}',
                             'MEDIANA (Q2)': '{:.1f}',
                             'Q3': '{:.1f}'
-                        }).applymap(color_quartil, subset=['QUARTIL']),
-                        use_container_width=True
+                        }).map(color_quartil, subset=['QUARTIL']),
+                        width='stretch'
                     )
                     
                     # Gera gráfico de evolução
-                    fig, ax = plt.subplots(figsize=(12, 6))
-                    
-                    # Plot principal com rótulos
-                    line = ax.plot(df_resultado['EDIÇÃO'], df_resultado['PROFICIÊNCIA'], 
-                                 'b-o', linewidth=2, markersize=8, label=f'Escola: {escola_selecionada}')
-                    
-                    # Adiciona rótulos de proficiência
-                    for idx, row in df_resultado.iterrows():
-                        ax.annotate(f"{row['PROFICIÊNCIA']:.1f}", 
-                                   (row['EDIÇÃO'], row['PROFICIÊNCIA']),
-                                   textcoords="offset points", xytext=(0,10), 
-                                   ha='center', fontsize=9, color='blue')
-                    
-                    # Áreas dos quartis
-                    ax.fill_between(df_resultado['EDIÇÃO'], df_resultado['Q1'], df_resultado['MEDIANA (Q2)'], 
-                                   color='red', alpha=0.1, label='Q1 (25% baixa)')
-                    ax.fill_between(df_resultado['EDIÇÃO'], df_resultado['MEDIANA (Q2)'], df_resultado['Q3'], 
-                                   color='orange', alpha=0.1, label='Q2 (25% média baixa)')
-                    ax.fill_between(df_resultado['EDIÇÃO'], df_resultado['Q3'], df_resultado['PROFICIÊNCIA'].max()*1.05, 
-                                   color='green', alpha=0.1, label='Q3/Q4 (25% médio alto/alto)')
-                    
-                    # Configurações do gráfico
-                    ax.set_title(f"Evolução da Proficiência\n{escola_selecionada} - {componente_quartil} - {etapa_quartil}", pad=20)
-                    ax.set_xlabel("Edição")
-                    ax.set_ylabel("Proficiência Média")
-                    ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
-                    ax.grid(True, linestyle='--', alpha=0.3)
-                    plt.xticks(rotation=45)
-                    plt.tight_layout()
-                    
-                    st.pyplot(fig)
+                    titulo_evolucao = f"Evolução da Proficiência\n{escola_selecionada} - {componente_quartil} - {etapa_quartil}"
                     
                     # Botões de download
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.download_button(
-                            "Download CSV",
-                            df_resultado.to_csv(index=False),
-                            f"quartis_escola_{escola_selecionada}.csv"
-                        )
-                    with col2:
-                        buf = io.BytesIO()
-                        fig.savefig(buf, format='png', dpi=300)
-                        st.download_button(
-                            "Download Gráfico",
-                            buf.getvalue(),
-                            f"evolucao_{escola_selecionada}.png"
-                        )
+                    st.download_button(
+                        "Download CSV",
+                        df_resultado.to_csv(index=False),
+                        f"quartis_escola_{escola_selecionada}.csv"
+                    )
+                    exibir_grafico(
+                        grafo.no(
+                            'spec_evolucao_quartil',
+                            lambda: graficos.spec_evolucao_quartis(df_resultado, escola_selecionada, titulo_evolucao.split('\n')),
+                            depende=['evolucao_quartil']
+                        ),
+                        lambda dpi: graficos.png_evolucao_quartis(df_resultado, escola_selecionada, titulo_evolucao, dpi=dpi),
+                        "Download Gráfico",
+                        f"evolucao_{escola_selecionada}.png",
+                        chave="grafico_evolucao_quartil"
+                    )
                 else:
                     st.warning("Nenhum dado disponível para análise")
         
@@ -728,42 +522,19 @@ with tab4:
     else:
         # Modo Todas as Escolas
         try:
-            # Seleciona a base correta com filtro rigoroso por etapa
-            if etapa_quartil == '2º Ano':
-                df_quartil = result_alfa[
-                    (result_alfa['EDICAO'] == edicao_quartil) &
-                    (result_alfa['ETAPA'] == '2º Ano') &
-                    (result_alfa['COMPONENTE_CURRICULAR'] == componente_quartil)
-                ].copy()
-            else:
-                df_quartil = result_spaece[
-                    (result_spaece['EDICAO'] == edicao_quartil) &
-                    (result_spaece['ETAPA'] == etapa_quartil) &
-                    (result_spaece['COMPONENTE_CURRICULAR'] == componente_quartil)
-                ].copy()
-            
-            # Garante que a proficiência é numérica
-            df_quartil['PROFICIENCIA_MEDIA'] = pd.to_numeric(df_quartil['PROFICIENCIA_MEDIA'], errors='coerce')
-            df_quartil = df_quartil.dropna(subset=['PROFICIENCIA_MEDIA'])
+            # Classifica as escolas da edição (resultado guardado no cache em disco)
+            df_quartil, cortes_quartil = grafo.no(
+                'quartis_edicao',
+                lambda: consultas.quartis_edicao_em_cache(df_base, etapa_quartil, componente_quartil, edicao_quartil,
+                                                          consultas.selecionar_base(etapa_quartil, versao_spaece, versao_alfa)),
+                widgets=['componente_quartil', 'edicao_quartil'],
+                depende=['base_quartil']
+            )
             
             if df_quartil.empty:
                 st.warning(f"Nenhum dado encontrado para {etapa_quartil} na edição {edicao_quartil}")
             else:
-                # Calcula quartis
-                q1, q2, q3 = df_quartil['PROFICIENCIA_MEDIA'].quantile([0.25, 0.5, 0.75])
-                
-                # Classifica as escolas
-                def classificar_quartil(proficiencia):
-                    if proficiencia <= q1:
-                        return "Q1 (25% baixa)"
-                    elif proficiencia <= q2:
-                        return "Q2 (25% média baixa)"
-                    elif proficiencia <= q3:
-                        return "Q3 (25% média alta)"
-                    else:
-                        return "Q4 (25% alta)"
-                
-                df_quartil['QUARTIL'] = df_quartil['PROFICIENCIA_MEDIA'].apply(classificar_quartil)
+                q1, q2, q3 = cortes_quartil
                 
                 # Função para colorir as células da tabela
                 def colorir_quartil(val):
@@ -775,105 +546,31 @@ with tab4:
                 
                 # Exibe tabela com escolas
                 st.write("### Classificação por Quartis")
+                tabela_quartis = grafo.no(
+                    'tabela_quartis',
+                    lambda: base.formatar_base(df_quartil[['ESCOLA', 'ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO', 'PROFICIENCIA_MEDIA', 'QUARTIL']])
+                    .sort_values('PROFICIENCIA_MEDIA', ascending=False),
+                    depende=['quartis_edicao']
+                )
                 st.dataframe(
-                    df_quartil[['ESCOLA', 'ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO', 'PROFICIENCIA_MEDIA', 'QUARTIL']]
-                    .sort_values('PROFICIENCIA_MEDIA', ascending=False)
-                    .style.applymap(colorir_quartil, subset=['QUARTIL'])
+                    tabela_quartis
+                    .style.map(colorir_quartil, subset=['QUARTIL'])
                     .format({'PROFICIENCIA_MEDIA': '{:.1f}'}),
-                    use_container_width=True,
+                    width='stretch',
                     height=400
                 )
                 
                 # Botão para gerar PDF
                 if st.button("📄 Gerar PDF da Classificação"):
-                    def gerar_pdf_classificacao(df, componente, etapa, edicao):
-                        pdf = FPDF(orientation='P', unit='mm', format='A4')
-                        pdf.add_page()
-                        
-                        # Logo (ajuste o caminho conforme necessário)
-                        logo_path = 'dashboard_spaece_5_9_ano/img/logo_2021.png'
-                        if os.path.exists(logo_path):
-                            pdf.image(logo_path, x=10, y=8, w=30)
-                        
-                        # Título e subtítulo
-                        pdf.set_font('Arial', 'B', 16)
-                        pdf.cell(0, 20, "Classificação por Quartis de Proficiência", ln=True, align='C')
-                        pdf.set_font('Arial', 'B', 12)
-                        pdf.cell(0, 10, f"Componente: {componente} | Etapa: {etapa} | Edição: {edicao}", ln=True, align='C')
-                        pdf.ln(10)
-                        
-                        # Configuração da tabela
-                        pdf.set_font('Arial', 'B', 10)
-                        
-                        # Cabeçalho da tabela (fundo azul e texto branco)
-                        pdf.set_fill_color(0, 51, 102)
-                        pdf.set_text_color(255, 255, 255)
-                        
-                        # Larguras das colunas
-                        col_widths = [15, 60, 20, 25, 30]
-                        
-                        # Cabeçalhos
-                        headers = ["Pos.", "Escola", "Etapa", "Proficiência", "Quartil"]
-                        for i, header in enumerate(headers):
-                            pdf.cell(col_widths[i], 10, header, 1, 0, 'C', fill=True)
-                        pdf.ln()
-                        
-                        # Conteúdo da tabela
-                        pdf.set_font('Arial', '', 8)
-                        pdf.set_text_color(0, 0, 0)
-                        
-                        # Ordena o DataFrame
-                        df_sorted = df.sort_values('PROFICIENCIA_MEDIA', ascending=False)
-                        df_sorted['POSICAO'] = range(1, len(df_sorted) + 1)
-                        
-                        # Cores para os quartis
-                        quartil_colors = {
-                            "Q1 (25% piores)": (255, 204, 204),
-                            "Q2 (25% básicas)": (255, 229, 204),
-                            "Q3 (25% intermediárias)": (204, 255, 204),
-                            "Q4 (25% melhores)": (204, 255, 255)
-                        }
-                        
-                        for _, row in df_sorted.iterrows():
-                            # Posição
-                            pdf.cell(col_widths[0], 10, str(row['POSICAO']), 1, 0, 'C')
-                            
-                            # Escola (com quebra de linha)
-                            pdf.multi_cell(col_widths[1], 10, row['ESCOLA'], 1, 'L')
-                            pdf.set_xy(pdf.get_x() + col_widths[0] + col_widths[1], pdf.get_y() - 10)
-                            
-                            # Etapa
-                            pdf.cell(col_widths[2], 10, row['ETAPA'], 1, 0, 'C')
-                            
-                            # Proficiência
-                            pdf.cell(col_widths[3], 10, f"{row['PROFICIENCIA_MEDIA']:.1f}", 1, 0, 'C')
-                            
-                            # Quartil (com cor de fundo)
-                            quartil = row['QUARTIL']
-                            color = quartil_colors.get(quartil, (255, 255, 255))
-                            pdf.set_fill_color(*color)
-                            pdf.cell(col_widths[4], 10, quartil.split(' ')[0], 1, 1, 'C', fill=True)
-                            pdf.set_fill_color(255, 255, 255)
-                        
-                        # Salva em arquivo temporário
-                        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-                        pdf_path = temp_file.name
-                        pdf.output(pdf_path)
-                        temp_file.close()
-                        return pdf_path
-                    
                     with st.spinner("Gerando PDF..."):
                         try:
-                            pdf_path = gerar_pdf_classificacao(
+                            pdf_bytes = relatorios.gerar_pdf_classificacao_em_cache(
                                 df_quartil,
                                 componente_quartil,
                                 etapa_quartil,
                                 edicao_quartil
                             )
                             
-                            with open(pdf_path, "rb") as f:
-                                pdf_bytes = f.read()
-                            
                             st.download_button(
                                 label="⬇️ Download PDF",
                                 data=pdf_bytes,
@@ -881,79 +578,52 @@ with tab4:
                                 mime="application/pdf"
                             )
                             
-                            os.unlink(pdf_path)
-                            
                         except Exception as e:
                             st.error(f"Erro ao gerar PDF: {str(e)}")
                 
                 # Tabela de referência
                 st.write("### Valores de Referência dos Quartis")
-                df_ref = pd.DataFrame({
-                    'Quartil': ['Q1 (25% piores)', 'Q2 (25% básicas)', 'Q3 (25% intermediárias)', 'Q4 (25% melhores)'],
-                    'Intervalo': [f"≤ {q1:.1f}", f"{q1:.1f} - {q2:.1f}", f"{q2:.1f} - {q3:.1f}", f"> {q3:.1f}"],
-                    'Nº de Escolas': [
-                        (df_quartil['QUARTIL'] == "Q1 (25% piores)").sum(),
-                        (df_quartil['QUARTIL'] == "Q2 (25% básicas)").sum(),
-                        (df_quartil['QUARTIL'] == "Q3 (25% intermediárias)").sum(),
-                        (df_quartil['QUARTIL'] == "Q4 (25% melhores)").sum()
-                    ]
-                })
-                st.dataframe(df_ref, use_container_width=True)
+                df_ref = grafo.no(
+                    'referencia_quartis',
+                    lambda: pd.DataFrame({
+                        'Quartil': consultas.ORDEM_QUARTIS,
+                        'Intervalo': [f"≤ {q1:.1f}", f"{q1:.1f} - {q2:.1f}", f"{q2:.1f} - {q3:.1f}", f"> {q3:.1f}"],
+                        'Nº de Escolas': [(df_quartil['QUARTIL'] == quartil).sum() for quartil in consultas.ORDEM_QUARTIS]
+                    }),
+                    depende=['quartis_edicao']
+                )
+                st.dataframe(df_ref, width='stretch')
                 
                 # Boxplot com melhorias
                 st.write("### Distribuição por Quartis")
-                fig, ax = plt.subplots(figsize=(12, 6))
-                
-                # Estilo do boxplot
-                boxprops = dict(linestyle='-', linewidth=1.5)
-                whiskerprops = dict(linestyle='--')
-                medianprops = dict(linestyle='-', linewidth=2.5, color='yellow')
-                
-                # Cria o boxplot
-                sns.boxplot(data=df_quartil, x='QUARTIL', y='PROFICIENCIA_MEDIA', 
-                           order=["Q1 (25% piores)", "Q2 (25% básicas)", "Q3 (25% intermediárias)", "Q4 (25% melhores)"], 
-                           palette=['#ff9999', '#ffcc99', '#99cc99', '#99ccff'],
-                           boxprops=boxprops, whiskerprops=whiskerprops, medianprops=medianprops)
-                
-                # Linhas de referência
-                ax.axhline(y=q1, color='red', linestyle=':', alpha=0.7, label=f'Q1: {q1:.1f}')
-                ax.axhline(y=q2, color='orange', linestyle=':', alpha=0.7, label=f'Mediana (Q2): {q2:.1f}')
-                ax.axhline(y=q3, color='green', linestyle=':', alpha=0.7, label=f'Q3: {q3:.1f}')
-                
-                # Rótulos das medianas
-                for i, quartil in enumerate(["Q1 (25% piores)", "Q2 (25% básicas)", "Q3 (25% intermediárias)", "Q4 (25% melhores)"]):
-                    q_data = df_quartil[df_quartil['QUARTIL'] == quartil]['PROFICIENCIA_MEDIA']
-                    median = q_data.median()
-                    ax.text(i, median, f'{median:.1f}', ha='center', va='center', 
-                           fontweight='bold', color='black', bbox=dict(facecolor='white', alpha=0.8))
-                
-                # Configurações do gráfico
-                ax.set_title(f"Distribuição por Quartis\n{componente_quartil} - {etapa_quartil} (Edição {edicao_quartil})", pad=20)
-                ax.set_xlabel("Quartil")
-                ax.set_ylabel("Proficiência Média")
-                ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
-                ax.grid(True, linestyle='--', alpha=0.3)
-                plt.tight_layout()
-                
-                st.pyplot(fig)
+                titulo_boxplot = f"Distribuição por Quartis\n{componente_quartil} - {etapa_quartil} (Edição {edicao_quartil})"
                 
                 # Botões de download
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.download_button(
-                        "Download CSV",
-                        df_quartil[['ESCOLA', 'ETAPA', 'COMPONENTE_CURRICULAR', 'PROFICIENCIA_MEDIA', 'QUARTIL']].to_csv(index=False),
-                        f"quartis_{componente_quartil}_{etapa_quartil}_{edicao_quartil}.csv"
-                    )
-                with col2:
-                    buf = io.BytesIO()
-                    fig.savefig(buf, format='png', dpi=300)
-                    st.download_button(
-                        "Download Gráfico",
-                        buf.getvalue(),
-                        f"boxplot_quartis_{componente_quartil}_{etapa_quartil}_{edicao_quartil}.png"
-                    )
-        
+                st.download_button(
+                    "Download CSV",
+                    relatorios.csv_quartis(df_quartil),
+                    f"quartis_{componente_quartil}_{etapa_quartil}_{edicao_quartil}.csv"
+                )
+                
+                # No navegador só chegam os resumos de cada quartil, não todas as escolas
+                resumo_boxplot, discrepantes_boxplot = grafo.no(
+                    'resumo_boxplot',
+                    lambda: graficos.resumir_boxplot(base.formatar_base(df_quartil), consultas.ORDEM_QUARTIS),
+                    depende=['quartis_edicao']
+                )
+                exibir_grafico(
+                    grafo.no(
+                        'spec_boxplot',
+                        lambda: graficos.spec_boxplot(resumo_boxplot, discrepantes_boxplot, consultas.ORDEM_QUARTIS, consultas.CORES_QUARTIS,
+                                                      (q1, q2, q3), titulo_boxplot.split('\n')),
+                        depende=['resumo_boxplot']
+                    ),
+                    lambda dpi: graficos.png_boxplot(df_quartil, consultas.ORDEM_QUARTIS, consultas.CORES_QUARTIS,
+                                                     (q1, q2, q3), titulo_boxplot, dpi=dpi),
+                    "Download Gráfico",
+                    f"boxplot_quartis_{componente_quartil}_{etapa_quartil}_{edicao_quartil}.png",
+                    chave="grafico_boxplot_quartil"
+                )
         except Exception as e:
             st.error(f"Erro ao processar dados: {str(e)}")
             
@@ -972,3 +642,182 @@ with tab4:
         st.markdown("---")
         st.markdown(f""" <p style='font-size: 14px; text-align: center'> © 2024 - Todos os direitos reservados. <b>Desenvolvido por Setor de Processamento e Monitoramento de Resultados - SPMR/DAM.</b> </p> """, unsafe_allow_html=True
         )
+
+with tab5:
+    st.header("📈 Crescimento das Escolas ao Longo das Edições")
+    st.write(
+        "Tendência linear da proficiência média (pontos por ano), taxa de crescimento anual composta (CAGR), "
+        "volatilidade entre edições consecutivas e variação dos níveis de proficiência entre a primeira e a última edição."
+    )
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        etapa_crescimento = st.selectbox("Selecione a ETAPA", ['2º Ano', '5º Ano', '9º Ano'], key="etapa_crescimento")
+    with col2:
+        componente_crescimento = st.selectbox("Selecione o COMPONENTE", ['MATEMÁTICA', 'LÍNGUA PORTUGUESA'], key="componente_crescimento")
+    with col3:
+        municipio_crescimento = st.selectbox("Selecione o Município", ['Todos'] + list(result_spaece['MUNICIPIO'].unique()), key="municipio_crescimento")
+    with col4:
+        min_edicoes_crescimento = st.number_input("Mínimo de edições", min_value=2, max_value=20,
+                                                  value=crescimento.MIN_EDICOES_RANKING, key="min_edicoes_crescimento")
+
+    ordem_crescimento = st.radio(
+        "Ordenar por",
+        ['TENDENCIA_ANUAL', 'CAGR_%', 'VOLATILIDADE_%'],
+        format_func={'TENDENCIA_ANUAL': 'Tendência (pontos/ano)', 'CAGR_%': 'CAGR (% ao ano)', 'VOLATILIDADE_%': 'Volatilidade (%)'}.get,
+        horizontal=True,
+        key="ordem_crescimento"
+    )
+
+    # Tabela calculada uma única vez por versão dos dados
+    tabela_crescimento = crescimento.tabela_crescimento_bases(result_spaece, result_alfa, versao_spaece, versao_alfa)
+    df_crescimento = crescimento.consultar_crescimento(
+        tabela_crescimento,
+        etapa=etapa_crescimento,
+        componente=componente_crescimento,
+        municipio=None if municipio_crescimento == 'Todos' else municipio_crescimento,
+        min_edicoes=min_edicoes_crescimento,
+        ordem=ordem_crescimento
+    )
+
+    if df_crescimento.empty:
+        st.warning("Nenhum dado encontrado para os filtros selecionados.")
+    else:
+        st.dataframe(
+            base.formatar_base(df_crescimento.drop(columns=['ETAPA', 'COMPONENTE_CURRICULAR'])).round(2),
+            width='stretch',
+            hide_index=True,
+            height=500
+        )
+        st.markdown(
+            f"""
+            <p style='color: red; font-size: 14px;'>
+                * O <b>RANKING</b> considera apenas escolas com pelo menos {min_edicoes_crescimento} edições e ordena pela tendência anual.
+            </p>
+            """,
+            unsafe_allow_html=True
+        )
+        st.download_button(
+            "Download CSV",
+            base.formatar_base(df_crescimento).to_csv(index=False).encode('utf-8'),
+            f"crescimento_{etapa_crescimento}_{componente_crescimento}.csv",
+            mime="text/csv"
+        )
+
+with tab6:
+    st.header("👥 Coortes do 5º Ano ao 9º Ano")
+    st.write(
+        "A turma avaliada no 5º Ano em uma edição é avaliada no 9º Ano quatro edições depois. "
+        "O ganho é a diferença entre a proficiência média da escola no 9º Ano e no 5º Ano da mesma coorte."
+    )
+
+    # Tabelas calculadas uma única vez por versão dos dados
+    tabela_coortes, resumo_coortes = coortes.tabelas_coortes(result_spaece, versao_spaece)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        componente_coorte = st.selectbox("Selecione o COMPONENTE", ['MATEMÁTICA', 'LÍNGUA PORTUGUESA'], key="componente_coorte")
+    with col2:
+        municipio_coorte = st.selectbox("Selecione o Município", ['Todos'] + list(result_spaece['MUNICIPIO'].unique()), key="municipio_coorte")
+    with col3:
+        opcoes_coorte = sorted(tabela_coortes['COORTE'].unique())
+        coorte_selecionada = st.selectbox("Selecione a COORTE", ['Todas'] + opcoes_coorte, key="coorte_selecionada")
+
+    # Resumo estadual
+    st.write("### Resumo Estadual por Coorte")
+    st.dataframe(
+        base.formatar_base(resumo_coortes[resumo_coortes['COMPONENTE_CURRICULAR'] == componente_coorte]).round(2),
+        width='stretch',
+        hide_index=True
+    )
+
+    # Escolas acompanhadas
+    df_coortes = coortes.consultar_coortes(
+        tabela_coortes,
+        componente=componente_coorte,
+        municipio=None if municipio_coorte == 'Todos' else municipio_coorte,
+        coorte=None if coorte_selecionada == 'Todas' else coorte_selecionada
+    )
+
+    st.write("### Coortes por Escola")
+    if df_coortes.empty:
+        st.warning("Nenhum dado encontrado para os filtros selecionados.")
+    else:
+        st.dataframe(base.formatar_base(df_coortes).round(2), width='stretch', hide_index=True, height=400)
+        st.download_button(
+            "Download CSV",
+            base.formatar_base(df_coortes).to_csv(index=False).encode('utf-8'),
+            f"coortes_{componente_coorte}.csv",
+            mime="text/csv"
+        )
+
+with tab7:
+    st.header("🚨 Anomalias entre Edições")
+    st.write(
+        "Resultados que destoam das demais escolas pelo z robusto (mediana e MAD): variação da proficiência média "
+        "e mudança na distribuição por níveis em relação à edição anterior da escola, comparadas com as outras escolas "
+        "na mesma transição de edições, e percentuais por nível incoerentes com a proficiência média informada."
+    )
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        etapa_anomalia = st.selectbox("Selecione a ETAPA", ['2º Ano', '5º Ano', '9º Ano'], key="etapa_anomalia")
+    with col2:
+        componente_anomalia = st.selectbox("Selecione o COMPONENTE", ['MATEMÁTICA', 'LÍNGUA PORTUGUESA'], key="componente_anomalia")
+    with col3:
+        municipio_anomalia = st.selectbox("Selecione o Município", ['Todos'] + list(result_spaece['MUNICIPIO'].unique()), key="municipio_anomalia")
+    with col4:
+        limite_z_anomalia = st.number_input("|z| robusto mínimo", min_value=2.0, max_value=10.0, step=0.5,
+                                            value=anomalias.LIMITE_Z, key="limite_z_anomalia")
+
+    tipos_anomalia = st.multiselect(
+        "Tipos de anomalia",
+        list(anomalias.TIPOS),
+        default=list(anomalias.TIPOS),
+        format_func=anomalias.TIPOS.get,
+        key="tipos_anomalia"
+    )
+
+    # Tabela calculada uma única vez por versão dos dados
+    tabela_anomalias = anomalias.tabela_anomalias_bases(result_spaece, result_alfa, versao_spaece, versao_alfa)
+    df_anomalias = anomalias.consultar_anomalias(
+        tabela_anomalias,
+        etapa=etapa_anomalia,
+        componente=componente_anomalia,
+        municipio=None if municipio_anomalia == 'Todos' else municipio_anomalia,
+        tipos=tipos_anomalia,
+        limite_z=limite_z_anomalia
+    )
+
+    if not tipos_anomalia:
+        st.warning("Selecione ao menos um tipo de anomalia.")
+    elif df_anomalias.empty:
+        st.info("Nenhum resultado sinalizado para os filtros selecionados.")
+    else:
+        st.write(f"### {len(df_anomalias)} resultados sinalizados")
+        st.dataframe(
+            base.formatar_base(df_anomalias.drop(columns=['ETAPA', 'COMPONENTE_CURRICULAR'])).round(2),
+            width='stretch',
+            hide_index=True,
+            height=500
+        )
+        limite_z_texto = f"{limite_z_anomalia:g}".replace('.', ',')
+        st.markdown(
+            f"""
+            <p style='color: red; font-size: 14px;'>
+                * Ordenado pelo <b>MAIOR_Z</b>; clique no cabeçalho de uma coluna para reordenar. |z| a partir de {limite_z_texto}
+                indica um resultado muito diferente do esperado: possível erro nos dados ou efeito de uma intervenção.
+            </p>
+            """,
+            unsafe_allow_html=True
+        )
+        st.download_button(
+            "Download CSV",
+            base.formatar_base(df_anomalias).to_csv(index=False).encode('utf-8'),
+            f"anomalias_{etapa_anomalia}_{componente_anomalia}.csv",
+            mime="text/csv"
+        )
+
+# Painel de depuração com os recálculos de cada nó (SPAECE_DEPURACAO=1 ou ?depuracao=1 na URL)
+if configuracao.DEPURACAO or st.query_params.get('depuracao') == '1':
+    grafo.painel_depuracao()
@@ -0,0 +1,365 @@
+import io
+import json
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+import cache_disco
+
+# Gráficos do dashboard em dois formatos:
+# - spec_*: especificações Vega-Lite (JSON) com os dados mínimos, renderizadas no navegador
+# - png_*: imagens PNG renderizadas com matplotlib, usadas apenas quando o download é solicitado
+
+SCHEMA_VEGA_LITE = 'https://vega.github.io/schema/vega-lite/v5.json'
+
+
+# Converte um DataFrame em registros JSON (apenas tipos nativos do Python)
+def _registros(df):
+    return [
+        {coluna: (None if pd.isna(valor) else valor.item() if hasattr(valor, 'item') else valor)
+         for coluna, valor in linha.items()}
+        for linha in df.to_dict('records')
+    ]
+
+
+# Salva a figura em PNG e libera a memória do matplotlib
+def _figura_para_png(fig, dpi, bbox_inches=None):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches=bbox_inches)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+# PNG do gráfico no cache em disco, endereçado pelo conteúdo da especificação
+# Vega-Lite (dados e título) e pela resolução
+def png_em_cache(spec, gerar_png, dpi):
+    return cache_disco.obter('png', json.dumps(spec, sort_keys=True, ensure_ascii=False), {'dpi': dpi},
+                             lambda: gerar_png(dpi))
+
+
+# Calcula o percentual de cada nível de proficiência por EDICAO
+def calcular_percentuais(tabela, categorias):
+    grouped_data = tabela.groupby('EDICAO')[categorias].sum()
+    return grouped_data.div(grouped_data.sum(axis=1), axis=0) * 100
+
+
+# ---------------------------------------------------------------------------
+# Proficiência média por edição (barras verticais)
+# ---------------------------------------------------------------------------
+
+def spec_barras_proficiencia(dados, titulo):
+    valores = dados[['EDICAO', 'PROFICIENCIA_MEDIA']].sort_values('EDICAO').copy()
+    valores['PROFICIENCIA_MEDIA'] = valores['PROFICIENCIA_MEDIA'].round(1)
+
+    return {
+        '$schema': SCHEMA_VEGA_LITE,
+        'title': titulo,
+        'data': {'values': _registros(valores)},
+        'height': 300,
+        'encoding': {
+            'x': {'field': 'EDICAO', 'type': 'ordinal', 'title': 'Edição', 'axis': {'labelAngle': -45}},
+            'y': {'field': 'PROFICIENCIA_MEDIA', 'type': 'quantitative', 'title': 'Proficiência Média'},
+        },
+        'layer': [
+            {'mark': {'type': 'bar'},
+             'encoding': {'tooltip': [{'field': 'EDICAO', 'title': 'Edição'},
+                                      {'field': 'PROFICIENCIA_MEDIA', 'title': 'Proficiência'}]}},
+            {'mark': {'type': 'text', 'dy': -6, 'color': 'black'},
+             'encoding': {'text': {'field': 'PROFICIENCIA_MEDIA', 'type': 'quantitative', 'format': '.0f'}}},
+        ],
+    }
+
+
+def png_barras_proficiencia(dados, titulo, dpi=100):
+    dados = dados.sort_values(by='EDICAO')
+
+    fig, ax = plt.subplots(figsize=(8, 4))
+    sns.barplot(data=dados, x='EDICAO', y='PROFICIENCIA_MEDIA', ax=ax)
+    ax.set_ylabel('Proficiência Média')
+    ax.set_xlabel('Edição')
+    ax.set_title(titulo)
+
+    # Adicionar rótulos acima das barras
+    for p in ax.patches:
+        ax.annotate(f'{p.get_height():.0f}', (p.get_x() + p.get_width() / 2., p.get_height()),
+                    ha='center', va='center', fontsize=10, color='black', xytext=(0, 5),
+                    textcoords='offset points')
+
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    return _figura_para_png(fig, dpi)
+
+
+# ---------------------------------------------------------------------------
+# Distribuição percentual por nível (barras horizontais empilhadas)
+# ---------------------------------------------------------------------------
+
+def spec_empilhado(percentuais, categorias, cores, titulo):
+    # Formato longo: uma linha por (EDICAO, NIVEL)
+    valores = percentuais[categorias].round(1).reset_index().melt(
+        id_vars='EDICAO', var_name='NIVEL', value_name='PERCENTUAL'
+    )
+    valores['ORDEM'] = valores['NIVEL'].map({categoria: i for i, categoria in enumerate(categorias)})
+
+    return {
+        '$schema': SCHEMA_VEGA_LITE,
+        'title': titulo,
+        'data': {'values': _registros(valores)},
+        'height': {'step': 32},
+        'transform': [
+            {'stack': 'PERCENTUAL', 'groupby': ['EDICAO'], 'sort': [{'field': 'ORDEM'}], 'as': ['INICIO', 'FIM']},
+            {'calculate': '(datum.INICIO + datum.FIM) / 2', 'as': 'MEIO'},
+        ],
+        'encoding': {
+            'y': {'field': 'EDICAO', 'type': 'ordinal', 'title': None},
+        },
+        'layer': [
+            {'mark': {'type': 'bar'},
+             'encoding': {
+                 'x': {'field': 'INICIO', 'type': 'quantitative', 'title': 'Percentual', 'scale': {'domain': [0, 100]}},
+                 'x2': {'field': 'FIM'},
+                 'color': {'field': 'NIVEL', 'type': 'nominal', 'title': None,
+                           'scale': {'domain': categorias, 'range': cores}},
+                 'tooltip': [{'field': 'EDICAO', 'title': 'Edição'}, {'field': 'NIVEL', 'title': 'Nível'},
+                             {'field': 'PERCENTUAL', 'title': 'Percentual'}],
+             }},
+            {'transform': [{'filter': 'datum.PERCENTUAL > 0'}],
+             'mark': {'type': 'text', 'fontSize': 9},
+             'encoding': {
+                 'x': {'field': 'MEIO', 'type': 'quantitative'},
+                 'text': {'field': 'PERCENTUAL', 'type': 'quantitative', 'format': '.1f'},
+                 'color': {'condition': {'test': "datum.NIVEL == '%s' || datum.NIVEL == '%s'" % (categorias[0], categorias[-1]),
+                                         'value': 'white'},
+                           'value': 'black'},
+             }},
+        ],
+    }
+
+
+def png_empilhado(percentuais, categorias, cores, titulo, dpi=100):
+    fig, ax = plt.subplots(figsize=(10, max(len(percentuais) * 0.8, 2)))
+    y_positions = range(len(percentuais))
+
+    # Criar barras empilhadas para cada EDICAO
+    for i, (edicao, percentuais_edicao) in enumerate(percentuais.iterrows()):
+        left = 0
+        for category, color in zip(categorias, cores):
+            ax.barh(y_positions[i], percentuais_edicao[category], left=left, color=color, label=category if i == 0 else "")
+            left += percentuais_edicao[category]
+
+        # Adicionar rótulos
+        left = 0
+        for category, color in zip(categorias, cores):
+            width = percentuais_edicao[category]
+            if width > 0:
+                label_color = 'white' if color in ['darkgreen', 'red'] else 'black'
+                ax.text(left + width / 2, y_positions[i], f'{width:.1f}%', ha='center', va='center', color=label_color, fontsize=8)
+            left += width
+
+    # Configurar eixo Y com as edições
+    ax.set_yticks(y_positions)
+    ax.set_yticklabels(percentuais.index)
+    ax.set_xlim(0, 100)
+    ax.set_xlabel('Percentual')
+    ax.set_title(titulo)
+
+    # Remover bordas desnecessárias
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_visible(False)
+
+    handles, labels = ax.get_legend_handles_labels()
+    ax.legend(handles, labels, bbox_to_anchor=(1.05, 1), loc='upper left', fontsize='small')
+
+    fig.tight_layout()
+    return _figura_para_png(fig, dpi, bbox_inches='tight')
+
+
+# ---------------------------------------------------------------------------
+# Evolução da proficiência da escola frente aos quartis de cada edição
+# ---------------------------------------------------------------------------
+
+def spec_evolucao_quartis(df_resultado, escola, titulo):
+    valores = df_resultado[['EDIÇÃO', 'PROFICIÊNCIA', 'Q1', 'MEDIANA (Q2)', 'Q3']].rename(
+        columns={'EDIÇÃO': 'EDICAO', 'PROFICIÊNCIA': 'PROFICIENCIA', 'MEDIANA (Q2)': 'Q2'}
+    ).round(1)
+    valores['TOPO'] = round(valores['PROFICIENCIA'].max() * 1.05, 1)
+
+    x = {'field': 'EDICAO', 'type': 'ordinal', 'title': 'Edição', 'axis': {'labelAngle': -45}}
+    faixas = [
+        ('Q1', 'Q2', 'red', 'Q1 (25% baixa)'),
+        ('Q2', 'Q3', 'orange', 'Q2 (25% média baixa)'),
+        ('Q3', 'TOPO', 'green', 'Q3/Q4 (25% médio alto/alto)'),
+    ]
+
+    return {
+        '$schema': SCHEMA_VEGA_LITE,
+        'title': titulo,
+        'data': {'values': _registros(valores)},
+        'height': 350,
+        'layer': [
+            {'mark': {'type': 'area', 'opacity': 0.1, 'color': cor},
+             'encoding': {'x': x,
+                          'y': {'field': inferior, 'type': 'quantitative', 'title': 'Proficiência Média',
+                                'scale': {'zero': False}},
+                          'y2': {'field': superior},
+                          'tooltip': {'value': rotulo}}}
+            for inferior, superior, cor, rotulo in faixas
+        ] + [
+            {'mark': {'type': 'line', 'point': {'size': 70}, 'color': 'blue', 'strokeWidth': 2},
+             'encoding': {'x': x,
+                          'y': {'field': 'PROFICIENCIA', 'type': 'quantitative'},
+                          'tooltip': [{'field': 'EDICAO', 'title': 'Edição'},
+                                      {'field': 'PROFICIENCIA', 'title': f'Escola: {escola}'},
+                                      {'field': 'Q1'}, {'field': 'Q2', 'title': 'Mediana (Q2)'},
+                                      {'field': 'Q3'}]}},
+            {'mark': {'type': 'text', 'dy': -12, 'color': 'blue', 'fontSize': 10},
+             'encoding': {'x': x,
+                          'y': {'field': 'PROFICIENCIA', 'type': 'quantitative'},
+                          'text': {'field': 'PROFICIENCIA', 'type': 'quantitative', 'format': '.1f'}}},
+        ],
+    }
+
+
+def png_evolucao_quartis(df_resultado, escola, titulo, dpi=100):
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    # Plot principal com rótulos
+    ax.plot(df_resultado['EDIÇÃO'], df_resultado['PROFICIÊNCIA'],
+            'b-o', linewidth=2, markersize=8, label=f'Escola: {escola}')
+
+    for _, row in df_resultado.iterrows():
+        ax.annotate(f"{row['PROFICIÊNCIA']:.1f}",
+                    (row['EDIÇÃO'], row['PROFICIÊNCIA']),
+                    textcoords="offset points", xytext=(0, 10),
+                    ha='center', fontsize=9, color='blue')
+
+    # Áreas dos quartis
+    ax.fill_between(df_resultado['EDIÇÃO'], df_resultado['Q1'], df_resultado['MEDIANA (Q2)'],
+                    color='red', alpha=0.1, label='Q1 (25% baixa)')
+    ax.fill_between(df_resultado['EDIÇÃO'], df_resultado['MEDIANA (Q2)'], df_resultado['Q3'],
+                    color='orange', alpha=0.1, label='Q2 (25% média baixa)')
+    ax.fill_between(df_resultado['EDIÇÃO'], df_resultado['Q3'], df_resultado['PROFICIÊNCIA'].max() * 1.05,
+                    color='green', alpha=0.1, label='Q3/Q4 (25% médio alto/alto)')
+
+    ax.set_title(titulo, pad=20)
+    ax.set_xlabel("Edição")
+    ax.set_ylabel("Proficiência Média")
+    ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
+    ax.grid(True, linestyle='--', alpha=0.3)
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    return _figura_para_png(fig, dpi)
+
+
+# ---------------------------------------------------------------------------
+# Boxplot por quartil
+# ---------------------------------------------------------------------------
+
+# Pré-agrega o boxplot no servidor: cinco números por quartil (bigodes de Tukey, 1,5 x IQR)
+# e apenas os pontos discrepantes, em vez de enviar todas as escolas ao navegador
+def resumir_boxplot(df_quartil, ordem):
+    resumo = []
+    discrepantes = []
+    for quartil in ordem:
+        valores = df_quartil.loc[df_quartil['QUARTIL'] == quartil, 'PROFICIENCIA_MEDIA'].to_numpy(dtype=float)
+        if valores.size == 0:
+            continue
+        q1, mediana, q3 = np.percentile(valores, [25, 50, 75])
+        iqr = q3 - q1
+        dentro = valores[(valores >= q1 - 1.5 * iqr) & (valores <= q3 + 1.5 * iqr)]
+        resumo.append({
+            'QUARTIL': quartil,
+            'MINIMO': float(dentro.min()),
+            'Q1': float(q1),
+            'MEDIANA': float(mediana),
+            'Q3': float(q3),
+            'MAXIMO': float(dentro.max()),
+            'N_ESCOLAS': int(valores.size),
+        })
+        for valor in valores[(valores < q1 - 1.5 * iqr) | (valores > q3 + 1.5 * iqr)]:
+            discrepantes.append({'QUARTIL': quartil, 'PROFICIENCIA_MEDIA': float(valor)})
+
+    return (pd.DataFrame(resumo, columns=['QUARTIL', 'MINIMO', 'Q1', 'MEDIANA', 'Q3', 'MAXIMO', 'N_ESCOLAS']),
+            pd.DataFrame(discrepantes, columns=['QUARTIL', 'PROFICIENCIA_MEDIA']))
+
+
+def spec_boxplot(resumo, discrepantes, ordem, cores, cortes, titulo):
+    q1, q2, q3 = cortes
+    x = {'field': 'QUARTIL', 'type': 'nominal', 'title': 'Quartil', 'sort': ordem,
+         'axis': {'labelAngle': 0}}
+    y_titulo = {'type': 'quantitative', 'title': 'Proficiência Média', 'scale': {'zero': False}}
+    cor = {'field': 'QUARTIL', 'type': 'nominal', 'legend': None, 'scale': {'domain': ordem, 'range': cores}}
+    referencias = pd.DataFrame({
+        'REFERENCIA': [f'Q1: {q1:.1f}', f'Mediana (Q2): {q2:.1f}', f'Q3: {q3:.1f}'],
+        'VALOR': [round(q1, 1), round(q2, 1), round(q3, 1)],
+    })
+
+    return {
+        '$schema': SCHEMA_VEGA_LITE,
+        'title': titulo,
+        'height': 350,
+        'layer': [
+            {'data': {'values': _registros(resumo.round(1))},
+             'layer': [
+                 {'mark': {'type': 'rule', 'strokeDash': [4, 3]},
+                  'encoding': {'x': x, 'y': dict(y_titulo, field='MINIMO'), 'y2': {'field': 'MAXIMO'}}},
+                 {'mark': {'type': 'bar', 'size': 60, 'stroke': 'black', 'strokeWidth': 1.5},
+                  'encoding': {'x': x, 'y': dict(y_titulo, field='Q1'), 'y2': {'field': 'Q3'}, 'color': cor,
+                               'tooltip': [{'field': 'QUARTIL'}, {'field': 'N_ESCOLAS', 'title': 'Nº de Escolas'},
+                                           {'field': 'MINIMO', 'title': 'Mínimo'}, {'field': 'Q1'},
+                                           {'field': 'MEDIANA', 'title': 'Mediana'}, {'field': 'Q3'},
+                                           {'field': 'MAXIMO', 'title': 'Máximo'}]}},
+                 {'mark': {'type': 'tick', 'size': 60, 'thickness': 2.5, 'color': 'yellow'},
+                  'encoding': {'x': x, 'y': dict(y_titulo, field='MEDIANA')}},
+                 {'mark': {'type': 'text', 'fontWeight': 'bold', 'color': 'black', 'dy': -10},
+                  'encoding': {'x': x, 'y': dict(y_titulo, field='MEDIANA'),
+                               'text': {'field': 'MEDIANA', 'type': 'quantitative', 'format': '.1f'}}},
+             ]},
+            {'data': {'values': _registros(discrepantes.round(1))},
+             'mark': {'type': 'point', 'color': 'gray'},
+             'encoding': {'x': x, 'y': dict(y_titulo, field='PROFICIENCIA_MEDIA')}},
+            {'data': {'values': _registros(referencias)},
+             'mark': {'type': 'rule', 'strokeDash': [2, 2], 'opacity': 0.7},
+             'encoding': {'y': dict(y_titulo, field='VALOR'),
+                          'color': {'field': 'REFERENCIA', 'type': 'nominal', 'title': None,
+                                    'scale': {'range': ['red', 'orange', 'green']}},
+                          'tooltip': [{'field': 'REFERENCIA'}]}},
+        ],
+        'resolve': {'scale': {'color': 'independent'}},
+    }
+
+
+def png_boxplot(df_quartil, ordem, cores, cortes, titulo, dpi=100):
+    q1, q2, q3 = cortes
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    sns.boxplot(data=df_quartil, x='QUARTIL', y='PROFICIENCIA_MEDIA', order=ordem, hue='QUARTIL',
+                hue_order=ordem, palette=cores, legend=False, ax=ax,
+                boxprops=dict(linestyle='-', linewidth=1.5), whiskerprops=dict(linestyle='--'),
+                medianprops=dict(linestyle='-', linewidth=2.5, color='yellow'))
+
+    # Linhas de referência
+    ax.axhline(y=q1, color='red', linestyle=':', alpha=0.7, label=f'Q1: {q1:.1f}')
+    ax.axhline(y=q2, color='orange', linestyle=':', alpha=0.7, label=f'Mediana (Q2): {q2:.1f}')
+    ax.axhline(y=q3, color='green', linestyle=':', alpha=0.7, label=f'Q3: {q3:.1f}')
+
+    # Rótulos das medianas
+    for i, quartil in enumerate(ordem):
+        q_data = df_quartil[df_quartil['QUARTIL'] == quartil]['PROFICIENCIA_MEDIA']
+        if q_data.empty:
+            continue
+        median = q_data.median()
+        ax.text(i, median, f'{median:.1f}', ha='center', va='center',
+                fontweight='bold', color='black', bbox=dict(facecolor='white', alpha=0.8))
+
+    ax.set_title(titulo, pad=20)
+    ax.set_xlabel("Quartil")
+    ax.set_ylabel("Proficiência Média")
+    ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
+    ax.grid(True, linestyle='--', alpha=0.3)
+    fig.tight_layout()
+    return _figura_para_png(fig, dpi)
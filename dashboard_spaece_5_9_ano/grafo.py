@@ -0,0 +1,90 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+import cache_disco
+
+# Recálculo incremental entre execuções do dashboard.
+# Cada nó calculado (base filtrada, cortes dos quartis, tabela classificada, gráfico)
+# declara os widgets de que depende e os nós anteriores que usa. A chave do nó é o
+# hash do nome, dos valores desses widgets e das chaves dos nós anteriores; o valor
+# fica em st.cache_data, compartilhado entre as sessões, e só é recalculado quando
+# a chave ainda não foi calculada. Em st.session_state ficam apenas a chave atual de
+# cada nó e as contagens de recálculo, exibidas no painel de depuração.
+
+CHAVE_SESSAO = '_grafo_nos'
+
+# Valores mantidos no cache compartilhado (os mais antigos são descartados)
+ITENS_CACHE = 256
+
+
+def _nos():
+    if CHAVE_SESSAO not in st.session_state:
+        st.session_state[CHAVE_SESSAO] = {}
+    return st.session_state[CHAVE_SESSAO]
+
+
+# Valor compartilhado de uma chave; `_calcular` não entra no hash do st.cache_data
+@st.cache_data(max_entries=ITENS_CACHE, show_spinner=False)
+def _valor(chave, _calcular):
+    return _calcular()
+
+
+# Valor do nó `nome`, recalculado com `calcular()` apenas se mudou algum widget em
+# `widgets`, algum valor em `parametros` (entradas que não são widgets, como a
+# versão dos dados) ou algum nó em `depende`
+def no(nome, calcular, widgets=(), depende=(), parametros=None):
+    nos = _nos()
+    entradas = {chave: st.session_state.get(chave) for chave in widgets}
+    entradas.update(parametros or {})
+    versoes = {dependencia: nos[dependencia]['chave'] for dependencia in depende}
+    chave = cache_disco.gerar_chave(nome, versoes, entradas)
+
+    calculado = []
+
+    def calcular_medindo():
+        inicio = time.perf_counter()
+        valor = calcular()
+        calculado.append((time.perf_counter() - inicio) * 1000)
+        return valor
+
+    valor = _valor(chave, calcular_medindo)
+
+    atual = nos.get(nome) or {'recalculos': 0, 'reutilizacoes': 0, 'duracao_ms': 0.0}
+    nos[nome] = {
+        'chave': chave,
+        'entradas': entradas,
+        'versoes': versoes,
+        'recalculos': atual['recalculos'] + (1 if calculado else 0),
+        'reutilizacoes': atual['reutilizacoes'] + (0 if calculado else 1),
+        'duracao_ms': calculado[0] if calculado else atual['duracao_ms'],
+    }
+    return valor
+
+
+# Contagens de recálculo e reutilização de cada nó nesta sessão
+def estatisticas():
+    return pd.DataFrame(
+        [
+            {
+                'NÓ': nome,
+                'RECÁLCULOS': dados['recalculos'],
+                'REUTILIZAÇÕES': dados['reutilizacoes'],
+                'ÚLTIMO RECÁLCULO (ms)': round(dados['duracao_ms'], 1),
+                'ENTRADAS': ', '.join(f"{chave}={valor}" for chave, valor in dados['entradas'].items()),
+                'DEPENDE DE': ', '.join(dados['versoes']),
+            }
+            for nome, dados in _nos().items()
+        ],
+        columns=['NÓ', 'RECÁLCULOS', 'REUTILIZAÇÕES', 'ÚLTIMO RECÁLCULO (ms)', 'ENTRADAS', 'DEPENDE DE']
+    )
+
+
+# Painel de depuração na barra lateral
+def painel_depuracao():
+    with st.sidebar.expander("Depuração: recálculos por nó"):
+        st.dataframe(estatisticas(), width='stretch', hide_index=True)
+        if st.button("Zerar contagens", key="zerar_grafo"):
+            st.session_state[CHAVE_SESSAO] = {}
+            st.rerun()
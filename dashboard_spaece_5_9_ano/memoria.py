@@ -0,0 +1,75 @@
+import argparse
+
+import pandas as pd
+
+import base
+import configuracao
+import sintetico
+import validacao
+
+# Relatório de memória das bases: formato anterior (textos como object, códigos INEP
+# e EDICAO como texto, decimais em float64) contra o formato compacto usado em memória
+# (base.compactar_base), nas planilhas do repositório e em uma base estadual sintética.
+#
+# Uso: python dashboard_spaece_5_9_ano/memoria.py [--municipios 184] [--escolas-por-municipio 30] [--colunas]
+
+
+def _bytes_colunas(df):
+    return df.memory_usage(deep=True, index=False)
+
+
+# Compara os dois formatos de uma base já validada; retorna (resumo, detalhe por coluna)
+def comparar_formatos(nome, df):
+    anterior = base.formatar_base(df)
+    compacto = base.compactar_base(df)
+    bytes_anterior = _bytes_colunas(anterior)
+    bytes_compacto = _bytes_colunas(compacto)
+
+    resumo = {
+        'BASE': nome,
+        'LINHAS': len(df),
+        'ESCOLAS': base.identificar_escolas(base.escolas(compacto)).nunique(),
+        'ANTERIOR_MB': bytes_anterior.sum() / 1024 ** 2,
+        'COMPACTO_MB': bytes_compacto.sum() / 1024 ** 2,
+    }
+    resumo['REDUCAO_%'] = (1 - resumo['COMPACTO_MB'] / resumo['ANTERIOR_MB']) * 100
+
+    detalhe = pd.DataFrame({
+        'BASE': nome,
+        'COLUNA': df.columns,
+        'TIPO_ANTERIOR': anterior.dtypes.astype(str).to_numpy(),
+        'TIPO_COMPACTO': compacto.dtypes.astype(str).to_numpy(),
+        'ANTERIOR_KB': (bytes_anterior / 1024).to_numpy(),
+        'COMPACTO_KB': (bytes_compacto / 1024).to_numpy(),
+    })
+    return resumo, detalhe
+
+
+# Relatório das planilhas do repositório e da base sintética; retorna (resumo, detalhe)
+def relatorio_memoria(municipios=sintetico.MUNICIPIOS, escolas_por_municipio=sintetico.ESCOLAS_POR_MUNICIPIO):
+    bases = []
+    for caminho, niveis, nome in [(configuracao.CAMINHO_SPAECE, validacao.NIVEIS_SPAECE, 'result_spaece'),
+                                  (configuracao.CAMINHO_ALFA, validacao.NIVEIS_ALFA, 'result_alfa')]:
+        bases.append((nome, validacao.validar_base(pd.read_excel(caminho), niveis, nome)[0]))
+
+    sintetico_spaece, sintetico_alfa = sintetico.gerar_bases(municipios, escolas_por_municipio)
+    bases.append(('sintético spaece', validacao.validar_base(sintetico_spaece, validacao.NIVEIS_SPAECE, 'sintético spaece')[0]))
+    bases.append(('sintético alfa', validacao.validar_base(sintetico_alfa, validacao.NIVEIS_ALFA, 'sintético alfa')[0]))
+
+    resumos, detalhes = zip(*(comparar_formatos(nome, df) for nome, df in bases))
+    return pd.DataFrame(resumos), pd.concat(detalhes, ignore_index=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Memória das bases do SPAECE: formato anterior x compacto")
+    parser.add_argument('--municipios', type=int, default=sintetico.MUNICIPIOS, help="Municípios da base sintética")
+    parser.add_argument('--escolas-por-municipio', type=int, default=sintetico.ESCOLAS_POR_MUNICIPIO)
+    parser.add_argument('--colunas', action='store_true', help="Mostra também a memória de cada coluna")
+    args = parser.parse_args()
+
+    resumo, detalhe = relatorio_memoria(args.municipios, args.escolas_por_municipio)
+    pd.set_option('display.width', 200)
+    print(resumo.round(2).to_string(index=False))
+    if args.colunas:
+        print()
+        print(detalhe.round(1).to_string(index=False))
@@ -0,0 +1,257 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import pandas as pd
+
+import base
+import cache_disco
+import configuracao
+import consultas
+import relatorios
+
+# Publicação: gera os CSVs e PDFs de classificação (aba "Classificação por Edição")
+# e de quartis (aba "Quartil") de todas as combinações (ETAPA, COMPONENTE, EDIÇÃO),
+# em paralelo, numa pasta por edição. O manifesto (manifesto.json) guarda o SHA-256
+# de cada arquivo e a versão dos dados de entrada da combinação; numa nova execução,
+# as combinações cujos dados não mudaram (e cujos arquivos continuam íntegros) são
+# puladas. Uma combinação que falha é registrada como erro e fica fora do manifesto
+# (é gerada de novo na próxima execução); o manifesto é gravado mesmo após falhas.
+#
+# Uso: python dashboard_spaece_5_9_ano/publicacao.py --saida publicacao/ [--processos N] [--edicao 2024] [--forcar]
+
+MANIFESTO = 'manifesto.json'
+
+# Arquivos de cada combinação, com os mesmos nomes dos downloads do dashboard
+ARQUIVOS = {
+    'classificacao_csv': "classificacao_{etapa}_{componente}_{edicao}.csv",
+    'classificacao_pdf': "classificacao_{etapa}_{componente}_{edicao}.pdf",
+    'quartis_csv': "quartis_{componente}_{etapa}_{edicao}.csv",
+    'quartis_pdf': "classificacao_quartis_{componente}_{etapa}_{edicao}.pdf",
+}
+
+# Estado de cada processo: bases carregadas uma vez e pasta de saída
+_estado = {}
+
+
+def caminhos_combinacao(etapa, componente, edicao):
+    return {
+        tipo: os.path.join(str(edicao), modelo.format(etapa=etapa, componente=componente, edicao=edicao))
+        for tipo, modelo in ARQUIVOS.items()
+    }
+
+
+def sha256_arquivo(caminho):
+    conteudo = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            conteudo.update(bloco)
+    return conteudo.hexdigest()
+
+
+# Versão da entrada de cada combinação: conteúdo das linhas da combinação, formato do
+# cache e logo usada nos PDFs. Uma edição nova não altera as combinações já publicadas.
+def versoes_entrada(result_spaece, result_alfa):
+    complemento = f"{cache_disco.VERSAO_FORMATO}:{base.versao_arquivos(configuracao.CAMINHO_LOGO)}"
+    versoes = {}
+    for df in (result_spaece, result_alfa):
+        grupos = df.groupby(['ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO'], observed=True, sort=False)
+        for (etapa, componente, edicao), grupo in grupos:
+            conteudo = hashlib.sha1(f"{base.versao_base(grupo)}:{complemento}".encode('utf-8'))
+            versoes[(etapa, componente, edicao)] = conteudo.hexdigest()[:16]
+    return versoes
+
+
+def ler_manifesto(saida):
+    caminho = os.path.join(saida, MANIFESTO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Grava o manifesto de uma vez (arquivo temporário + rename), para nunca deixar um manifesto pela metade
+def gravar_manifesto(saida, manifesto):
+    caminho = os.path.join(saida, MANIFESTO)
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=1)
+    os.replace(caminho + '.tmp', caminho)
+
+
+# A combinação já publicada pode ser pulada: mesma entrada e arquivos com o checksum do manifesto
+def publicada(saida, anterior, entrada):
+    if anterior is None or anterior['entrada'] != entrada:
+        return False
+    for arquivo in anterior['arquivos']:
+        caminho = os.path.join(saida, arquivo['arquivo'])
+        if not os.path.exists(caminho) or sha256_arquivo(caminho) != arquivo['sha256']:
+            return False
+    return True
+
+
+def _iniciar_processo(saida):
+    result_spaece, result_alfa, _ = base.carregar_bases()
+    _estado['bases'] = (result_spaece, result_alfa)
+    _estado['versoes'] = (base.versao_base(result_spaece), base.versao_base(result_alfa))
+    _estado['saida'] = saida
+
+
+# Gera e grava os quatro arquivos de uma combinação; retorna os metadados de cada um
+def _publicar(combinacao):
+    inicio = time.perf_counter()
+    etapa, componente, edicao = combinacao
+    df_base = consultas.selecionar_base(etapa, *_estado['bases'])
+    versao = consultas.selecionar_base(etapa, *_estado['versoes'])
+    ranking = consultas.ranking_edicao_em_cache(df_base, etapa, componente, edicao, versao)
+    df_quartil, _ = consultas.quartis_edicao_em_cache(df_base, etapa, componente, edicao, versao)
+    conteudos = {
+        'classificacao_csv': relatorios.csv_classificacao(ranking),
+        'classificacao_pdf': relatorios.gerar_pdf_em_cache(ranking, edicao),
+        'quartis_csv': relatorios.csv_quartis(df_quartil),
+        'quartis_pdf': relatorios.gerar_pdf_classificacao_em_cache(df_quartil, componente, etapa, edicao),
+    }
+
+    arquivos = []
+    for tipo, relativo in caminhos_combinacao(etapa, componente, edicao).items():
+        caminho = os.path.join(_estado['saida'], relativo)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, 'wb') as f:
+            f.write(conteudos[tipo])
+        arquivos.append({
+            'tipo': tipo,
+            'arquivo': relativo,
+            'sha256': hashlib.sha256(conteudos[tipo]).hexdigest(),
+            'bytes': len(conteudos[tipo]),
+        })
+    return combinacao, arquivos, time.perf_counter() - inicio
+
+
+# Publica todas as combinações (ou só as das edições indicadas) em `saida`;
+# retorna um DataFrame com uma linha por combinação (SITUACAO: gerada, pulada, removida
+# ou erro, com a mensagem em ERRO)
+def publicar(saida, processos=None, edicoes=None, forcar=False):
+    processos = processos or os.cpu_count() or 1
+    os.makedirs(saida, exist_ok=True)
+
+    result_spaece, result_alfa, _ = base.carregar_bases()
+    versoes = versoes_entrada(result_spaece, result_alfa)
+    todas = consultas.combinacoes(result_spaece, result_alfa)
+    if edicoes:
+        todas = [combinacao for combinacao in todas if str(combinacao[2]) in edicoes]
+
+    anterior = {
+        (item['etapa'], item['componente'], str(item['edicao'])): item
+        for item in ler_manifesto(saida).get('combinacoes', [])
+    }
+    manifesto = {}
+    linhas = []
+    pendentes = []
+    for etapa, componente, edicao in todas:
+        chave = (etapa, componente, str(edicao))
+        entrada = versoes[(etapa, componente, edicao)]
+        item = anterior.pop(chave, None)
+        if not forcar and publicada(saida, item, entrada):
+            manifesto[chave] = item
+            linhas.append((etapa, componente, edicao, 'pulada', 0.0, ''))
+        else:
+            pendentes.append((etapa, componente, edicao))
+
+    def registrar(combinacao, arquivos, segundos):
+        etapa, componente, edicao = combinacao
+        manifesto[(etapa, componente, str(edicao))] = {
+            'etapa': etapa,
+            'componente': componente,
+            'edicao': str(edicao),
+            'entrada': versoes[combinacao],
+            'arquivos': arquivos,
+        }
+        linhas.append((etapa, componente, edicao, 'gerada', segundos, ''))
+
+    # Falha numa combinação: sem entrada no manifesto, os arquivos dela são gerados de novo
+    def registrar_erro(combinacao, erro):
+        etapa, componente, edicao = combinacao
+        linhas.append((etapa, componente, edicao, 'erro', 0.0, f"{type(erro).__name__}: {erro}"))
+
+    try:
+        if processos == 1 or len(pendentes) <= 1:
+            _iniciar_processo(saida)
+            for combinacao in pendentes:
+                try:
+                    registrar(*_publicar(combinacao))
+                except Exception as e:
+                    registrar_erro(combinacao, e)
+        else:
+            # Poucas combinações em andamento por vez, como nos boletins
+            contexto = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(processos, mp_context=contexto, initializer=_iniciar_processo,
+                                     initargs=(saida,)) as executor:
+                em_andamento = {}
+                fila = iter(pendentes)
+                while True:
+                    for combinacao in fila:
+                        em_andamento[executor.submit(_publicar, combinacao)] = combinacao
+                        if len(em_andamento) >= processos * 2:
+                            break
+                    if not em_andamento:
+                        break
+                    concluidos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+                    for futuro in concluidos:
+                        combinacao = em_andamento.pop(futuro)
+                        try:
+                            registrar(*futuro.result())
+                        except Exception as e:
+                            registrar_erro(combinacao, e)
+
+        # Combinações que saíram do catálogo: com --edicao, as demais edições continuam
+        # no manifesto; sem filtro, os arquivos publicados por execuções anteriores são removidos
+        for chave in list(anterior):
+            item = anterior.pop(chave)
+            if edicoes and chave[2] not in edicoes:
+                manifesto[chave] = item
+                continue
+            for arquivo in item['arquivos']:
+                caminho = os.path.join(saida, arquivo['arquivo'])
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+            linhas.append((item['etapa'], item['componente'], item['edicao'], 'removida', 0.0, ''))
+    finally:
+        # Gravado também após uma interrupção: os arquivos já gerados entram no manifesto
+        # e as remoções não concluídas ficam para a próxima execução
+        manifesto.update(anterior)
+        gravar_manifesto(saida, {
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'planilhas': base.versao_arquivos(configuracao.CAMINHO_SPAECE, configuracao.CAMINHO_ALFA),
+            'combinacoes': [manifesto[chave] for chave in sorted(manifesto)],
+        })
+    return pd.DataFrame(linhas, columns=['ETAPA', 'COMPONENTE', 'EDICAO', 'SITUACAO', 'SEGUNDOS', 'ERRO'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Publica os CSVs e PDFs de classificação e quartis de todas as edições")
+    parser.add_argument('--saida', default='publicacao', help="Diretório da publicação (uma pasta por edição)")
+    parser.add_argument('--processos', type=int, help="Processos em paralelo (padrão: número de núcleos)")
+    parser.add_argument('--edicao', action='append', help="Publica apenas esta edição (pode repetir)")
+    parser.add_argument('--forcar', action='store_true', help="Gera tudo de novo, mesmo sem mudanças na entrada")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    tabela = publicar(args.saida, args.processos, args.edicao, args.forcar)
+    duracao = time.perf_counter() - inicio
+
+    situacoes = tabela['SITUACAO'].value_counts()
+    print(f"{len(tabela)} combinações em {duracao:.1f}s: {situacoes.get('gerada', 0)} geradas, "
+          f"{situacoes.get('pulada', 0)} puladas (entrada sem mudanças), {situacoes.get('removida', 0)} removidas, "
+          f"{situacoes.get('erro', 0)} com erro")
+    print(f"Manifesto: {os.path.join(args.saida, MANIFESTO)}")
+
+    erros = tabela[tabela['SITUACAO'] == 'erro']
+    if not erros.empty:
+        print(f"{len(erros)} combinações com erro (geradas de novo na próxima execução):")
+        for linha in erros.itertuples(index=False):
+            print(f"  {linha.ETAPA} / {linha.COMPONENTE} / {linha.EDICAO}: {linha.ERRO}")
+        raise SystemExit(1)
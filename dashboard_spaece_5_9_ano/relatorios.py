@@ -0,0 +1,234 @@
+import atexit
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from fpdf import FPDF
+from PIL import Image
+
+import base
+import cache_disco
+import configuracao
+
+# Relatórios em PDF do dashboard
+
+# Logo já convertida (uma vez por processo)
+_png_logo = None
+
+# Diretório temporário das imagens do processo atual: (pid, caminho)
+_diretorio_imagens = (None, None)
+
+
+# Converte um PNG (bytes) em PNG RGB, aplicando a transparência sobre fundo branco
+# (a cor da página). Sem canal alfa, o parser do FPDF 1.7.2 só copia os blocos IDAT,
+# em vez de separar o alfa pixel a pixel em Python. Retorna (png, largura, altura).
+def png_rgb(dados):
+    imagem = Image.open(io.BytesIO(dados))
+    if imagem.mode != 'RGB':
+        imagem = imagem.convert('RGBA')
+        fundo = Image.new('RGB', imagem.size, (255, 255, 255))
+        fundo.paste(imagem, mask=imagem.split()[3])
+        imagem = fundo
+
+    buffer = io.BytesIO()
+    imagem.save(buffer, format='PNG')
+    largura, altura = imagem.size
+    return buffer.getvalue(), largura, altura
+
+
+# Conversão em cache (disco), endereçada pelo conteúdo do PNG
+def png_rgb_em_cache(dados):
+    return cache_disco.obter('png_rgb', hashlib.sha1(dados).hexdigest(), None, lambda: png_rgb(dados))
+
+
+def png_logo():
+    global _png_logo
+    if _png_logo is None:
+        with open(configuracao.CAMINHO_LOGO, 'rb') as f:
+            _png_logo = png_rgb(f.read())[0]
+    return _png_logo
+
+
+# Um diretório por processo (os processos da geração em lote não compartilham arquivos)
+def _diretorio():
+    global _diretorio_imagens
+    if _diretorio_imagens[0] != os.getpid():
+        caminho = tempfile.mkdtemp(prefix='spaece_pdf_')
+        atexit.register(shutil.rmtree, caminho, True)
+        _diretorio_imagens = (os.getpid(), caminho)
+    return _diretorio_imagens[1]
+
+
+# Insere um PNG (bytes, já em RGB) pelo pdf.image() do FPDF, que só lê imagens de
+# arquivos. O arquivo temporário é nomeado pelo conteúdo e removido após a leitura:
+# o FPDF guarda cada imagem pelo caminho, então a mesma imagem (a logo do cabeçalho)
+# é gravada uma única vez no documento e referenciada nas páginas seguintes.
+def adicionar_imagem(pdf, png, x=None, y=None, w=0, h=0):
+    caminho = os.path.join(_diretorio(), hashlib.sha1(png).hexdigest() + '.png')
+    with open(caminho, 'wb') as f:
+        f.write(png)
+    try:
+        pdf.image(caminho, x=x, y=y, w=w, h=h)
+    finally:
+        os.unlink(caminho)
+
+
+# Função para gerar o PDF da classificação por edição (aba "Classificação por Edição")
+def gerar_pdf(df_filtrado, edicao_selecionada):
+    df_filtrado = base.formatar_base(df_filtrado)
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    # Adicionar a logo
+    adicionar_imagem(pdf, png_logo(), x=60, y=10, w=90)  # Ajuste a posição e o tamanho da logo
+
+    # Adicionar título e subtítulo
+    pdf.set_font("Arial", 'B', 16)
+    pdf.ln(40)  # Espaço após a logo
+    pdf.cell(0, 10, "SETOR DE MONITORAMENTO E PROCESSAMENTO DE RESULTADOS", ln=True, align='C')
+    pdf.cell(0, 10, "Ranking SPAECE", ln=True, align='C')
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, f"Edição: {edicao_selecionada}", ln=True, align='C')
+
+    # Configurações da tabela
+    pdf.set_font("Arial", 'B', 10)  # Fonte menor para o cabeçalho
+    pdf.set_fill_color(0, 51, 102)  # Azul escuro para o cabeçalho
+    pdf.set_text_color(255, 255, 255)  # Texto branco
+
+    # Definir larguras das colunas
+    col_widths = [15, 60, 20, 25, 50, 20]  # Larguras ajustadas para cada coluna
+
+    # Cabeçalho da tabela
+    headers = ["ORD", "ESCOLA", "ETAPA", "PROFICIÊNCIA", "COMPONENTE", "EDIÇÃO"]
+    for i, header in enumerate(headers):
+        pdf.cell(col_widths[i], 10, header, 1, 0, 'C', fill=True)
+    pdf.ln()
+
+    # Preencher a tabela com os dados
+    pdf.set_font("Arial", '', 8)  # Fonte menor para o conteúdo
+    pdf.set_text_color(0, 0, 0)  # Texto preto
+
+    for index, row in df_filtrado.iterrows():
+        # ORD
+        pdf.cell(col_widths[0], 10, row['ORD'], 1, 0, 'C')
+
+        # ESCOLA (com quebra de texto dentro da célula, sem bordas internas)
+        x = pdf.get_x()
+        y = pdf.get_y()
+        pdf.multi_cell(col_widths[1], 10, row['ESCOLA'], 0, 'L')  # Sem bordas internas (0 no lugar de 1)
+        pdf.set_xy(x + col_widths[1], y)  # Reposiciona o cursor para a próxima coluna
+
+        # ETAPA
+        pdf.cell(col_widths[2], 10, row['ETAPA'], 1, 0, 'C')
+
+        # PROFICIÊNCIA
+        pdf.cell(col_widths[3], 10, str(row['PROFICIENCIA_MEDIA']), 1, 0, 'C')
+
+        # COMPONENTE
+        pdf.cell(col_widths[4], 10, row['COMPONENTE_CURRICULAR'], 1, 0, 'L')
+
+        # EDIÇÃO
+        pdf.cell(col_widths[5], 10, str(row['EDICAO']), 1, 1, 'C')
+
+    # PDF em bytes
+    return pdf.output(dest='S').encode('latin1')
+
+
+# Função para gerar o PDF da classificação por quartis (aba "Quartil")
+def gerar_pdf_classificacao(df, componente, etapa, edicao):
+    pdf = FPDF(orientation='P', unit='mm', format='A4')
+    pdf.add_page()
+
+    # Logo
+    if os.path.exists(configuracao.CAMINHO_LOGO):
+        adicionar_imagem(pdf, png_logo(), x=10, y=8, w=30)
+
+    # Título e subtítulo
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 20, "Classificação por Quartis de Proficiência", ln=True, align='C')
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0, 10, f"Componente: {componente} | Etapa: {etapa} | Edição: {edicao}", ln=True, align='C')
+    pdf.ln(10)
+
+    # Configuração da tabela
+    pdf.set_font('Arial', 'B', 10)
+
+    # Cabeçalho da tabela (fundo azul e texto branco)
+    pdf.set_fill_color(0, 51, 102)
+    pdf.set_text_color(255, 255, 255)
+
+    # Larguras das colunas
+    col_widths = [15, 60, 20, 25, 30]
+
+    # Cabeçalhos
+    headers = ["Pos.", "Escola", "Etapa", "Proficiência", "Quartil"]
+    for i, header in enumerate(headers):
+        pdf.cell(col_widths[i], 10, header, 1, 0, 'C', fill=True)
+    pdf.ln()
+
+    # Conteúdo da tabela
+    pdf.set_font('Arial', '', 8)
+    pdf.set_text_color(0, 0, 0)
+
+    # Ordena o DataFrame
+    df_sorted = base.formatar_base(df).sort_values('PROFICIENCIA_MEDIA', ascending=False)
+    df_sorted['POSICAO'] = range(1, len(df_sorted) + 1)
+
+    # Cores para os quartis
+    quartil_colors = {
+        "Q1 (25% piores)": (255, 204, 204),
+        "Q2 (25% básicas)": (255, 229, 204),
+        "Q3 (25% intermediárias)": (204, 255, 204),
+        "Q4 (25% melhores)": (204, 255, 255)
+    }
+
+    for _, row in df_sorted.iterrows():
+        # Posição
+        pdf.cell(col_widths[0], 10, str(row['POSICAO']), 1, 0, 'C')
+
+        # Escola (com quebra de linha)
+        pdf.multi_cell(col_widths[1], 10, row['ESCOLA'], 1, 'L')
+        pdf.set_xy(pdf.get_x() + col_widths[0] + col_widths[1], pdf.get_y() - 10)
+
+        # Etapa
+        pdf.cell(col_widths[2], 10, row['ETAPA'], 1, 0, 'C')
+
+        # Proficiência
+        pdf.cell(col_widths[3], 10, f"{row['PROFICIENCIA_MEDIA']:.1f}", 1, 0, 'C')
+
+        # Quartil (com cor de fundo)
+        quartil = row['QUARTIL']
+        color = quartil_colors.get(quartil, (255, 255, 255))
+        pdf.set_fill_color(*color)
+        pdf.cell(col_widths[4], 10, quartil.split(' ')[0], 1, 1, 'C', fill=True)
+        pdf.set_fill_color(255, 255, 255)
+
+    return pdf.output(dest='S').encode('latin1')
+
+
+# CSVs baixados nas abas "Classificação por Edição" e "Quartil"
+def csv_classificacao(df_filtrado):
+    return base.formatar_base(df_filtrado).to_csv(index=False).encode('utf-8')
+
+
+def csv_quartis(df_quartil):
+    colunas = ['ESCOLA', 'ETAPA', 'COMPONENTE_CURRICULAR', 'PROFICIENCIA_MEDIA', 'QUARTIL']
+    return base.formatar_base(df_quartil[colunas]).to_csv(index=False).encode('utf-8')
+
+
+# PDFs em cache, endereçados pelo conteúdo da tabela de entrada
+def gerar_pdf_em_cache(df_filtrado, edicao_selecionada):
+    return cache_disco.obter(
+        'pdf_ranking', base.versao_base(df_filtrado), {'edicao': edicao_selecionada},
+        lambda: gerar_pdf(df_filtrado, edicao_selecionada)
+    )
+
+
+def gerar_pdf_classificacao_em_cache(df, componente, etapa, edicao):
+    return cache_disco.obter(
+        'pdf_quartis', base.versao_base(df), {'componente': componente, 'etapa': etapa, 'edicao': edicao},
+        lambda: gerar_pdf_classificacao(df, componente, etapa, edicao)
+    )
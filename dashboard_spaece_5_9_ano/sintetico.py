@@ -0,0 +1,159 @@
+import argparse
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+# Base estadual sintética no formato das planilhas do SPAECE (5º/9º Ano) e do
+# SPAECE-Alfa (2º Ano), para medir memória e desempenho com o volume do estado
+# inteiro sem depender de dados reais. Cada escola tem um nível e uma tendência
+# próprios, com ruído por edição, e os percentuais por nível de proficiência são
+# coerentes com a proficiência média (estudantes distribuídos em torno da média).
+#
+# Uso: python dashboard_spaece_5_9_ano/sintetico.py --saida sintetico/ [--municipios 184] [--escolas-por-municipio 30]
+
+MUNICIPIOS = 184
+ESCOLAS_POR_MUNICIPIO = 30
+CREDES = 20
+
+EDICOES = {
+    '2º Ano': [2007, 2008, 2009, 2010, 2012, 2013, 2014, 2015, 2016, 2017, 2018, 2019, 2022, 2023, 2024],
+    '5º Ano': [2012, 2013, 2014, 2015, 2016, 2017, 2018, 2019, 2022, 2023, 2024],
+    '9º Ano': [2014, 2015, 2016, 2017, 2018, 2019, 2022, 2023, 2024],
+}
+
+# Fração das escolas que atendem cada etapa e fração de resultados ausentes por edição
+OFERTA = {'2º Ano': 1.0, '5º Ano': 1.0, '9º Ano': 0.6}
+AUSENTES = 0.03
+
+# Proficiência média inicial do estado e cortes entre os níveis, por etapa e componente
+ESCALAS = {
+    ('2º Ano', 'LÍNGUA PORTUGUESA'): (130, [75, 100, 125, 150]),
+    ('5º Ano', 'LÍNGUA PORTUGUESA'): (190, [125, 175, 225]),
+    ('5º Ano', 'MATEMÁTICA'): (195, [150, 200, 250]),
+    ('9º Ano', 'LÍNGUA PORTUGUESA'): (235, [200, 250, 300]),
+    ('9º Ano', 'MATEMÁTICA'): (240, [225, 275, 325]),
+}
+
+# Desvio padrão da proficiência dos estudantes dentro de uma escola
+DESVIO_ESTUDANTES = 45
+
+# Colunas de cada planilha: níveis, rótulos do INDICADOR, contagens e participação
+PLANILHAS = {
+    'spaece': {
+        'niveis': ['MUITO_CRITICO', 'CRITICO', 'INTERMEDIARIO', 'ADEQUADO'],
+        'rotulos': ['Muito Crítico', 'Crítico', 'Intermediário', 'Adequado'],
+        'contagens': ['N_MUITO_CRITICOS', 'N_CRITICOS', 'N_INTERMEDIARIO', 'N_ADEQUADO'],
+        'participacao': ['PREVISTO', 'EFETIVO'],
+        'ide': 'IDE',
+    },
+    'alfa': {
+        'niveis': ['NAO_ALFABETIZADOS', 'ALFABETIZACAO_INCOMPLETA', 'INTERMEDIARIO', 'SUFICIENTE', 'DESEJAVEL'],
+        'rotulos': ['Não Alfabetizado', 'Alfabetização Incompleta', 'Intermediário', 'Suficiente', 'Desejável'],
+        'contagens': ['N_NAO ALFABETIZADO', 'N_ALFABETIZACAO INCOMPLLETA', 'N_INTERMEDIARIO', 'N_SUFICIENTE', 'N_DESEJAVEL'],
+        'participacao': ['PREVISTOS', 'EFETIVOS'],
+        'ide': 'IDE_Alfa',
+    },
+}
+
+# Função de distribuição da normal padrão
+_normal = np.vectorize(lambda z: 0.5 * (1 + math.erf(z / math.sqrt(2))))
+
+
+# Cadastro das escolas: município, CREDE, códigos INEP, nível e tendência de cada escola
+def gerar_escolas(municipios=MUNICIPIOS, escolas_por_municipio=ESCOLAS_POR_MUNICIPIO, semente=0):
+    rng = np.random.default_rng(semente)
+    total = municipios * escolas_por_municipio
+    municipio = np.arange(total) // escolas_por_municipio
+    return pd.DataFrame({
+        'REDE': 'MUNICIPAL',
+        'CREDE': [f"CREDE {m % CREDES + 1:02d}" for m in municipio],
+        'INEP_MUN': 2300000 + (municipio + 1) * 10,
+        'MUNICIPIO': [f"MUNICÍPIO {m + 1:03d}" for m in municipio],
+        'INEP_ESC': 23100000 + np.arange(total),
+        'ESCOLA': [f"ESCOLA MUNICIPAL {i + 1:05d} EMEIEF" for i in range(total)],
+        'NIVEL': rng.normal(0, 18, total),
+        'TENDENCIA': rng.normal(1.5, 1.0, total),
+    })
+
+
+# Resultados de uma etapa e componente em todas as edições
+def _gerar_resultados(escolas, etapa, componente, planilha, rng):
+    media, cortes = ESCALAS[(etapa, componente)]
+    colunas = PLANILHAS[planilha]
+    edicoes = EDICOES[etapa]
+
+    atendidas = escolas[rng.random(len(escolas)) < OFERTA[etapa]]
+    df = atendidas.loc[atendidas.index.repeat(len(edicoes))].reset_index(drop=True)
+    df['EDICAO'] = np.tile(edicoes, len(atendidas))
+    df = df[rng.random(len(df)) >= AUSENTES].reset_index(drop=True)
+    n = len(df)
+
+    anos = df['EDICAO'].to_numpy() - edicoes[0]
+    proficiencia = media + df['NIVEL'].to_numpy() + df['TENDENCIA'].to_numpy() * anos + rng.normal(0, 7, n)
+    proficiencia = np.clip(proficiencia, 50, 450).round(2)
+
+    # Percentual de estudantes entre cortes consecutivos; o último nível completa 100%
+    acumulado = _normal((np.array(cortes)[None, :] - proficiencia[:, None]) / DESVIO_ESTUDANTES) * 100
+    percentuais = np.diff(np.column_stack([np.zeros(n), acumulado]), axis=1).round(2)
+    percentuais = np.column_stack([percentuais, (100 - percentuais.sum(axis=1)).round(2)])
+
+    previstos = rng.integers(20, 160, n)
+    efetivos = np.round(previstos * rng.uniform(0.8, 1.0, n))
+    padronizada = np.clip((proficiencia - (cortes[0] - 50)) / (cortes[-1] - cortes[0] + 100) * 10, 0, 10).round(2)
+    fator = (efetivos / previstos).round(2)
+
+    df['ETAPA'] = etapa
+    df['PROFICIENCIA_MEDIA'] = proficiencia
+    df['INDICADOR'] = np.array(colunas['rotulos'])[np.searchsorted(cortes, proficiencia, side='right')]
+    for i, nivel in enumerate(colunas['niveis']):
+        df[nivel] = percentuais[:, i]
+    df[colunas['participacao'][0]] = previstos
+    df[colunas['participacao'][1]] = efetivos
+    df['PROFICIENCIA PADRONIZADA'] = padronizada
+    df['FATOR_AJUSTE'] = fator
+    for i, contagem in enumerate(colunas['contagens']):
+        df[contagem] = np.round(efetivos * percentuais[:, i] / 100)
+    df[colunas['ide']] = (padronizada * fator).round(2)
+    df['COMPONENTE_CURRICULAR'] = componente
+
+    ordem = (['ETAPA', 'REDE', 'CREDE', 'INEP_MUN', 'MUNICIPIO', 'INEP_ESC', 'ESCOLA', 'EDICAO',
+              'PROFICIENCIA_MEDIA', 'INDICADOR'] + colunas['niveis'] + colunas['participacao']
+             + ['PROFICIENCIA PADRONIZADA', 'FATOR_AJUSTE'] + colunas['contagens'] + [colunas['ide'], 'COMPONENTE_CURRICULAR'])
+    return df[ordem]
+
+
+# Gera as duas planilhas brutas (como lidas por pd.read_excel); retorna (result_spaece, result_alfa)
+def gerar_bases(municipios=MUNICIPIOS, escolas_por_municipio=ESCOLAS_POR_MUNICIPIO, semente=0):
+    escolas = gerar_escolas(municipios, escolas_por_municipio, semente)
+    rng = np.random.default_rng(semente + 1)
+    result_spaece = pd.concat([
+        _gerar_resultados(escolas, etapa, componente, 'spaece', rng)
+        for etapa in ['5º Ano', '9º Ano'] for componente in ['LÍNGUA PORTUGUESA', 'MATEMÁTICA']
+    ], ignore_index=True)
+    result_alfa = _gerar_resultados(escolas, '2º Ano', 'LÍNGUA PORTUGUESA', 'alfa', rng)
+    return result_spaece, result_alfa
+
+
+# Grava as planilhas sintéticas em `saida`; retorna os caminhos (spaece, alfa)
+def gravar_bases(saida, municipios=MUNICIPIOS, escolas_por_municipio=ESCOLAS_POR_MUNICIPIO, semente=0):
+    os.makedirs(saida, exist_ok=True)
+    result_spaece, result_alfa = gerar_bases(municipios, escolas_por_municipio, semente)
+    caminhos = (os.path.join(saida, 'result_spaece.xlsx'), os.path.join(saida, 'result_alfa.xlsx'))
+    for df, caminho in zip((result_spaece, result_alfa), caminhos):
+        df.to_excel(caminho, index=False)
+    return caminhos
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gera planilhas sintéticas do SPAECE com o volume do estado")
+    parser.add_argument('--saida', required=True, help="Pasta onde gravar result_spaece.xlsx e result_alfa.xlsx")
+    parser.add_argument('--municipios', type=int, default=MUNICIPIOS)
+    parser.add_argument('--escolas-por-municipio', type=int, default=ESCOLAS_POR_MUNICIPIO)
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    caminho_spaece, caminho_alfa = gravar_bases(args.saida, args.municipios, args.escolas_por_municipio, args.semente)
+    print(f"Planilhas gravadas em {args.saida}. Para usá-las no dashboard:")
+    print(f"  SPAECE_CAMINHO_SPAECE={caminho_spaece} SPAECE_CAMINHO_ALFA={caminho_alfa}")
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do dashboard são importados pelo nome, como nos comandos de linha de comando
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import base  # noqa: E402
+import configuracao  # noqa: E402
+import sintetico  # noqa: E402
+import validacao  # noqa: E402
+
+
+# Cache em disco e banco SQL numa pasta temporária, com o backend pandas
+@pytest.fixture(scope='session', autouse=True)
+def pasta_testes(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp('spaece')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(configuracao, 'DIRETORIO_CACHE', str(pasta / 'cache'))
+        monkeypatch.setattr(configuracao, 'CAMINHO_BANCO', str(pasta / 'spaece.sqlite'))
+        monkeypatch.setattr(configuracao, 'BACKEND', 'pandas')
+        yield pasta
+
+
+# Bases das planilhas do repositório (validadas e compactadas)
+@pytest.fixture(scope='session')
+def bases(pasta_testes):
+    result_spaece, result_alfa, _ = base.carregar_bases()
+    return result_spaece, result_alfa
+
+
+# Bases sintéticas pequenas (sem resultados oficiais dos municípios)
+@pytest.fixture(scope='session')
+def bases_sinteticas():
+    spaece, alfa = sintetico.gerar_bases(municipios=4, escolas_por_municipio=15)
+    return (base.compactar_base(validacao.validar_base(spaece, validacao.NIVEIS_SPAECE, 'spaece')[0]),
+            base.compactar_base(validacao.validar_base(alfa, validacao.NIVEIS_ALFA, 'alfa')[0]))
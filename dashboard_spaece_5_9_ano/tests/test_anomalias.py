@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import anomalias
+import base
+import validacao
+
+
+def test_z_robusto():
+    valores = np.r_[np.arange(1.0, 11.0), 100.0, [5.0] * 12, [1.0] * 3]
+    grupos = np.r_[[0] * 11, [1] * 12, [2] * 3]
+    z = anomalias.z_robusto(valores, grupos)
+
+    # Mediana 6 e MAD 3 no grupo 0
+    assert z[10] == pytest.approx(0.6745 * (100 - 6) / 3)
+    assert z[0] == pytest.approx(0.6745 * (1 - 6) / 3)
+    # MAD zero e grupo com menos de MIN_ESCOLAS: sem z
+    assert np.isnan(z[11:]).all()
+
+
+def _tabela(**colunas):
+    n = len(next(iter(colunas.values())))
+    tabela = pd.DataFrame({'ETAPA': ['5º Ano'] * n, 'COMPONENTE_CURRICULAR': ['MATEMÁTICA'] * n,
+                           'MUNICIPIO': ['A'] * n, 'ESCOLA': [f'E{i}' for i in range(n)]})
+    for tipo in anomalias.TIPOS:
+        tabela[tipo] = colunas.get(tipo, [np.nan] * n)
+    tabela['MAIOR_Z'] = tabela[list(anomalias.TIPOS)].abs().max(axis=1)
+    return tabela
+
+
+def test_limites_de_sinalizacao():
+    tabela = _tabela(
+        Z_VARIACAO=[-4.0, 3.49, np.nan, np.nan, np.nan],
+        Z_NIVEIS=[np.nan, np.nan, 3.5, -6.0, np.nan],
+        Z_COERENCIA=[np.nan, np.nan, np.nan, np.nan, 3.2],
+    )
+    # |z| para variação e coerência; a mudança dos níveis só conta quando é maior que a das outras escolas
+    assert anomalias.consultar_anomalias(tabela)['ESCOLA'].tolist() == ['E0', 'E2']
+    assert anomalias.consultar_anomalias(tabela, limite_z=3.0)['ESCOLA'].tolist() == ['E0', 'E2', 'E1', 'E4']
+    resultado = anomalias.consultar_anomalias(tabela, tipos=['Z_NIVEIS'])
+    assert resultado['ESCOLA'].tolist() == ['E2']
+    assert resultado['ANOMALIAS'].tolist() == ['Mudança dos níveis']
+
+
+# Salto artificial na última edição de uma escola: sinalizado como variação da proficiência
+def test_salto_sinalizado(bases_sinteticas):
+    df = bases_sinteticas[0].copy()
+    mat = df[(df['ETAPA'] == '5º Ano') & (df['COMPONENTE_CURRICULAR'] == 'MATEMÁTICA')]
+    escola = mat.iloc[0][['MUNICIPIO', 'ESCOLA']]
+    linha = mat[(mat['MUNICIPIO'] == escola['MUNICIPIO']) & (mat['ESCOLA'] == escola['ESCOLA'])]['EDICAO'].idxmax()
+    df.loc[linha, 'PROFICIENCIA_MEDIA'] += 80
+
+    tabela = anomalias.calcular_anomalias(df, validacao.NIVEIS_SPAECE)
+    resultado = anomalias.consultar_anomalias(tabela, etapa='5º Ano', componente='MATEMÁTICA', tipos=['Z_VARIACAO'])
+    sinalizada = resultado[(resultado['ESCOLA'] == escola['ESCOLA']) & (resultado['MUNICIPIO'] == escola['MUNICIPIO'])]
+    assert sinalizada['EDICAO'].tolist() == [df.loc[linha, 'EDICAO']]
+    assert sinalizada['Z_VARIACAO'].iloc[0] >= anomalias.LIMITE_Z
+    assert base.decimais(sinalizada['VARIACAO']).iloc[0] > 50
+
+
+# Escola que volta após uma edição sem resultado: a transição só tem ela, sem z
+def test_variacao_comparada_na_mesma_transicao(bases_sinteticas):
+    df = bases_sinteticas[0]
+    mat = df[(df['ETAPA'] == '5º Ano') & (df['COMPONENTE_CURRICULAR'] == 'MATEMÁTICA')]
+    escola = mat['ESCOLA'].iloc[0]
+    edicoes = sorted(mat.loc[mat['ESCOLA'] == escola, 'EDICAO'].unique())
+    lacuna = edicoes[len(edicoes) // 2]
+    df = df.drop(mat[(mat['ESCOLA'] == escola) & (mat['EDICAO'] == lacuna)].index)
+
+    tabela = anomalias.calcular_anomalias(df, validacao.NIVEIS_SPAECE)
+    tabela = tabela[(tabela['ETAPA'] == '5º Ano') & (tabela['COMPONENTE_CURRICULAR'] == 'MATEMÁTICA')]
+    depois = tabela[tabela['EDICAO'] == edicoes[edicoes.index(lacuna) + 1]]
+    retorno = depois[depois['ESCOLA'] == escola]
+    assert retorno['EDICAO_ANTERIOR'].tolist() == [edicoes[edicoes.index(lacuna) - 1]]
+    assert retorno['Z_VARIACAO'].isna().all()
+    # As escolas avaliadas nas duas edições seguidas continuam comparadas entre si
+    seguidas = depois[depois['EDICAO_ANTERIOR'] == lacuna]
+    assert len(seguidas) >= anomalias.MIN_ESCOLAS and seguidas['Z_VARIACAO'].notna().all()
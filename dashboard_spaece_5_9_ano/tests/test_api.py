@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from starlette.testclient import TestClient
+
+import api
+import base
+
+COMBINACAO = {'etapa': '5º Ano', 'componente': 'MATEMÁTICA', 'edicao': '2019'}
+
+
+@pytest.fixture(scope='module')
+def cliente(bases):
+    return TestClient(api.criar_app(api.ServicoSPAECE(api.IndiceSPAECE(*bases))))
+
+
+def test_municipios_usa_resultado_oficial(cliente):
+    resposta = cliente.get('/municipios', params=COMBINACAO)
+    assert resposta.status_code == 200
+    [municipio] = resposta.json()['dados']
+    assert municipio['MUNICIPIO'] == 'MARACANAU'
+    assert municipio['FONTE'] == 'oficial'
+    assert municipio['PROFICIENCIA_MEDIA'] == pytest.approx(221.30)
+
+
+def test_municipios_sem_linha_oficial_pondera_pelos_efetivos(bases_sinteticas):
+    indice = api.IndiceSPAECE(*bases_sinteticas)
+    result_spaece = bases_sinteticas[0]
+    dados = result_spaece[(result_spaece['ETAPA'] == '5º Ano') & (result_spaece['COMPONENTE_CURRICULAR'] == 'MATEMÁTICA')
+                          & (result_spaece['EDICAO'] == 2019)]
+    municipio = dados['MUNICIPIO'].iloc[0]
+    escolas = dados[dados['MUNICIPIO'] == municipio]
+
+    tabela = indice.municipios[('5º Ano', 'MATEMÁTICA', '2019')]
+    linha = tabela[tabela['MUNICIPIO'] == municipio].iloc[0]
+    assert linha['FONTE'] == 'calculado'
+    assert linha['N_ESCOLAS'] == len(escolas)
+    esperado = np.average(base.decimais(escolas['PROFICIENCIA_MEDIA']), weights=escolas['EFETIVO'])
+    assert linha['PROFICIENCIA_MEDIA'] == pytest.approx(esperado, abs=0.005)
+
+
+def test_etag_e_get_condicional(cliente):
+    resposta = cliente.get('/ranking', params=COMBINACAO)
+    etag = resposta.headers['etag']
+    assert cliente.get('/ranking', params=COMBINACAO, headers={'If-None-Match': etag}).status_code == 304
+    assert cliente.get('/ranking', params=COMBINACAO, headers={'If-None-Match': '*'}).status_code == 304
+    # Outra página é outro recurso
+    outra = cliente.get('/ranking', params=dict(COMBINACAO, pagina=2), headers={'If-None-Match': etag})
+    assert outra.status_code == 200
+
+
+@pytest.mark.parametrize('cabecalho', ['*', '"etag-antigo"'])
+def test_combinacao_inexistente_e_404_mesmo_com_if_none_match(cliente, cabecalho):
+    parametros = dict(COMBINACAO, edicao='1999')
+    for rota in ('/ranking', '/quartis', '/municipios'):
+        resposta = cliente.get(rota, params=parametros, headers={'If-None-Match': cabecalho})
+        assert resposta.status_code == 404
+    assert cliente.get('/escolas/1/historico', headers={'If-None-Match': cabecalho}).status_code == 404
+
+
+def test_paginacao(cliente):
+    completo = cliente.get('/ranking', params=dict(COMBINACAO, por_pagina=1000)).json()['dados']
+    resposta = cliente.get('/ranking', params=dict(COMBINACAO, pagina=2, por_pagina=10))
+    corpo = resposta.json()
+    assert resposta.headers['x-total-count'] == str(len(completo)) == str(corpo['total'])
+    assert corpo['dados'] == completo[10:20]
+    assert all(linha['ESCOLA'] != 'MARACANAU' for linha in completo)
@@ -0,0 +1,20 @@
+import pytest
+
+import banco
+import configuracao
+
+
+# As consultas SQL devem reproduzir o caminho pandas em todas as combinações e escolas
+@pytest.mark.parametrize('backend', ['sqlite', 'duckdb'])
+def test_equivalencia_com_pandas(bases, backend, tmp_path, monkeypatch):
+    if backend == 'duckdb':
+        pytest.importorskip('duckdb')
+    monkeypatch.setattr(configuracao, 'BACKEND', backend)
+    monkeypatch.setattr(configuracao, 'CAMINHO_BANCO', str(tmp_path / f'spaece.{backend}'))
+
+    assert banco.preparar_banco(*bases)
+    assert not banco.preparar_banco(*bases)  # versões gravadas: não regrava
+
+    verificadas, diferencas = banco.verificar_equivalencia(*bases)
+    assert verificadas > 0
+    assert diferencas == []
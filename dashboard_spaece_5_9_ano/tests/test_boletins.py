@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+from fpdf import FPDF
+
+import base
+import boletins
+import consultas
+import relatorios
+
+
+# Escola do 5º ano com o maior número de edições na base SPAECE
+def _escola_mais_avaliada(result_spaece):
+    escolas = base.escolas(result_spaece)
+    escolas = escolas[escolas['ETAPA'] == '5º Ano']
+    codigos = base.codigos_escolas(escolas)
+    return escolas[codigos == codigos.value_counts().index[0]]
+
+
+def test_variacao_pelo_codigo_da_escola(bases):
+    df_escola = _escola_mais_avaliada(bases[0])
+    linha = df_escola.iloc[0]
+    esperado = consultas.calcular_variacao(consultas.variacao_escola(df_escola, linha['MUNICIPIO'], linha['ESCOLA'], '5º Ano'))
+
+    # Fora de ordem e com o nome alterado na edição mais antiga: a variação é a mesma
+    renomeada = df_escola.sample(frac=1, random_state=0).astype({'ESCOLA': str})
+    renomeada.loc[renomeada['EDICAO'] == renomeada['EDICAO'].min(), 'ESCOLA'] = 'NOME ANTIGO'
+    obtido = consultas.calcular_variacao(consultas.edicoes_anteriores(renomeada))
+
+    colunas = ['COMPONENTE_CURRICULAR', 'EDICAO', 'EDICAO_ANTERIOR', 'DIFERENCA', 'VARIACAO_PERCENTUAL']
+    pd.testing.assert_frame_equal(
+        base.formatar_base(obtido)[colunas].reset_index(drop=True),
+        base.formatar_base(esperado)[colunas].reset_index(drop=True),
+    )
+    assert obtido['EDICAO_ANTERIOR'].notna().sum() == len(obtido) - obtido['COMPONENTE_CURRICULAR'].nunique()
+
+
+def test_gerar_boletim(bases):
+    df_escola = _escola_mais_avaliada(bases[0])
+    pdf = boletins.gerar_boletim(df_escola, boletins.cortes_bases(*bases), dpi=40)
+    assert pdf.startswith(b'%PDF')
+    assert os.listdir(relatorios._diretorio()) == []
+
+
+def test_logo_gravada_uma_vez_por_documento():
+    pdf = FPDF()
+    for _ in range(3):
+        pdf.add_page()
+        relatorios.adicionar_imagem(pdf, relatorios.png_logo(), x=10, y=8, w=40)
+    documento = pdf.output(dest='S').encode('latin1')
+    assert documento.count(b'/Subtype /Image') == 1
+    assert os.listdir(relatorios._diretorio()) == []
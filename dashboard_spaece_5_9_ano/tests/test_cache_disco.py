@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+import cache_disco
+import configuracao
+
+
+@pytest.fixture
+def diretorio(tmp_path, monkeypatch):
+    monkeypatch.setattr(configuracao, 'DIRETORIO_CACHE', str(tmp_path))
+    monkeypatch.setattr(configuracao, 'CACHE_DISCO', True)
+    return tmp_path
+
+
+# Conta as chamadas de calcular
+class Calculo:
+    def __init__(self, valor):
+        self.valor = valor
+        self.chamadas = 0
+
+    def __call__(self):
+        self.chamadas += 1
+        return self.valor
+
+
+def test_obter_memoria_descarta_o_menos_usado():
+    cache = {}
+    for chave in range(cache_disco.ITENS_MEMORIA):
+        cache_disco.obter_memoria(cache, chave, Calculo(chave))
+    cache_disco.obter_memoria(cache, 0, Calculo(None))  # 0 passa a ser o mais recente
+
+    cache_disco.obter_memoria(cache, 'nova', Calculo('nova'))
+    assert len(cache) == cache_disco.ITENS_MEMORIA
+    assert 1 not in cache
+    assert cache[0] == 0 and cache['nova'] == 'nova'
+
+
+def test_obter_pela_versao_dos_dados(diretorio):
+    calculo = Calculo({'a': 1})
+    assert cache_disco.obter('tabela', 'v1', {'p': 1}, calculo) == {'a': 1}
+    assert cache_disco.obter('tabela', 'v1', {'p': 1}, calculo) == {'a': 1}
+    assert calculo.chamadas == 1
+
+    # Nova versão dos dados ou outros parâmetros: recalcula
+    cache_disco.obter('tabela', 'v2', {'p': 1}, calculo)
+    cache_disco.obter('tabela', 'v1', {'p': 2}, calculo)
+    assert calculo.chamadas == 3
+
+
+def test_versao_do_formato_invalida_o_cache(diretorio, monkeypatch):
+    calculo = Calculo(1)
+    cache_disco.obter('tabela', 'v1', None, calculo)
+    monkeypatch.setattr(cache_disco, 'VERSAO_FORMATO', cache_disco.VERSAO_FORMATO + 1)
+    cache_disco.obter('tabela', 'v1', None, calculo)
+    assert calculo.chamadas == 2
+
+
+def test_item_corrompido_e_recalculado(diretorio):
+    calculo = Calculo(1)
+    cache_disco.obter('tabela', 'v1', None, calculo)
+    with open(cache_disco._caminho(cache_disco.gerar_chave('tabela', 'v1')), 'wb') as f:
+        f.write(b'corrompido')
+    assert cache_disco.obter('tabela', 'v1', None, calculo) == 1
+    assert calculo.chamadas == 2
+
+
+def test_limite_remove_os_itens_usados_ha_mais_tempo(diretorio):
+    for indice in range(3):
+        chave = cache_disco.gerar_chave('item', indice)
+        cache_disco.gravar(chave, b'x' * 1000)
+        os.utime(cache_disco._caminho(chave), (indice, indice))
+    # O item 0 é lido por último: passa a ser o mais recente
+    assert cache_disco.ler(cache_disco.gerar_chave('item', 0))[0]
+
+    tamanho = os.path.getsize(cache_disco._caminho(cache_disco.gerar_chave('item', 0)))
+    cache_disco.aplicar_limite(2 * tamanho)
+    assert [cache_disco.ler(cache_disco.gerar_chave('item', indice))[0] for indice in range(3)] == [True, False, True]
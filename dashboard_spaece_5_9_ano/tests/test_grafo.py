@@ -0,0 +1,43 @@
+from streamlit.testing.v1 import AppTest
+
+import grafo
+
+
+# Script mínimo: um nó que depende de um widget e outro que depende do primeiro
+def _script():
+    import pandas as pd
+    import streamlit as st
+
+    import grafo
+
+    st.number_input("n", value=3, key='n')
+    tabela = grafo.no('tabela', lambda: pd.DataFrame({'X': range(st.session_state['n'])}), widgets=['n'])
+    total = grafo.no('total', lambda: int(tabela['X'].sum()), depende=['tabela'])
+    st.markdown(f"total={total}")
+
+
+def _contagens(app):
+    return {nome: (dados['recalculos'], dados['reutilizacoes']) for nome, dados in app.session_state['_grafo_nos'].items()}
+
+
+def test_nos_reutilizados_e_compartilhados_entre_sessoes():
+    grafo._valor.clear()
+    primeira = AppTest.from_function(_script).run()
+    assert primeira.markdown[0].value == 'total=3'
+    assert _contagens(primeira) == {'tabela': (1, 0), 'total': (1, 0)}
+
+    primeira.run()
+    assert _contagens(primeira) == {'tabela': (1, 1), 'total': (1, 1)}
+
+    primeira.number_input(key='n').set_value(5).run()
+    assert primeira.markdown[0].value == 'total=10'
+    assert _contagens(primeira) == {'tabela': (2, 1), 'total': (2, 1)}
+
+    # A sessão guarda só chaves e contagens; os valores ficam no cache compartilhado
+    for dados in primeira.session_state['_grafo_nos'].values():
+        assert set(dados) == {'chave', 'entradas', 'versoes', 'recalculos', 'reutilizacoes', 'duracao_ms'}
+
+    # Outra sessão com os mesmos widgets reutiliza os valores já calculados
+    segunda = AppTest.from_function(_script).run()
+    assert segunda.markdown[0].value == 'total=3'
+    assert _contagens(segunda) == {'tabela': (0, 1), 'total': (0, 1)}
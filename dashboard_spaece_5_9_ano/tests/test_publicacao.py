@@ -0,0 +1,49 @@
+import os
+
+import publicacao
+import relatorios
+
+EDICOES = ['2019']
+
+
+def _situacoes(tabela):
+    return tabela.groupby('SITUACAO').size().to_dict()
+
+
+def test_combinacoes_sem_mudanca_sao_puladas(tmp_path, bases):
+    primeira = publicacao.publicar(str(tmp_path), processos=1, edicoes=EDICOES)
+    assert not primeira.empty
+    assert _situacoes(primeira) == {'gerada': len(primeira)}
+
+    segunda = publicacao.publicar(str(tmp_path), processos=1, edicoes=EDICOES)
+    assert _situacoes(segunda) == {'pulada': len(primeira)}
+
+    # Arquivo alterado depois da publicação: só a combinação dele é gerada de novo
+    etapa, componente, edicao = primeira.iloc[0][['ETAPA', 'COMPONENTE', 'EDICAO']]
+    arquivo = os.path.join(str(tmp_path), publicacao.caminhos_combinacao(etapa, componente, edicao)['classificacao_csv'])
+    with open(arquivo, 'ab') as f:
+        f.write(b'editado')
+    terceira = publicacao.publicar(str(tmp_path), processos=1, edicoes=EDICOES)
+    assert _situacoes(terceira) == {'gerada': 1, 'pulada': len(primeira) - 1}
+    assert terceira[terceira['SITUACAO'] == 'gerada'][['ETAPA', 'COMPONENTE']].values.tolist() == [[etapa, componente]]
+
+
+def test_combinacao_com_erro_fica_fora_do_manifesto(tmp_path, bases, monkeypatch):
+    gerar_pdf = relatorios.gerar_pdf_em_cache
+
+    def falhar_2_ano(df, edicao):
+        if (df['ETAPA'] == '2º Ano').any():
+            raise RuntimeError("falha simulada")
+        return gerar_pdf(df, edicao)
+
+    monkeypatch.setattr(relatorios, 'gerar_pdf_em_cache', falhar_2_ano)
+    primeira = publicacao.publicar(str(tmp_path), processos=1, edicoes=EDICOES)
+    erros = primeira[primeira['SITUACAO'] == 'erro']
+    assert not erros.empty and (erros['ETAPA'] == '2º Ano').all()
+    assert erros['ERRO'].str.contains('falha simulada').all()
+    manifesto = publicacao.ler_manifesto(str(tmp_path))['combinacoes']
+    assert all(item['etapa'] != '2º Ano' for item in manifesto)
+
+    monkeypatch.setattr(relatorios, 'gerar_pdf_em_cache', gerar_pdf)
+    segunda = publicacao.publicar(str(tmp_path), processos=1, edicoes=EDICOES)
+    assert _situacoes(segunda) == {'gerada': len(erros), 'pulada': len(primeira) - len(erros)}
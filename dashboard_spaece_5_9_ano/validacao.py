@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+# Validação das planilhas do SPAECE, executada uma única vez na carga dos dados.
+# Produz um DataFrame limpo e tipado e um relatório de qualidade com as linhas
+# descartadas ou sinalizadas, para que as abas não precisem corrigir os dados
+# a cada execução.
+
+
+# Erro que impede o uso da planilha (ex.: colunas obrigatórias ausentes)
+class ErroValidacao(Exception):
+    pass
+
+
+# Colunas de texto; as demais colunas são convertidas para números
+COLUNAS_TEXTO = ['ETAPA', 'REDE', 'CREDE', 'MUNICIPIO', 'ESCOLA', 'INDICADOR', 'COMPONENTE_CURRICULAR']
+
+# Colunas obrigatórias em qualquer planilha
+COLUNAS_OBRIGATORIAS = ['ETAPA', 'INEP_MUN', 'MUNICIPIO', 'INEP_ESC', 'ESCOLA', 'EDICAO',
+                        'PROFICIENCIA_MEDIA', 'COMPONENTE_CURRICULAR']
+
+# Colunas com o percentual de estudantes em cada nível de proficiência
+NIVEIS_SPAECE = ['MUITO_CRITICO', 'CRITICO', 'INTERMEDIARIO', 'ADEQUADO']
+NIVEIS_ALFA = ['NAO_ALFABETIZADOS', 'ALFABETIZACAO_INCOMPLETA', 'INTERMEDIARIO', 'SUFICIENTE', 'DESEJAVEL']
+
+# Chave que identifica um resultado: escola, etapa, componente e edição
+CHAVE = ['INEP_ESC', 'ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO']
+
+# Limites aceitos para a proficiência média (escala SAEB/SPAECE)
+FAIXA_PROFICIENCIA = (0, 500)
+
+# Diferença máxima, em pontos percentuais, entre a soma dos níveis e 100%
+TOLERANCIA_PERCENTUAIS = 1.0
+
+COLUNAS_RELATORIO = ['BASE', 'LINHA', 'VERIFICAÇÃO', 'DETALHE', 'AÇÃO']
+
+
+# Registra no relatório as linhas selecionadas pela máscara
+def _registrar(problemas, nome, df, mascara, verificacao, detalhe, acao):
+    if not mascara.any():
+        return
+    linhas = df.loc[mascara]
+    problemas.append(pd.DataFrame({
+        'BASE': nome,
+        # Número da linha na planilha (cabeçalho na linha 1)
+        'LINHA': linhas['_LINHA'].to_numpy(),
+        'VERIFICAÇÃO': verificacao,
+        'DETALHE': detalhe(linhas) if callable(detalhe) else detalhe,
+        'AÇÃO': acao,
+    }))
+
+
+# Valida a planilha bruta e retorna (DataFrame limpo, relatório de qualidade)
+def validar_base(df, niveis, nome):
+    problemas = []
+
+    # Eliminar colunas 'Unnamed' e espaços nos nomes das colunas
+    df = df.loc[:, ~df.columns.astype(str).str.contains('^Unnamed')].copy()
+    df.columns = df.columns.astype(str).str.strip()
+    df['_LINHA'] = np.arange(len(df)) + 2
+
+    # Presença das colunas (falha imediata)
+    ausentes = [coluna for coluna in COLUNAS_OBRIGATORIAS + niveis if coluna not in df.columns]
+    if ausentes:
+        raise ErroValidacao(f"Colunas ausentes em '{nome}': {', '.join(ausentes)}")
+
+    # Tipos: texto sem espaços extras e números convertidos uma única vez
+    for coluna in df.columns.drop('_LINHA'):
+        if coluna in COLUNAS_TEXTO:
+            df[coluna] = df[coluna].astype('string').str.strip().astype(object)
+            df.loc[df[coluna].isna() | (df[coluna] == ''), coluna] = np.nan
+        else:
+            original = df[coluna]
+            df[coluna] = pd.to_numeric(original, errors='coerce')
+            invalidos = original.notna() & df[coluna].isna()
+            if coluna in COLUNAS_OBRIGATORIAS + niveis:
+                _registrar(problemas, nome, df, invalidos, 'Tipo inválido',
+                           lambda linhas, c=coluna, o=original: f"{c} = " + o[linhas.index].astype(str),
+                           'Valor tratado como ausente')
+
+    # Código INEP ausente: recuperado pelo nome da escola no mesmo município,
+    # quando esse nome corresponde a um único código nas demais edições
+    sem_inep = df['INEP_ESC'].isna()
+    if sem_inep.any():
+        codigos = df.loc[~sem_inep].groupby(['MUNICIPIO', 'ESCOLA'])['INEP_ESC'].agg(['first', 'nunique'])
+        codigos = codigos.loc[codigos['nunique'] == 1, 'first']
+        recuperados = pd.Series(
+            codigos.reindex(pd.MultiIndex.from_frame(df.loc[sem_inep, ['MUNICIPIO', 'ESCOLA']])).to_numpy(),
+            index=df.index[sem_inep]
+        )
+        df.loc[sem_inep, 'INEP_ESC'] = recuperados
+        _registrar(problemas, nome, df, sem_inep & df['INEP_ESC'].notna(), 'Código INEP ausente',
+                   lambda linhas: 'INEP_ESC recuperado: ' + linhas['INEP_ESC'].astype('Int64').astype(str),
+                   'Código preenchido pelo nome da escola')
+        _registrar(problemas, nome, df, df['INEP_ESC'].isna(), 'Código INEP ausente',
+                   lambda linhas: 'ESCOLA = ' + linhas['ESCOLA'].astype(str),
+                   'Mantida sem código INEP')
+
+    # Identificação obrigatória do resultado
+    sem_chave = df[['ETAPA', 'COMPONENTE_CURRICULAR', 'EDICAO', 'ESCOLA', 'INEP_MUN', 'MUNICIPIO']].isna().any(axis=1)
+    _registrar(problemas, nome, df, sem_chave, 'Identificação ausente',
+               'ETAPA, COMPONENTE, EDIÇÃO, ESCOLA ou MUNICÍPIO vazio', 'Linha descartada')
+    df = df.loc[~sem_chave]
+
+    # Proficiência ausente ou fora da escala
+    sem_proficiencia = df['PROFICIENCIA_MEDIA'].isna()
+    _registrar(problemas, nome, df, sem_proficiencia, 'Proficiência ausente',
+               'PROFICIENCIA_MEDIA vazia ou não numérica', 'Linha descartada')
+    fora_da_faixa = ~sem_proficiencia & ~df['PROFICIENCIA_MEDIA'].between(*FAIXA_PROFICIENCIA)
+    _registrar(problemas, nome, df, fora_da_faixa, 'Proficiência fora da faixa',
+               lambda linhas: 'PROFICIENCIA_MEDIA = ' + linhas['PROFICIENCIA_MEDIA'].round(2).astype(str),
+               'Linha descartada')
+    df = df.loc[~sem_proficiencia & ~fora_da_faixa]
+
+    # Chaves duplicadas (mantém a primeira ocorrência)
+    # (escolas sem código INEP são identificadas pelo município e pelo nome)
+    chave = df[CHAVE].astype({'INEP_ESC': object})
+    chave['INEP_ESC'] = chave['INEP_ESC'].where(df['INEP_ESC'].notna(), df['MUNICIPIO'] + '/' + df['ESCOLA'])
+    duplicadas = chave.duplicated(keep='first')
+    _registrar(problemas, nome, df, duplicadas, 'Chave duplicada',
+               lambda linhas: linhas['ESCOLA'] + ' / ' + linhas['ETAPA'] + ' / '
+               + linhas['COMPONENTE_CURRICULAR'] + ' / ' + linhas['EDICAO'].astype('Int64').astype(str),
+               'Linha descartada')
+    df = df.loc[~duplicadas]
+
+    # Percentuais dos níveis: cada um entre 0 e 100 e soma próxima de 100%
+    percentuais = df[niveis]
+    fora_de_0_100 = ((percentuais < 0) | (percentuais > 100)).any(axis=1)
+    _registrar(problemas, nome, df, fora_de_0_100, 'Percentual de nível inválido',
+               'Algum nível fora do intervalo 0-100%', 'Mantida (verificar)')
+    soma = percentuais.sum(axis=1, min_count=1)
+    soma_incorreta = soma.isna() | ((soma - 100).abs() > TOLERANCIA_PERCENTUAIS)
+    _registrar(problemas, nome, df, soma_incorreta, 'Soma dos níveis diferente de 100%',
+               lambda linhas: 'Soma = ' + soma[linhas.index].round(2).astype(str) + '%',
+               'Mantida (verificar)')
+
+    # Tipos finais das colunas de identificação
+    for coluna in ['INEP_MUN', 'EDICAO']:
+        df[coluna] = df[coluna].astype('int64')
+    df['INEP_ESC'] = df['INEP_ESC'].astype('Int64')
+
+    # Resultado oficial do município (código do município no lugar do código da escola):
+    # a linha é mantida e marcada em AGREGADO; não é uma escola e fica fora de rankings,
+    # quartis, crescimento, coortes, anomalias e boletins (ver base.escolas)
+    df['AGREGADO'] = (df['INEP_ESC'] == df['INEP_MUN']).fillna(False).astype(bool)
+
+    df = df.drop(columns='_LINHA').reset_index(drop=True)
+    relatorio = (pd.concat(problemas, ignore_index=True) if problemas
+                 else pd.DataFrame(columns=COLUNAS_RELATORIO))
+    return df, relatorio
+
+
+# Resumo do relatório: quantidade de ocorrências por base e verificação
+def resumir_relatorio(relatorio):
+    return (relatorio.groupby(['BASE', 'VERIFICAÇÃO', 'AÇÃO'], sort=False)
+            .size().rename('OCORRÊNCIAS').reset_index())